@@ -1,266 +1,34 @@
+import sys
+from startup import StartupProfiler
+profiler = StartupProfiler('--profile-startup' in sys.argv)
 from tkinter import *
 from tkinter import messagebox, filedialog, ttk
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import numpy as np
+profiler.mark('import tkinter')
 import os
 import time
 from datetime import datetime
 import json
-import csv
-import serial
-import serial.tools.list_ports
-import sys
-import threading
-import queue
-from collections import deque
+import shutil
 import platform
+import threading
+import signal
+import profiling
+from communicator import (SerialCommunicator, config, load_config,
+                          get_available_serial_ports, get_default_serial_port)
+from protocol import setpoint_command, pid_command, current_command
+from devices import DeviceManager
+from samplestore import SampleStore, DEFAULT_CAPACITY, TIME, TEMPERATURE, CURRENT, SETPOINT
+from decimation import MinMaxDecimator, envelope_points
+from extrema import ExtremaTracker
+from framescheduler import FrameScheduler
+from console import ConsoleSink, DEBUG, INFO, WARNING, LEVELS, DEFAULT_MAX_LINES
+# Moduły analizy, metryk, eksportu, nagrań, odtwarzania i historii są importowane przy pierwszym użyciu
+profiler.mark('import numpy, pyserial i modułów akwizycji')
 
-config = {}
-with open("config.json", 'r') as file:
-    config = json.load(file)
-
-def get_available_serial_ports():
-    """Zwraca listę dostępnych portów szeregowych według systemu"""
-    ports = []
-    try:
-        # Automatyczne wykrywanie portów
-        available_ports = serial.tools.list_ports.comports()
-        for port in available_ports:
-            ports.append(port.device)
-    except:
-        pass
-    
-    if not ports:
-        # Domyślne porty według systemu
-        system = platform.system().lower()
-        if 'windows' in system:
-            ports = ['COM1', 'COM2', 'COM3', 'COM4', 'COM5']
-        elif 'linux' in system:
-            ports = ['/dev/ttyUSB0', '/dev/ttyUSB1', '/dev/ttyACM0', '/dev/ttyACM1', '/dev/ttyS0', '/dev/ttyS1']
-        elif 'darwin' in system:  # macOS
-            ports = ['/dev/tty.usbserial', '/dev/tty.usbmodem', '/dev/cu.usbserial', '/dev/cu.usbmodem']
-        else:
-            ports = ['/dev/ttyUSB0', '/dev/ttyACM0']  # Domyślnie Linux
-    
-    return ports if ports else ['brak_portów']
-
-def get_default_serial_port():
-    """Zwraca domyślny port szeregowy według systemu"""
-    system = platform.system().lower()
-    if 'windows' in system:
-        return 'COM4'
-    elif 'linux' in system:
-        # Sprawdź które porty faktycznie istnieją
-        common_linux_ports = ['/dev/ttyUSB0', '/dev/ttyACM0', '/dev/ttyUSB1', '/dev/ttyACM1']
-        for port in common_linux_ports:
-            if os.path.exists(port):
-                return port
-        return '/dev/ttyUSB0'  # Domyślny jeśli nic nie znaleziono
-    elif 'darwin' in system:  # macOS
-        return '/dev/cu.usbserial'
-    else:
-        return '/dev/ttyUSB0'
-
-class SerialCommunicator:
-    """Klasa odpowiedzialna za komunikację z urządzeniem w osobnym wątku"""
-    
-    def __init__(self, port=None, baud_rate=9600, console_func=None):
-        self.port = port or get_default_serial_port()
-        self.baud_rate = baud_rate
-        self.console_func = console_func or (lambda x: None)
-        self.connection = None
-        self.connected = False
-        self.running = False
-        self.thread = None
-        
-        # Kolejki do komunikacji między wątkami
-        self.data_queue = queue.Queue()
-        self.command_queue = queue.Queue()
-        
-        # Bufory danych
-        self.temperature_buffer = deque(maxlen=10000)
-        self.current_buffer = deque(maxlen=10000)
-        self.time_buffer = deque(maxlen=10000)
-        
-        # Ostatnie odczytane wartości
-        self.last_temperature = 0.0
-        self.last_current = 0.0
-        self.set_temperature = 20.0
-        
-        self.start_time = time.time()
-        
-    def connect(self):
-        """Nawiązuje połączenie z urządzeniem"""
-        try:
-            # Sprawdź czy port istnieje (ważne na Linuxie)
-            if not platform.system().lower().startswith('win') and not os.path.exists(self.port):
-                self.console_func(f"Port {self.port} nie istnieje")
-                return False
-                
-            self.connection = serial.Serial(self.port, self.baud_rate, timeout=0.5)
-            self.connected = True
-            self.console_func(f"Połączono z urządzeniem na porcie {self.port}")
-            return True
-        except serial.SerialException as e:
-            self.connected = False
-            self.console_func(f"Błąd połączenia szeregowego z portem {self.port}: {e}")
-            return False
-        except PermissionError as e:
-            self.connected = False
-            self.console_func(f"Brak uprawnień do portu {self.port}: {e}")
-            self.console_func("Na Linuxie spróbuj: sudo usermod -a -G dialout $USER")
-            return False
-        except Exception as e:
-            self.connected = False
-            self.console_func(f"Błąd połączenia z portem {self.port}: {e}")
-            return False
-    
-    def disconnect(self):
-        """Rozłącza z urządzeniem i zatrzymuje wątki"""
-        self.running = False
-        
-        if self.thread:
-            self.thread.join(timeout=2)
-            
-        if self.connection:
-            self.connection.close()
-        self.connected = False
-        self.console_func("Rozłączono z urządzeniem")
-    
-    def start_communication(self):
-        """Rozpoczyna komunikację w osobnym wątku"""
-        if not self.connected:
-            return False
-            
-        self.running = True
-        self.thread = threading.Thread(target=self._communication_loop, daemon=True)
-        self.thread.start()
-        self.console_func("Rozpoczęto komunikację w tle")
-        return True
-    
-    def _communication_loop(self):
-        """Główna pętla komunikacji działająca w tle"""
-        commands = ['*GETTPRS;', '*GETTACT;', '*GETIOUT;']
-        command_index = 0
-        error_count = 0
-        max_errors = 10
-        
-        while self.running and self.connected and error_count < max_errors:
-            try:
-                # Sprawdź czy są komendy do wysłania
-                try:
-                    command = self.command_queue.get_nowait()
-                    self.connection.write(str.encode(command))
-                    self.connection.flush()  # Wymusza wysłanie
-                except queue.Empty:
-                    pass
-                except Exception as e:
-                    self.console_func(f"Błąd wysyłania komendy: {e}")
-                    error_count += 1
-                    continue
-                
-                # Wysyłaj standardowe zapytania cyklicznie
-                try:
-                    if not self.connection.in_waiting:
-                        command = commands[command_index]
-                        self.connection.write(str.encode(command))
-                        self.connection.flush()
-                        command_index = (command_index + 1) % len(commands)
-                        
-                except Exception as e:
-                    self.console_func(f"Błąd wysyłania standardowego zapytania: {e}")
-                    error_count += 1
-                    continue
-                
-                # Odbierz dane
-                try:
-                    if self.connection.in_waiting:
-                        response = self.connection.readline().decode('Latin-1').strip()
-                        if response:
-                            self._process_response(response)
-                            error_count = 0  # Reset licznika błędów po udanej komunikacji
-                            
-                except Exception as e:
-                    self.console_func(f"Błąd odbioru danych: {e}")
-                    error_count += 1
-                    continue
-                
-                time.sleep(0.1)  # Krótka pauza
-                
-            except Exception as e:
-                self.console_func(f"Nieoczekiwany błąd komunikacji: {e}")
-                error_count += 1
-                
-        if error_count >= max_errors:
-            self.console_func(f"Zbyt wiele błędów komunikacji ({error_count}), zatrzymywanie...")
-            self.connected = False
-        
-        self.console_func("Zakończono pętlę komunikacji")
-    
-    def _process_response(self, response):
-        """Przetwarza odpowiedzi z urządzenia"""
-        current_time = time.time() - self.start_time
-        
-        try:
-            if '*TPRS ' in response:
-                self.set_temperature = float(response[5:12])
-                
-            elif '*TACT ' in response:
-                self.last_temperature = float(response[5:12])
-                self.temperature_buffer.append(self.last_temperature)
-                self.time_buffer.append(current_time)
-                
-                # Wyślij dane do GUI
-                self.data_queue.put({
-                    'type': 'temperature',
-                    'value': self.last_temperature,
-                    'time': current_time
-                })
-                
-            elif '*IOUT ' in response:
-                current_str = response[9:15].replace('A', '')
-                self.last_current = float(current_str)
-                self.current_buffer.append(self.last_current)
-                
-                # Wyślij dane do GUI
-                self.data_queue.put({
-                    'type': 'current',
-                    'value': self.last_current,
-                    'time': current_time
-                })
-                
-        except (ValueError, IndexError) as e:
-            self.console_func(f"Błąd parsowania odpowiedzi '{response}': {e}")
-    
-    def send_command(self, command):
-        """Dodaje komendę do kolejki wysyłania"""
-        if self.connected:
-            self.command_queue.put(command)
-            self.console_func(f"Dodano komendę do kolejki: {command}")
-        else:
-            self.console_func("Brak połączenia - komenda nie została wysłana")
-    
-    def get_latest_data(self):
-        """Pobiera najnowsze dane z kolejki"""
-        data = []
-        try:
-            while True:
-                data.append(self.data_queue.get_nowait())
-        except queue.Empty:
-            pass
-        return data
-    
-    def get_all_data(self):
-        """Zwraca wszystkie zebrane dane"""
-        return {
-            'temperature': list(self.temperature_buffer),
-            'current': list(self.current_buffer),
-            'time': list(self.time_buffer)
-        }
+FOLD_WINDOW = 20  # Szerokość zwiniętego wykresu [s]
 
 class App(Tk):
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, replay=None, replay_speed=1.0, **kwargs):
         Tk.__init__(self, *args, **kwargs)
         
         self.container = Frame(self)
@@ -268,16 +36,28 @@ class App(Tk):
         self.container.grid_rowconfigure(0, weight=1)
         self.container.grid_columnconfigure(0, weight=1)
         
+        # Okno pojawia się od razu; wykres powstaje po pierwszym narysowaniu,
+        # a wykrywanie portów i łączenie odbywają się w tle
+        self.splash = Label(self.container, text="Uruchamianie...")
+        self.splash.grid(row=0, column=0)
+        self.update()
+        profiler.milestone('okno widoczne')
+        
         # Konfiguracja
+        with profiler.phase('wczytanie konfiguracji'):
+            load_config()
         self.port_choice = ['1200', '2400', '4800', '9600', '19200', '38400', '57600', '115200']
         self.port = StringVar(self)
         self.port.set(config['port'])
         
-        # Wykryj dostępne porty szeregowe
-        self.available_ports = get_available_serial_ports()
         self.serial_port = StringVar(self)
         current_serial_port = config.get('serial_port', get_default_serial_port())
-        self.serial_port.set(current_serial_port)
+        # Lista "serial_ports" uruchamia kilka kontrolerów naraz; pierwszy jest urządzeniem głównym
+        self.device_ports = config.get('serial_ports') or [current_serial_port]
+        if replay:
+            self.device_ports = self.device_ports[:1]  # Odtwarzany jest jeden pomiar
+        self.serial_port.set(self.device_ports[0])
+        self.available_ports = [self.device_ports[0]]  # Pełna lista po wykryciu portów w tle
         
         self.tempRange_choice = ['-10 /+50', '-10 /+100', '-100 /+10', '-50 /+50', '+15 /+30', '+30 /+45', '+45 /+60', '-100 /+250']
         self.temp = StringVar(self)
@@ -285,42 +65,227 @@ class App(Tk):
         self.v = config['pid']
         self.graphFold = config['fold']
         
-        # GUI
-        self.frame = StartPage(self.container, self)
-        self.frame.grid(row=0, column=0, sticky="nsew")
-        self.frame.tkraise()
-        
-        # Inicjalizacja komunikacji (po utworzeniu GUI)
-        selected_port = self.serial_port.get()
-        self.communicator = SerialCommunicator(port=selected_port, baud_rate=int(self.port.get()), 
-                                             console_func=self.frame.console_data)
-        self.connected = self.communicator.connect()
-        
-        # Rozpocznij komunikację w tle
+        # Bufory próbek współdzielone przez komunikatory i wykres (jeden na urządzenie)
+        self.stores = [SampleStore(config.get('buffer_capacity', DEFAULT_CAPACITY)) for _ in self.device_ports]
+        self.store = self.stores[0]
+        
+        # GUI - przyciski i konsola są rysowane przed importem matplotlib i utworzeniem wykresu
+        with profiler.phase('interfejs'):
+            self.frame = StartPage(self.container, self)
+            self.frame.grid(row=0, column=0, sticky="nsew")
+            self.frame.tkraise()
+            self.splash.destroy()
+            self.update()
+        profiler.milestone('interfejs widoczny')
+        with profiler.phase('wykres'):
+            self.frame.setup_graph()
+            self.update_idletasks()
+        profiler.milestone('interfejs gotowy')
+        
+        # Inicjalizacja komunikacji (po utworzeniu GUI); wszystkie urządzenia obsługuje jedna pętla,
+        # a zapisany pomiar (--replay) zastępuje urządzenie główne
+        if replay:
+            from replay import ReplaySource
+            self.replay = ReplaySource(replay, store=self.store, speed=replay_speed,
+                                       console_func=self.frame.console_data)
+            self.communicators = [self.replay]
+        else:
+            self.replay = None
+            self.communicators = [SerialCommunicator(port=port, baud_rate=int(self.port.get()),
+                                                     console_func=self.frame.console_data, store=store)
+                                  for port, store in zip(self.device_ports, self.stores)]
+        self.communicator = self.communicators[0]
+        self.extra_communicators = self.communicators[1:]
+        for communicator in self.extra_communicators:
+            communicator.start_time = self.communicator.start_time  # Wspólna oś czasu
+        self.cursors = [communicator.cursor() for communicator in self.communicators]
+        self.devices = DeviceManager([c for c in self.communicators if c is not self.replay],
+                                     console_func=self.frame.console_data)
+        self.connected = False
+        self.recorder = None
+        self.extra_recorders = []  # (numer urządzenia, Recorder)
+        
+        # Połączenie w tle - nieistniejący port nie wstrzymuje okna
+        self.connecting = threading.Thread(target=self.connect_devices, daemon=True)
+        self.connecting.start()
+        
+        # Rozpocznij aktualizację GUI w głównym wątku (wykres i konsola)
+        self.scheduler = FrameScheduler.from_config(config)
+        self.render_pending = False
+        self.frame_job = None
+        self.frame_due = None  # Kiedy klatka powinna się zacząć (do pomiaru opóźnienia pętli Tk)
+        self.register_metrics()
+        
+        # Profilowanie na żądanie: menu albo SIGUSR1 (obsłużony w najbliższej klatce)
+        self.profiling = BooleanVar(self, value=False)
+        self.profile_requested = False
+        if hasattr(signal, 'SIGUSR1'):
+            signal.signal(signal.SIGUSR1, self.request_profiling)
+        self.bind('<Map>', self.request_frame)
+        self.update_graph()
+    
+    def connect_devices(self):
+        """Wykrywa porty szeregowe i łączy z urządzeniami (w wątku w tle)"""
+        with profiler.phase('wykrywanie portów (w tle)'):
+            self.available_ports = get_available_serial_ports()
+        with profiler.phase('łączenie z urządzeniami (w tle)'):
+            for communicator in self.communicators:
+                communicator.connect()
+    
+    def finish_connecting(self):
+        """Rozpoczyna komunikację w tle i ciągły zapis próbek na dysk (po połączeniu)"""
+        self.connecting = None
+        self.connected = self.communicator.connected
+        if self.devices.active:
+            self.devices.start()
+        if self.replay is not None:
+            self.replay.start_communication()
         if self.connected:
-            self.communicator.start_communication()
             self.console_data("Połączono z urządzeniem - komunikacja działa w tle")
-            # Rozpocznij aktualizację GUI w głównym wątku
-            self.update_graph()
         else:
             self.console_data('Brak połączenia z urządzeniem')
+        self.start_recording()
+        profiler.milestone('połączenie gotowe')
+        profiler.print_report()
+    
+    def register_metrics(self):
+        """Rejestruje metryki okna i uruchamia serwer metryk, jeśli ustawiono metrics_port"""
+        from metrics import registry, MetricsServer
+        self.metric_frame = registry.histogram('kontroler_frame_seconds', "Czas rysowania klatki")
+        self.metric_tk_lag = registry.histogram('kontroler_tk_lag_seconds', "Opóźnienie pętli zdarzeń Tk")
+        registry.function('kontroler_frames_skipped_total', "Klatki pominięte (okno niewidoczne)",
+                          lambda: self.scheduler.skipped, 'counter')
+        registry.function('kontroler_frame_interval_seconds', "Bieżący odstęp klatek",
+                          lambda: self.scheduler.interval)
+        for communicator, cursor in zip(self.communicators, self.cursors):
+            registry.function('kontroler_samples_dropped_total', "Próbki nadpisane przed odczytem przez okno",
+                              lambda cursor=cursor: cursor.dropped, 'counter', port=communicator.port)
+        
+        self.metrics_server = None
+        if config.get('metrics_port'):
+            try:
+                self.metrics_server = MetricsServer(int(config['metrics_port'])).start()
+                self.console_data(f"Metryki: {self.metrics_server.address}")
+            except OSError as e:
+                self.console_data(f"Nie udało się uruchomić serwera metryk: {e}")
     
     def update_graph(self):
-        """Aktualizuje wykres z danymi z komunikatora"""
+        """Klatka: odbiera nowe próbki, rysuje wykres (gdy okno jest widoczne) i planuje następną"""
+        self.frame_job = None
+        if self.frame_due is not None:
+            self.metric_tk_lag.observe(max(time.monotonic() - self.frame_due, 0.0))
+            self.frame_due = None
+        if self.connecting is not None and not self.connecting.is_alive():
+            self.finish_connecting()
+        if self.profile_requested:
+            self.profile_requested = False
+            self.toggle_profiling()
+        new_data = False
         try:
-            # Pobierz nowe dane z komunikatora
-            new_data = self.communicator.get_latest_data()
+            # Wszystkie próbki od poprzedniej klatki jednym wywołaniem na urządzenie
+            samples = 0
+            for cursor in self.cursors:
+                dropped = cursor.dropped
+                block = cursor.fetch()
+                if cursor.dropped > dropped:
+                    self.frame.console_data(f"Pominięto {cursor.dropped - dropped} próbek (bufor nadpisany)", WARNING)
+                samples += block.shape[1]
+                if block.shape[1] and cursor is self.cursors[0]:
+                    self.frame.process_new_data(block)
+            self.scheduler.observe_samples(time.monotonic(), samples)
+            new_data = samples > 0
             
-            # Przekaż dane do GUI
-            if new_data:
-                self.frame.process_new_data(new_data)
+            # Zminimalizowane okno nie jest rysowane - zaległą klatkę narysuje zdarzenie <Map>
+            self.render_pending = self.render_pending or new_data
+            if self.render_pending and self.winfo_viewable():
+                started = time.perf_counter()
                 self.frame.update_graph()
+                frame_cost = time.perf_counter() - started
+                self.scheduler.observe_frame(frame_cost)
+                self.metric_frame.observe(frame_cost)
+                self.render_pending = False
+            elif self.render_pending:
+                self.scheduler.skipped += 1
             
         except Exception as e:
             self.console_data(f"Błąd aktualizacji wykresu: {e}")
         
-        # Zaplanuj następną aktualizację
-        self.after(200, self.update_graph)  # 200ms interwał
+        # Wpisz zebrane komunikaty do konsoli jedną operacją
+        self.frame.flush_console()
+        
+        # Odstęp do następnej klatki według napływu próbek i kosztu rysowania
+        interval = self.scheduler.next_interval(new_data)
+        self.frame_due = time.monotonic() + interval
+        self.frame_job = self.after(int(interval * 1000), self.update_graph)
+    
+    def request_frame(self, event=None):
+        """Rysuje klatkę od razu (np. po ponownym pokazaniu okna)"""
+        if event is not None and event.widget is not self:
+            return
+        if self.frame_job is not None:
+            self.after_cancel(self.frame_job)
+        self.frame_due = None
+        self.frame_job = self.after_idle(self.update_graph)
+    
+    def request_profiling(self, signum=None, frame=None):
+        """Obsługa SIGUSR1 - przełączenie profilowania w wątku okna"""
+        self.profile_requested = True
+    
+    def toggle_profiling(self):
+        """Rozpoczyna lub kończy profilowanie wątku okna i wątków komunikacji"""
+        from recording import DEFAULT_RECORDING_DIR
+        directory = config.get('recording_dir', DEFAULT_RECORDING_DIR)
+        try:
+            session = profiling.current()
+            if session is not None:
+                self.console_data(f"Profilowanie zakończone ({session.describe()})")
+                stats_path, folded_path = profiling.stop()
+                if stats_path:
+                    self.console_data(f"Profil zapisany: {stats_path}")
+                self.console_data(f"Stosy wątków zapisane: {folded_path}")
+            else:
+                profiling.start(directory)
+                self.console_data("Rozpoczęto profilowanie (ponowne wybranie lub SIGUSR1 kończy)")
+        except Exception as e:
+            self.console_data(f"Błąd profilowania: {e}")
+        self.profiling.set(profiling.current() is not None)
+    
+    def start_recording(self):
+        """Rozpoczyna ciągły zapis próbek połączonych urządzeń do plików nagrań"""
+        if not config.get('recording', True) or self.connecting is not None:
+            return
+        from recording import Recorder, recording_filename, DEFAULT_RECORDING_DIR, DEFAULT_FSYNC_INTERVAL
+        for number, communicator in enumerate(self.communicators, start=1):
+            if not communicator.connected:
+                continue
+            try:
+                recorder = Recorder(communicator.store,
+                                    recording_filename(config.get('recording_dir', DEFAULT_RECORDING_DIR), number),
+                                    metadata={'config': config.copy(), 'serial_port': communicator.port},
+                                    fsync_interval=config.get('fsync_interval', DEFAULT_FSYNC_INTERVAL),
+                                    console_func=self.console_data)
+                recorder.start()
+            except Exception as e:
+                self.console_data(f"Nie udało się rozpocząć nagrywania ({communicator.port}): {e}")
+                continue
+            if number == 1:
+                self.recorder = recorder
+            else:
+                self.extra_recorders.append((number, recorder))
+    
+    def stop_recording(self):
+        """Kończy nagrania (zapisuje stopki z indeksem) i zwraca listę (numer urządzenia, ścieżka)"""
+        paths = []
+        if self.recorder is not None:
+            recorder, self.recorder = self.recorder, None
+            if self.frame.stop:
+                from recording import FLAG_TEST_STOP
+                recorder.mark(self.frame.stop, FLAG_TEST_STOP)
+            paths.append((1, recorder.stop({'test_start': self.frame.start, 'test_stop': self.frame.stop})))
+        for number, recorder in self.extra_recorders:
+            paths.append((number, recorder.stop()))
+        self.extra_recorders = []
+        return paths
     
     def console_data(self, message):
         """Deleguje wiadomości konsoli do StartPage"""
@@ -334,16 +299,13 @@ class App(Tk):
         answer = messagebox.askquestion("Ostrzeżenie", "Czy chcesz zapisać dane?", icon="warning")
         if answer == "yes":
             try:
-                # Pobierz wszystkie dane z komunikatora
-                all_data = self.communicator.get_all_data()
-                
-                if self.frame.start != 0 and len(all_data['time']) > 0:
-                    self.frame.stop = len(all_data['time']) - 1
-                    self.console_data(f'Test Stop: {all_data["time"][self.frame.stop]:.2f}s')
+                if self.frame.start != 0 and self.store.count > 0:
+                    self.frame.stop = self.store.count - 1
+                    self.console_data(f'Test Stop: {self.store.window(self.frame.stop)[TIME][0]:.2f}s')
                 
                 # Zatrzymaj urządzenie
                 if self.connected:
-                    self.communicator.send_command('a')
+                    self.communicator.send_command(current_command(False))
                 
                 # Wybierz katalog do zapisania
                 dir = filedialog.askdirectory()
@@ -367,67 +329,95 @@ class App(Tk):
                 self.frame.fig.savefig(plot_path, dpi=300, bbox_inches='tight')
                 self.console_data(f"Wykres zapisany: {plot_path}")
                 
-                # Przygotuj dane do zapisu
-                start_idx = self.frame.start if self.frame.start != 0 else 0
-                stop_idx = self.frame.stop if self.frame.stop != 0 else len(all_data['time'])
+                # Przygotuj dane do zapisu (numery próbek liczone od początku pomiaru);
+                # kopia, bo bufor jest dalej zapisywany w trakcie eksportu
+                start_idx = self.frame.start
+                stop_idx = self.frame.stop if self.frame.stop != 0 else self.store.count
+                block = self.store.window(start_idx, stop_idx).copy()
+                times = block[TIME]
                 
-                save_data = {
-                    "metadata": {
-                        "start_time": datetime.now().isoformat(),
-                        "measurement_duration": all_data['time'][stop_idx-1] - all_data['time'][start_idx] if stop_idx > start_idx else 0,
-                        "total_samples": stop_idx - start_idx,
-                        "config": config.copy()
-                    },
-                    "temperature": all_data['temperature'][start_idx:stop_idx],
-                    "current": all_data['current'][start_idx:stop_idx], 
-                    "time": all_data['time'][start_idx:stop_idx]
+                metadata = {
+                    "start_time": datetime.now().isoformat(),
+                    "measurement_duration": float(times[-1] - times[0]) if len(times) > 0 else 0,
+                    "total_samples": len(times),
+                    "config": config.copy()
                 }
                 
-                # Zapisz dane JSON
-                json_path = os.path.join(save_dir, "data.json")
-                with open(json_path, "w") as json_file:
-                    json.dump(save_data, json_file, indent=4)
-                self.console_data(f"Dane zapisane: {json_path}")
+                # Nagranie powstawało w trakcie pomiaru - wystarczy je zamknąć i przenieść
+                for number, recording_path in self.stop_recording():
+                    if recording_path:
+                        target = os.path.join(save_dir, "data.kbin" if number == 1 else f"data-{number}.kbin")
+                        shutil.move(recording_path, target)
+                        self.console_data(f"Nagranie zapisane: {target}")
                 
-                # Zapisz dane CSV
+                # Zapisz dane JSON i CSV w tle
+                from export import ExportJob, csv_task, json_task
+                json_path = os.path.join(save_dir, "data.json")
                 csv_path = os.path.join(save_dir, "data.csv")
-                with open(csv_path, "w", newline='', encoding='utf-8') as csv_file:
-                    writer = csv.writer(csv_file, delimiter=';')
-                    
-                    # Nagłówek CSV
-                    writer.writerow(['Czas [s]', 'Temperatura [°C]', 'Prąd [A]'])
-                    
-                    # Dane - synchronizacja przez najkrótszą listę
-                    min_len = min(len(save_data['time']), len(save_data['temperature']), len(save_data['current']))
-                    for i in range(min_len):
-                        writer.writerow([
-                            f"{save_data['time'][i]:.3f}",
-                            f"{save_data['temperature'][i]:.2f}",
-                            f"{save_data['current'][i]:.4f}"
-                        ])
-                
-                self.console_data(f"Dane CSV zapisane: {csv_path}")
-                
-                # Zapisz log tekstowy
-                log_path = os.path.join(save_dir, "measurement_log.txt")
-                with open(log_path, "w") as log_file:
-                    log_file.write(f"Pomiar temperatury - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                    log_file.write(f"Czas pomiaru: {save_data['metadata']['measurement_duration']:.2f}s\n")
-                    log_file.write(f"Liczba próbek: {save_data['metadata']['total_samples']}\n")
-                    log_file.write(f"Konfiguracja: {save_data['metadata']['config']}\n")
-                
-                messagebox.showinfo("Sukces", f"Dane zapisane w: {save_dir}")
+                job = ExportJob([
+                    json_task(json_path, metadata, [("temperature", block[TEMPERATURE]),
+                                                    ("current", block[CURRENT]),
+                                                    ("time", times)]),
+                    csv_task(csv_path, times, block[TEMPERATURE], block[CURRENT]),
+                ])
+                ExportDialog(self, job, "Zapisywanie danych",
+                             lambda job: self.finish_saving(job, save_dir, metadata, c))
+                return
                 
             except Exception as e:
                 self.console_data(f"Błąd zapisywania danych: {e}")
                 messagebox.showerror("Błąd", f"Nie udało się zapisać danych: {e}")
         
+        self.finish_closing(c)
+    
+    def finish_saving(self, job, save_dir, metadata, c):
+        """Kończy zapis danych po zakończeniu eksportu w tle"""
+        try:
+            if job.error:
+                raise job.error
+            if job.cancelled:
+                # Przerwany zapis nie zamyka aplikacji
+                self.console_data("Zapis danych przerwany")
+                self.finish_closing(False)
+                return
+            self.console_data(f"Dane zapisane: {os.path.join(save_dir, 'data.json')}")
+            self.console_data(f"Dane CSV zapisane: {os.path.join(save_dir, 'data.csv')}")
+            
+            # Zapisz log tekstowy
+            log_path = os.path.join(save_dir, "measurement_log.txt")
+            with open(log_path, "w") as log_file:
+                log_file.write(f"Pomiar temperatury - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+                log_file.write(f"Czas pomiaru: {metadata['measurement_duration']:.2f}s\n")
+                log_file.write(f"Liczba próbek: {metadata['total_samples']}\n")
+                log_file.write(f"Konfiguracja: {metadata['config']}\n")
+            
+            messagebox.showinfo("Sukces", f"Dane zapisane w: {save_dir}")
+            
+        except Exception as e:
+            self.console_data(f"Błąd zapisywania danych: {e}")
+            messagebox.showerror("Błąd", f"Nie udało się zapisać danych: {e}")
+        
+        self.finish_closing(c)
+    
+    def finish_closing(self, c):
+        """Zamyka aplikację albo przygotowuje kolejny pomiar"""
         if c:
-            # Zamknij komunikację
-            self.communicator.disconnect()
+            # Zamknij nagranie i komunikację
+            self.stop_recording()
+            if profiling.current() is not None:
+                self.toggle_profiling()
+            if self.frame_job is not None:
+                self.after_cancel(self.frame_job)
+            if self.metrics_server is not None:
+                self.metrics_server.stop()
+            self.devices.stop()
+            for communicator in self.communicators:
+                communicator.disconnect()
             self.destroy()
         else:
             self.frame.start = 0
+            if self.recorder is None and not self.extra_recorders:
+                self.start_recording()
         
     def import_config(self):
         """Importuje konfigurację z pliku JSON"""
@@ -509,7 +499,7 @@ class App(Tk):
         try:
             # Sprawdź czy są dane do eksportu
             all_data = self.communicator.get_all_data()
-            if not all_data['temperature'] or not all_data['time']:
+            if len(all_data['temperature']) == 0 or len(all_data['time']) == 0:
                 messagebox.showwarning("Brak danych", "Brak danych do eksportu. Uruchom pomiar aby zebrać dane.")
                 return
             
@@ -517,52 +507,99 @@ class App(Tk):
                 title="Zapisz dane jako CSV",
                 defaultextension=".csv",
                 filetypes=[("Pliki CSV", "*.csv"), ("Wszystkie pliki", "*.*")],
-                initialname=f"pomiar_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+                initialfile=f"pomiar_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
             )
             
             if not file_path:
                 return
             
-            with open(file_path, "w", newline='', encoding='utf-8') as csv_file:
-                writer = csv.writer(csv_file, delimiter=';')
-                
-                # Nagłówek z metadanymi
-                writer.writerow(['# Pomiar temperatury - Kontroler Fotonika'])
-                writer.writerow([f'# Data eksportu: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}'])
-                writer.writerow([f'# Liczba pomiarów: {len(all_data["temperature"])}'])
-                writer.writerow([f'# Czas pomiaru: {all_data["time"][-1] - all_data["time"][0]:.2f}s'])
-                writer.writerow([''])  # Pusta linia
-                
-                # Nagłówek kolumn
-                writer.writerow(['Czas [s]', 'Temperatura [°C]', 'Prąd [A]'])
-                
-                # Dane - synchronizacja przez najkrótszą listę
-                min_len = min(len(all_data['time']), len(all_data['temperature']), len(all_data['current']))
-                for i in range(min_len):
-                    writer.writerow([
-                        f"{all_data['time'][i]:.3f}",
-                        f"{all_data['temperature'][i]:.2f}",
-                        f"{all_data['current'][i]:.4f}"
-                    ])
+            # Kopia danych - bufor jest dalej zapisywany w trakcie eksportu
+            all_data = {key: values.copy() for key, values in all_data.items()}
             
-            self.console_data(f"Dane wyeksportowane do CSV: {file_path}")
-            messagebox.showinfo("Sukces", f"Dane zostały wyeksportowane do:\n{file_path}")
+            # Nagłówek z metadanymi
+            preamble = [
+                ['# Pomiar temperatury - Kontroler Fotonika'],
+                [f'# Data eksportu: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}'],
+                [f'# Liczba pomiarów: {len(all_data["temperature"])}'],
+                [f'# Czas pomiaru: {all_data["time"][-1] - all_data["time"][0]:.2f}s'],
+                [''],  # Pusta linia
+            ]
+            
+            from export import ExportJob, csv_task
+            job = ExportJob([csv_task(file_path, all_data['time'], all_data['temperature'],
+                                      all_data['current'], preamble)])
+            ExportDialog(self, job, "Eksport CSV", lambda job: self.finish_export_csv(job, file_path))
             
         except Exception as e:
             self.console_data(f"Błąd eksportu CSV: {e}")
             messagebox.showerror("Błąd", f"Nie udało się wyeksportować danych do CSV:\n{e}")
+    
+    def finish_export_csv(self, job, file_path):
+        """Zgłasza wynik eksportu CSV wykonanego w tle"""
+        if job.error:
+            self.console_data(f"Błąd eksportu CSV: {job.error}")
+            messagebox.showerror("Błąd", f"Nie udało się wyeksportować danych do CSV:\n{job.error}")
+        elif job.cancelled:
+            self.console_data("Eksport CSV przerwany")
+        else:
+            self.console_data(f"Dane wyeksportowane do CSV: {file_path}")
+            messagebox.showinfo("Sukces", f"Dane zostały wyeksportowane do:\n{file_path}")
+
+class DeviceTrace:
+    """Linie temperatury i prądu dodatkowego urządzenia na wspólnym wykresie"""
+    
+    def __init__(self, store, temperature_line, current_line):
+        self.store = store
+        self.temperature_line = temperature_line
+        self.current_line = current_line
+        self.temperature_decimator = MinMaxDecimator(TEMPERATURE)
+        self.current_decimator = MinMaxDecimator(CURRENT)
+        self.temperature_extrema = ExtremaTracker(TEMPERATURE, FOLD_WINDOW)
+        self.current_extrema = ExtremaTracker(CURRENT, FOLD_WINDOW)
+    
+    def update(self, x_left, x_right, pixels):
+        """Aktualizuje linie i min/max; zwraca False, gdy urządzenie nie ma jeszcze danych"""
+        if len(self.store) == 0:
+            return False
+        self.temperature_line.set_data(*self.temperature_decimator.update(self.store, x_left, x_right, pixels))
+        self.current_line.set_data(*self.current_decimator.update(self.store, x_left, x_right, pixels))
+        self.temperature_extrema.update(self.store)
+        self.current_extrema.update(self.store)
+        return True
+
 
 class StartPage(LabelFrame):
     def __init__(self, parent, controller):
         LabelFrame.__init__(self, parent)
         self.controller = controller
         
-        # Bufory danych do wyświetlania
-        self.data = [0]
-        self.current = [0]
-        self.time = [0]
+        # Komunikaty z dowolnego wątku trafiają do kolejki i są wypisywane co klatkę
+        self.console_sink = ConsoleSink(level=LEVELS.get(config.get('console_level', 'INFO'), INFO),
+                                        max_lines=config.get('console_lines', DEFAULT_MAX_LINES))
+        
+        # Dane do wyświetlania pochodzą ze wspólnego bufora próbek
+        self.store = controller.store
         self.sent_data_value = 20.0
         
+        # Decymacja min/max serii do rozdzielczości wykresu
+        self.temperature_decimator = MinMaxDecimator(TEMPERATURE)
+        self.current_decimator = MinMaxDecimator(CURRENT)
+        
+        # Minimum i maksimum serii w oknie wykresu i w całej historii
+        self.temperature_extrema = ExtremaTracker(TEMPERATURE, FOLD_WINDOW)
+        self.current_extrema = ExtremaTracker(CURRENT, FOLD_WINDOW)
+        
+        # Tryb blit: statyczne tło wykresu jest zapamiętywane, a co klatkę
+        # rysowane są tylko linie i etykiety z ostatnimi wartościami
+        self.blit = config.get('blit', True)
+        self.background = None
+        self.full_redraw = True
+        self.plot_limits = None
+        self.frame_time = 0.0  # Średni czas klatki [ms]
+        self.label_texts = {}  # Ostatnio wyświetlone teksty etykiet zmienianych co klatkę
+        from analysis import StepAnalyzer
+        self.step_analyzer = StepAnalyzer()  # Wskaźniki bieżącego skoku nastawy (co 1 s)
+        
         # Konsola do wyświetlania komunikatów (bez przekierowania stdout)
         
         self.time_start = time.time()
@@ -571,8 +608,7 @@ class StartPage(LabelFrame):
         self.stop = 0
         self.r = 1
         
-        self.setup_ui()
-        self.setup_graph()
+        self.setup_ui()  # Wykres tworzy App.__init__ (setup_graph) po narysowaniu interfejsu
         
     def setup_ui(self):
         """Konfiguruje elementy interfejsu"""
@@ -618,26 +654,43 @@ class StartPage(LabelFrame):
         self.console.config(yscrollcommand=scrollbar.set)
         scrollbar.config(command=self.console.yview)
         
+        self.frame_time_label = Label(self)
+        self.frame_time_label.grid(row=3, column=1, sticky='w')
+        
+        self.step_label = Label(self)
+        self.step_label.grid(row=3, column=2, columnspan=3, sticky='w')
+        
         for widget in self.winfo_children():
             widget.grid_configure(padx=5, pady=5, rowspan=1)
     
     def setup_graph(self):
         """Konfiguruje wykres"""
+        with profiler.phase('import matplotlib'):
+            from matplotlib.figure import Figure
+            from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        
         self.fig = Figure(figsize=(5, 5), dpi=100)
         self.fig.patch.set_facecolor('#F0F0F0')
         self.ax1 = self.fig.add_subplot(1, 1, 1)
         self.ax2 = self.ax1.twinx()
         self.ax1.grid()
-        self.line, = self.ax1.plot(self.time, self.data, 'g', label='Temperatura')
-        self.current_data_line, = self.ax2.plot(self.time, self.current, 'orange', label='Prąd')
+        self.line, = self.ax1.plot([], [], 'g', label='Temperatura')
+        self.current_data_line, = self.ax2.plot([], [], 'orange', label='Prąd')
+        
+        # Dodatkowe urządzenia (config["serial_ports"]) - osobne linie na tych samych osiach
+        self.device_traces = []
+        for number, store in enumerate(self.controller.stores[1:], start=2):
+            temperature_line, = self.ax1.plot([], [], label=f'Temperatura {number}')
+            current_line, = self.ax2.plot([], [], linestyle=':', color=temperature_line.get_color(), label=f'Prąd {number}')
+            self.device_traces.append(DeviceTrace(store, temperature_line, current_line))
         
         maxv = float(self.controller.temp.get().split(' /')[1])
         minv = float(self.controller.temp.get().split(' /')[0])
         
         self.last_data_text = self.ax1.text(0, 0, "0", ha='right', va='bottom', fontsize=8, color='red')
         self.last_current_text = self.ax2.text(0, 0, "0", ha='right', va='bottom', fontsize=8, color='orange')
-        self.up_range_text = self.ax1.text(self.time[-1]*0.8, maxv, f"max: {maxv:.3f}°C", ha='right', va='top', fontsize=8, color='grey')
-        self.down_range_text = self.ax1.text(self.time[-1]*0.8, minv, f"min: {minv:.3f}°C", ha='right', va='bottom', fontsize=8, color='grey')
+        self.up_range_text = self.ax1.text(0, maxv, f"max: {maxv:.3f}°C", ha='right', va='top', fontsize=8, color='grey')
+        self.down_range_text = self.ax1.text(0, minv, f"min: {minv:.3f}°C", ha='right', va='bottom', fontsize=8, color='grey')
         
         self.up_range = self.ax1.axhline(y=maxv, color='grey', linestyle='--')
         self.down_range = self.ax1.axhline(y=minv, color='grey', linestyle='--')
@@ -651,10 +704,54 @@ class StartPage(LabelFrame):
         
         self.fig.tight_layout()
 
+        # Elementy zmieniające się co klatkę - w trybie blit rysowane osobno
+        self.animated_artists = [self.line, self.current_data_line, self.last_data_text,
+                                 self.last_current_text, self.up_range_text, self.down_range_text]
+        for trace in self.device_traces:
+            self.animated_artists += [trace.temperature_line, trace.current_line]
+        for artist in self.animated_artists:
+            artist.set_animated(self.blit)
+
         self.canvas = FigureCanvasTkAgg(self.fig, master=self)
+        self.canvas.mpl_connect('draw_event', self.on_draw)
         self.canvas.draw()
         self.canvas.get_tk_widget().grid(row=0, column=0, sticky="nsew", rowspan=20)
     
+    def on_draw(self, event):
+        """Po pełnym przerysowaniu zapamiętuje tło i dorysowuje elementy animowane"""
+        if not self.blit:
+            return
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self.draw_animated()
+    
+    def draw_animated(self):
+        """Rysuje elementy animowane na bieżącym tle"""
+        for artist in self.animated_artists:
+            artist.axes.draw_artist(artist)
+    
+    def set_blit(self, enabled):
+        """Włącza lub wyłącza tryb rysowania blit"""
+        self.blit = bool(enabled)
+        for artist in self.animated_artists:
+            artist.set_animated(self.blit)
+        self.background = None
+        self.full_redraw = True
+        self.plot_limits = None
+    
+    def x_limits(self, last_time):
+        """Zwraca zakres osi czasu; w trybie blit przesuwany skokowo, by tło rzadko się zmieniało"""
+        if not self.blit:
+            return self.r, last_time
+        fold = bool(self.controller.graphFold)
+        if self.plot_limits is not None and self.plot_limits[3] == fold:
+            left, right = self.plot_limits[0]
+            if left <= last_time <= right:
+                return left, right
+        if fold:
+            right = last_time + FOLD_WINDOW / 4
+            return max(right - FOLD_WINDOW, 0), right
+        return self.r, max(last_time * 1.25, last_time + 1)
+    
     def setup_graph_ranges(self):
         """Aktualizuje zakresy wykresu według aktualnych ustawień temperatury"""
         try:
@@ -667,10 +764,12 @@ class StartPage(LabelFrame):
             self.down_range.set_ydata([minv])
             
             # Aktualizuj teksty
-            if len(self.time) > 0:
-                self.up_range_text.set_position((self.time[-1]*0.8, maxv))
+            latest = self.store.latest()
+            if latest is not None:
+                last_time = latest[TIME]
+                self.up_range_text.set_position((last_time*0.8, maxv))
                 self.up_range_text.set_text(f"max: {maxv:.1f}°C")
-                self.down_range_text.set_position((self.time[-1]*0.8, minv))
+                self.down_range_text.set_position((last_time*0.8, minv))
                 self.down_range_text.set_text(f"min: {minv:.1f}°C")
             
             # Wymusza odświeżenie wykresu
@@ -680,23 +779,17 @@ class StartPage(LabelFrame):
         except Exception as e:
             self.console_data(f"Błąd aktualizacji zakresów wykresu: {e}")
     
-    def process_new_data(self, new_data_list):
-        """Przetwarza nowe dane z komunikatora"""
-        if new_data_list:
-            self.console_data(f"Otrzymano {len(new_data_list)} nowych punktów danych")
+    def process_new_data(self, block):
+        """Przetwarza nowe próbki z komunikatora (kolumny x próbki)"""
+        # Śledzenie pojedynczych próbek jest domyślnie wyłączone (poziom DEBUG)
+        if not self.console_sink.enabled(DEBUG):
+            return
         
-        for data_item in new_data_list:
-            current_time = data_item['time']
-            
-            if data_item['type'] == 'temperature':
-                self.data.append(data_item['value'])
-                if len(self.time) < len(self.data):
-                    self.time.append(current_time)
-                self.console_data(f"Dodano temperaturę: {data_item['value']:.1f}°C w czasie {current_time:.2f}s")
-                    
-            elif data_item['type'] == 'current':
-                self.current.append(data_item['value'])
-                self.console_data(f"Dodano prąd: {data_item['value']:.3f}A w czasie {current_time:.2f}s")
+        self.console_data(f"Otrzymano {block.shape[1]} nowych próbek", DEBUG, 'batch')
+        
+        for current_time, temperature, current in zip(block[TIME].tolist(), block[TEMPERATURE].tolist(),
+                                                      block[CURRENT].tolist()):
+            self.console_data(f"Próbka: {temperature:.1f}°C, {current:.3f}A w czasie {current_time:.2f}s", DEBUG, 'sample')
     
     def change_current(self):
         """Zmienia stan prądu"""
@@ -707,20 +800,33 @@ class StartPage(LabelFrame):
         self.current_off_text.config(text=f"Prąd płynie: {bool(self.current_off_v.get())}")
         
         # Wyślij komendę do urządzenia
-        command = 'A' if config['current_off'] else 'a'
+        command = current_command(config['current_off'])
         self.controller.communicator.send_command(command)
         self.console_data(f"Zmiana stanu prądu: {'włączony' if config['current_off'] else 'wyłączony'}")
         
-    def console_data(self, message):
-        """Dodaje wiadomość do konsoli"""
-        timestamp = time.strftime("%H:%M:%S")
-        self.console.insert(INSERT, f'{timestamp}: {message}\n')
+    def console_data(self, message, level=INFO, category=None):
+        """Dodaje wiadomość do konsoli (wyświetlana w najbliższej klatce)"""
+        self.console_sink.log(message, level, category)
+    
+    def flush_console(self):
+        """Wpisuje zebrane komunikaty jedną operacją i przycina konsolę do limitu linii"""
+        lines = self.console_sink.drain()
+        if not lines:
+            return
+        self.console.insert(END, ''.join(lines))
+        excess = int(self.console.index('end-1c').split('.')[0]) - 1 - self.console_sink.max_lines
+        if excess > 0:
+            self.console.delete('1.0', f'{excess + 1}.0')
         self.console.see("end")
         
     def start_collect(self):
         """Rozpoczyna zbieranie danych do analizy"""
-        self.start = len(self.data) - 1
-        self.console_data(f'Test Start: {self.time[self.start]:.2f}s')
+        self.start = max(self.store.count - 1, 0)
+        if self.controller.recorder is not None:
+            from recording import FLAG_TEST_START
+            self.controller.recorder.mark(self.start, FLAG_TEST_START)
+        latest = self.store.latest()
+        self.console_data(f'Test Start: {latest[TIME] if latest else 0:.2f}s')
         
     def send_serial_data(self):
         """Wysyła dane temperatury do urządzenia"""
@@ -736,7 +842,7 @@ class StartPage(LabelFrame):
         self.sent_data_value = value
         
         # Wyślij komendę
-        command = f'*SETTPRS{self.sent_data_value};'
+        command = setpoint_command(self.sent_data_value)
         self.controller.communicator.send_command(command)
         self.console_data(f'Ustawiono temperaturę: {self.sent_data_value}°C')
         
@@ -744,6 +850,7 @@ class StartPage(LabelFrame):
         self.sent_data_line.set_ydata([self.sent_data_value])
         self.up_range.set_ydata([float(temp_range[1])])
         self.down_range.set_ydata([float(temp_range[0])])
+        self.full_redraw = True  # Linie zakresów są częścią tła
         self.set_data_label.config(text=f"Temp. zadana: {self.sent_data_value}°C")
         
         self.entry.delete(0, END)
@@ -751,55 +858,98 @@ class StartPage(LabelFrame):
     def update_graph(self):
         """Aktualizuje wykres"""
         try:
-            if len(self.data) == 0 or len(self.time) == 0:
+            if len(self.store) == 0:
                 return
+            
+            frame_start = time.perf_counter()
+            columns = self.store.columns()
+            times = columns['time']
+            data = columns['temperature']
+            current = columns['current']
                 
             current_time = f"{(time.time() - self.time_start):.2f}"
             
             # Ustaw zakres wyświetlania
-            if self.time[-1] > 20 and self.controller.graphFold:
-                self.r = self.time[-1] - 20
+            if times[-1] > FOLD_WINDOW and self.controller.graphFold:
+                self.r = times[-1] - FOLD_WINDOW
             elif not self.controller.graphFold:
                 self.r = 0.1
+            x_left, x_right = self.x_limits(times[-1])
             
-            # Aktualizuj linie wykresu
-            self.line.set_data(self.time, self.data)
+            # Aktualizuj linie wykresu (zdecymowane do ok. 2 punktów na piksel)
+            pixels = max(int(self.ax1.bbox.width), 100)
+            self.line.set_data(*self.temperature_decimator.update(self.store, x_left, x_right, pixels))
+            self.current_data_line.set_data(*self.current_decimator.update(self.store, x_left, x_right, pixels))
             
-            if len(self.time) == len(self.current) and len(self.current) > 0:
-                self.current_data_line.set_data(self.time, self.current)
-                
-                # Ustaw zakresy osi
-                self.ax1.set_xlim(self.r, self.time[-1])
-                self.ax1.set_ylim(min(self.data) - 5, max(self.data) + 5)
-                self.ax2.set_xlim(self.r, self.time[-1])
-                self.ax2.set_ylim(min(self.current) - 1, max(self.current) + 1)
-                
-                # Aktualizuj etykiety
-                temp_range = self.controller.temp.get().split(' /')
-                maxv = float(min(float(temp_range[1]), max(self.data) + 5))
-                minv = float(max(float(temp_range[0]), min(self.data) - 5))
-                
-                self.down_range_text.set_position((self.time[-1], maxv))
-                self.down_range_text.set_text(f"max: {maxv:.1f}°C")
-                self.up_range_text.set_position((self.time[-1], minv))
-                self.up_range_text.set_text(f"min: {minv:.1f}°C")
-                
-                self.last_data_text.set_position((self.time[-1] - 1, self.data[-1]))
-                self.last_data_text.set_text(f"{self.data[-1]:.1f}°C")
-                
-                self.last_current_text.set_position((self.time[-1] - 1, self.current[-1]))
-                self.last_current_text.set_text(f"{self.current[-1]:.2f}A")
-                
-                # Aktualizuj etykiety interfejsu
-                self.last_data_label.config(text=f"Temp. aktualna: {self.data[-1]:.1f}°C")
-                self.measure_time.config(text=f"Czas: {current_time}s")
-                self.changed_time.config(text=f'Czas od zmiany: {(time.time() - self.time_change):.1f}s')
-                
-            self.canvas.draw_idle()  # Używaj draw_idle() dla lepszej wydajności
+            # Zakresy osi według min/max widocznego okna lub całej historii
+            self.temperature_extrema.update(self.store)
+            self.current_extrema.update(self.store)
+            data_min, data_max = self.temperature_extrema.range(self.controller.graphFold)
+            current_min, current_max = self.current_extrema.range(self.controller.graphFold)
+            for trace in self.device_traces:
+                if trace.update(x_left, x_right, pixels):
+                    low, high = trace.temperature_extrema.range(self.controller.graphFold)
+                    data_min, data_max = min(data_min, low), max(data_max, high)
+                    low, high = trace.current_extrema.range(self.controller.graphFold)
+                    current_min, current_max = min(current_min, low), max(current_max, high)
+            limits = ((x_left, x_right), (data_min - 5, data_max + 5),
+                      (current_min - 1, current_max + 1), bool(self.controller.graphFold))
+            
+            # Aktualizuj etykiety
+            temp_range = self.controller.temp.get().split(' /')
+            maxv = float(min(float(temp_range[1]), data_max + 5))
+            minv = float(max(float(temp_range[0]), data_min - 5))
+            
+            self.down_range_text.set_position((times[-1], maxv))
+            self.down_range_text.set_text(f"max: {maxv:.1f}°C")
+            self.up_range_text.set_position((times[-1], minv))
+            self.up_range_text.set_text(f"min: {minv:.1f}°C")
+            
+            self.last_data_text.set_position((times[-1] - 1, data[-1]))
+            self.last_data_text.set_text(f"{data[-1]:.1f}°C")
+            
+            self.last_current_text.set_position((times[-1] - 1, current[-1]))
+            self.last_current_text.set_text(f"{current[-1]:.2f}A")
+            
+            # Aktualizuj etykiety interfejsu
+            self.set_label(self.last_data_label, f"Temp. aktualna: {data[-1]:.1f}°C")
+            self.set_label(self.measure_time, f"Czas: {current_time}s")
+            self.set_label(self.changed_time, f'Czas od zmiany: {(time.time() - self.time_change):.1f}s')
+            step = self.step_analyzer.update(self.store)
+            if step:
+                from analysis import step_text
+                self.set_label(self.step_label, step_text(step))
+            else:
+                self.set_label(self.step_label, "Skok nastawy: -")
+            
+            if self.blit and self.background is not None and not self.full_redraw and limits == self.plot_limits:
+                # Tło bez zmian - odtwórz je i narysuj tylko elementy animowane
+                self.canvas.restore_region(self.background)
+                self.draw_animated()
+                self.canvas.blit(self.fig.bbox)
+            else:
+                self.ax1.set_xlim(*limits[0])
+                self.ax1.set_ylim(*limits[1])
+                self.ax2.set_xlim(*limits[0])
+                self.ax2.set_ylim(*limits[2])
+                self.plot_limits = limits
+                self.full_redraw = False
+                self.canvas.draw()  # W trybie blit on_draw zapamięta nowe tło
+            
+            frame_ms = (time.perf_counter() - frame_start) * 1000
+            self.frame_time = frame_ms if self.frame_time == 0 else 0.9 * self.frame_time + 0.1 * frame_ms
+            self.set_label(self.frame_time_label, f"Czas klatki: {self.frame_time:.1f} ms ({'blit' if self.blit else 'pełne'}), "
+                                                  f"co {self.controller.scheduler.interval * 1000:.0f} ms")
             
         except Exception as e:
             self.console_data(f"Błąd aktualizacji wykresu: {e}")
 
+    def set_label(self, label, text):
+        """Zmienia tekst etykiety tylko wtedy, gdy jest inny niż wyświetlany"""
+        if self.label_texts.get(label) != text:
+            self.label_texts[label] = text
+            label.config(text=text)
+
     def validate_entry(self, value):
         """Waliduje wprowadzoną wartość"""
         if value == '' or value == '-':
@@ -872,15 +1022,99 @@ class Options(Toplevel):
         
         self.status_label = Label(self, text=f"Status: {status_text}", fg=status_color)
         self.status_label.grid(row=10, columnspan=3)
+        
+        # Częstotliwość próbkowania: osiągnięta / zadana
+        rate_text = self.controller.communicator.rate_report() if self.controller.connected else "-"
+        self.rate_label = Label(self, text=f"Próbkowanie: {rate_text}")
+        self.rate_label.grid(row=11, columnspan=3)
+        
+        # Tryb rysowania wykresu
+        self.blit_v = IntVar()
+        self.blit_v.set(self.controller.frame.blit)
+        self.blit_check = Checkbutton(self, variable=self.blit_v, onvalue=True, offvalue=False, command=self.change_blit)
+        self.blit_check.grid(row=12, column=1, sticky='w')
+        Label(self, text='Szybkie rysowanie (blit)').grid(row=12, column=0)
+        
+        # Poziom szczegółowości konsoli (DEBUG pokazuje każdą próbkę)
+        self.console_level = StringVar(self)
+        self.console_level.set(config.get('console_level', 'INFO'))
+        self.consoleMenu = OptionMenu(self, self.console_level, *LEVELS, command=self.change_console_level)
+        self.consoleMenu.grid(row=13, column=1, sticky='w')
+        Label(self, text='Poziom konsoli').grid(row=13, column=0)
+        
+        # Diagnostyka ścieżki akwizycji (te same metryki co pod /metrics)
+        self.diagnostics = LabelFrame(self, text="Diagnostyka")
+        self.diagnostics.grid(row=14, columnspan=3, sticky='ew')
+        self.diagnostics_label = Label(self.diagnostics, justify=LEFT, font=('Courier', 9))
+        self.diagnostics_label.pack(anchor='w')
+        self.update_diagnostics()
 
         for widget in self.winfo_children():
             widget.grid_configure(padx=5, pady=2)
+    
+    def update_diagnostics(self):
+        """Odświeża panel diagnostyki co sekundę, dopóki okno Opcji jest otwarte"""
+        if not self.winfo_exists():
+            return
+        self.diagnostics_label.config(text=self.diagnostics_text())
+        self.after(1000, self.update_diagnostics)
+    
+    @staticmethod
+    def diagnostics_text():
+        """Zwraca podsumowanie metryk do panelu diagnostyki"""
+        from metrics import registry
+        
+        def ms(histogram):
+            if histogram is None or histogram.count == 0:
+                return "brak danych"
+            return (f"p50 {histogram.percentile(50) * 1000:.1f} ms, p99 {histogram.percentile(99) * 1000:.1f} ms "
+                    f"({histogram.count})")
+        
+        def value(name, **labels):
+            metric = registry.get(name, **labels)
+            return metric.value if metric is not None else 0
+        
+        lines = []
+        for labels, _ in registry.series('kontroler_connected'):
+            port = labels['port']
+            lines.append(f"{port}: {'połączony' if value('kontroler_connected', port=port) else 'rozłączony'}, "
+                         f"{value('kontroler_samples_total', port=port)} próbek")
+            for query_labels, histogram in registry.series('kontroler_query_latency_seconds'):
+                if query_labels['port'] == port:
+                    kind = query_labels['type']
+                    lines.append(f"  {kind} {value('kontroler_query_rate_hz', port=port, type=kind):.1f} Hz, "
+                                 f"odpowiedź {ms(histogram)}, "
+                                 f"bez odpowiedzi {value('kontroler_query_timeouts_total', port=port, type=kind)}")
+            lines.append(f"  błędy: komunikacji {value('kontroler_comm_errors_total', port=port)}, "
+                         f"parsowania {value('kontroler_parse_errors_total', port=port)}, "
+                         f"nierozpoznane {value('kontroler_unknown_responses_total', port=port)}")
+            lines.append(f"  kolejka komend {value('kontroler_command_queue_depth', port=port)}, "
+                         f"zapytania w locie {value('kontroler_queries_in_flight', port=port)}, "
+                         f"pominięte próbki {value('kontroler_samples_dropped_total', port=port)}")
+            for command_labels, histogram in registry.series('kontroler_command_latency_seconds'):
+                if command_labels['port'] == port:
+                    lines.append(f"  komenda {command_labels['kind']}: kolejka→port {ms(histogram)}")
+            lines.append(f"  komendy zastąpione nowszymi {value('kontroler_commands_coalesced_total', port=port)}")
+        lines.append(f"Klatka: {ms(registry.get('kontroler_frame_seconds'))}, "
+                     f"pominięte {value('kontroler_frames_skipped_total')}")
+        lines.append(f"Opóźnienie pętli Tk: {ms(registry.get('kontroler_tk_lag_seconds'))}")
+        return "\n".join(lines)
             
     def change(self):
         """Zmienia ustawienie ciągłego wykresu"""
         self.controller.graphFold = bool(self.v.get())
         config['fold'] = bool(self.v.get())
     
+    def change_blit(self):
+        """Przełącza tryb rysowania blit"""
+        self.controller.frame.set_blit(self.blit_v.get())
+        config['blit'] = bool(self.blit_v.get())
+    
+    def change_console_level(self, level):
+        """Zmienia poziom komunikatów wyświetlanych w konsoli"""
+        self.controller.frame.console_sink.set_level(level)
+        config['console_level'] = level
+    
     def refresh_ports(self):
         """Odświeża listę dostępnych portów szeregowych"""
         try:
@@ -905,16 +1139,18 @@ class Options(Toplevel):
         """Zapisuje ustawienia"""
         try:
             # Wyślij ustawienia PID do urządzenia
-            pid_command = f'*SETCK{self.p.get():.1f} {self.i.get():.1f} {self.d.get():.1f};'
-            self.controller.communicator.send_command(pid_command)
+            self.controller.communicator.send_command(pid_command(self.p.get(), self.i.get(), self.d.get()))
             
             # Aktualizuj konfigurację
             self.controller.v = [self.p.get(), self.i.get(), self.d.get()]
             config['pid'] = self.controller.v
             config['port'] = self.controller.port.get()
             config['serial_port'] = self.controller.serial_port.get()
+            if config.get('serial_ports'):
+                config['serial_ports'][0] = config['serial_port']
             config['temp_range'] = self.controller.temp.get()
             config['fold'] = self.controller.graphFold
+            config['blit'] = self.controller.frame.blit
             
             # Zapisz do pliku
             with open('config.json', "w") as config_file:
@@ -927,6 +1163,291 @@ class Options(Toplevel):
             print(f"Błąd zapisywania konfiguracji: {e}")
             messagebox.showerror("Błąd", f"Nie udało się zapisać ustawień: {e}")
 
+class ExportDialog(Toplevel):
+    """Okno postępu zapisu wykonywanego w tle, z możliwością anulowania"""
+    
+    def __init__(self, parent, job, title, on_done):
+        Toplevel.__init__(self, parent)
+        self.job = job
+        self.on_done = on_done
+        self.title(title)
+        self.resizable(False, False)
+        self.protocol("WM_DELETE_WINDOW", self.cancel)
+        
+        self.label = Label(self, text="Zapisywanie: 0%")
+        self.label.grid(row=0, column=0, padx=10, pady=5)
+        
+        self.progress = ttk.Progressbar(self, length=300, maximum=100)
+        self.progress.grid(row=1, column=0, padx=10, pady=5)
+        
+        self.cancel_button = Button(self, text="Anuluj", command=self.cancel)
+        self.cancel_button.grid(row=2, column=0, padx=10, pady=5)
+        
+        self.job.start()
+        self.poll()
+    
+    def cancel(self):
+        """Przerywa zapis"""
+        self.job.cancel()
+        self.cancel_button.config(state=DISABLED)
+    
+    def poll(self):
+        """Aktualizuje pasek postępu do zakończenia zapisu"""
+        percent = self.job.progress * 100
+        self.progress['value'] = percent
+        self.label.config(text=f"Zapisywanie: {percent:.0f}%")
+        if self.job.done:
+            self.destroy()
+            self.on_done(self.job)
+        else:
+            self.after(100, self.poll)
+
+class HistoryWindow(Toplevel):
+    """Przeglądanie historii bieżącego pomiaru lub nagrania (przesuwanie, przybliżanie, odczyt kursora).
+
+    Wczytywany jest tylko widoczny zakres w rozdzielczości wykresu; sąsiednie zakresy
+    wczytuje z wyprzedzeniem wątek w tle, więc akwizycja w głównym oknie trwa dalej.
+    """
+    
+    def __init__(self, parent, controller):
+        Toplevel.__init__(self, parent)
+        self.controller = controller
+        self.title("Historia pomiaru")
+        self.protocol("WM_DELETE_WINDOW", self.close)
+        self.grid_rowconfigure(1, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+        
+        from history import ChunkCache, Prefetcher, StoreHistory
+        self.cache = ChunkCache(config.get('history_cache_mb', 64) * 1024 ** 2)
+        self.prefetcher = Prefetcher(
+            console_func=lambda message: controller.frame.console_data(message, WARNING, 'historia'))
+        self.sources = [StoreHistory(store, "Bieżący pomiar" if number == 1 else f"Bieżący pomiar {number}")
+                        for number, store in enumerate(controller.stores, start=1)]
+        self.source = self.sources[0]
+        self.view = (0.0, 1.0)  # Widoczny zakres czasu [s]
+        self.follow = 'all'     # 'all' - cały pomiar, 'end' - widok przy najnowszej próbce, None - stały
+        self.drag = None        # (x piksela, widok) na początku przeciągania
+        self.x = None           # Czasy kubełków ostatnio wczytanego zakresu
+        
+        # Pasek narzędzi: źródło, zakres czasu, przesuwanie i przybliżanie
+        bar = Frame(self)
+        bar.grid(row=0, column=0, sticky='ew')
+        self.source_name = StringVar(self, self.source.name)
+        self.source_combo = ttk.Combobox(bar, textvariable=self.source_name, state="readonly", width=32,
+                                         values=[source.name for source in self.sources])
+        self.source_combo.bind("<<ComboboxSelected>>", lambda e: self.set_source(self.source_combo.current()))
+        self.source_combo.pack(side=LEFT)
+        Button(bar, text="Otwórz nagranie...", command=self.open_recording).pack(side=LEFT)
+        Label(bar, text="Od [s]:").pack(side=LEFT)
+        self.from_entry = Entry(bar, width=10)
+        self.from_entry.pack(side=LEFT)
+        Label(bar, text="Do [s]:").pack(side=LEFT)
+        self.to_entry = Entry(bar, width=10)
+        self.to_entry.pack(side=LEFT)
+        for entry in (self.from_entry, self.to_entry):
+            entry.bind("<Return>", lambda e: self.apply_range())
+        Button(bar, text="Pokaż", command=self.apply_range).pack(side=LEFT)
+        Button(bar, text="Całość", command=self.show_all).pack(side=LEFT)
+        Button(bar, text="◀", command=lambda: self.pan(-0.5)).pack(side=LEFT)
+        Button(bar, text="▶", command=lambda: self.pan(0.5)).pack(side=LEFT)
+        Button(bar, text="+", command=lambda: self.zoom(0.5)).pack(side=LEFT)
+        Button(bar, text="−", command=lambda: self.zoom(2.0)).pack(side=LEFT)
+        for widget in bar.winfo_children():
+            widget.pack_configure(padx=2, pady=2)
+        
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        self.fig = Figure(figsize=(8, 4), dpi=100)
+        self.fig.patch.set_facecolor('#F0F0F0')
+        self.ax1 = self.fig.add_subplot(1, 1, 1)
+        self.ax2 = self.ax1.twinx()
+        self.ax1.grid()
+        self.temperature_line, = self.ax1.plot([], [], 'g', label='Temperatura')
+        self.setpoint_line, = self.ax1.plot([], [], 'r--', label='Zadana')
+        self.current_line, = self.ax2.plot([], [], 'orange', label='Prąd')
+        self.cursor_line = self.ax1.axvline(x=0, color='grey', linewidth=0.8, visible=False)
+        self.ax1.set_ylabel('Temperatura (°C)')
+        self.ax2.set_ylabel('Prąd (A)')
+        self.ax1.set_xlabel('Czas (s)')
+        self.ax1.legend(loc='upper left')
+        self.ax2.legend(loc='upper right')
+        self.fig.tight_layout()
+        
+        self.canvas = FigureCanvasTkAgg(self.fig, master=self)
+        self.canvas.get_tk_widget().grid(row=1, column=0, sticky='nsew')
+        self.canvas.mpl_connect('scroll_event', self.on_scroll)
+        self.canvas.mpl_connect('button_press_event', self.on_press)
+        self.canvas.mpl_connect('motion_notify_event', self.on_motion)
+        self.canvas.mpl_connect('button_release_event', self.on_release)
+        
+        self.readout = Label(self, anchor='w', font=('Courier', 9))
+        self.readout.grid(row=2, column=0, sticky='ew', padx=5)
+        self.status = Label(self, anchor='w', fg='grey')
+        self.status.grid(row=3, column=0, sticky='ew', padx=5)
+        
+        self.show_all()
+        self.tick()
+    
+    def set_source(self, number):
+        """Przełącza źródło historii i pokazuje cały jego zakres"""
+        self.source = self.sources[number]
+        self.source_name.set(self.source.name)
+        self.show_all()
+    
+    def open_recording(self):
+        """Dodaje nagranie (.kbin) lub zapisany pomiar (data.json, data.csv) jako źródło historii"""
+        from history import RecordingHistory
+        from recording import DEFAULT_RECORDING_DIR
+        path = filedialog.askopenfilename(parent=self, initialdir=config.get('recording_dir', DEFAULT_RECORDING_DIR),
+                                          filetypes=[("Pomiary", "*.kbin *.json *.csv"), ("Wszystkie pliki", "*.*")])
+        if not path:
+            return
+        try:
+            source = RecordingHistory(path, self.cache)
+        except Exception as e:
+            messagebox.showerror("Błąd", f"Nie udało się wczytać pomiaru:\n{e}", parent=self)
+            return
+        self.sources.append(source)
+        self.source_combo.config(values=[source.name for source in self.sources])
+        self.set_source(len(self.sources) - 1)
+    
+    def live(self):
+        from history import StoreHistory
+        return isinstance(self.source, StoreHistory)
+    
+    def show_all(self):
+        """Pokazuje cały zakres źródła (na żywo - rosnący razem z pomiarem)"""
+        time_range = self.source.time_range()
+        if time_range is not None:
+            self.view = (time_range[0], max(time_range[1], time_range[0] + 1))
+        self.follow = 'all' if self.live() else None
+        self.refresh()
+    
+    def set_view(self, t0, t1):
+        """Ustawia zakres ręcznie; widok sięgający najnowszej próbki dalej za nią podąża"""
+        self.view = (t0, t1)
+        time_range = self.source.time_range()
+        self.follow = 'end' if self.live() and time_range is not None and t1 >= time_range[1] else None
+        self.refresh()
+    
+    def apply_range(self):
+        """Pokazuje zakres wpisany w polach Od/Do"""
+        try:
+            t0, t1 = float(self.from_entry.get()), float(self.to_entry.get())
+        except ValueError:
+            messagebox.showerror("Błąd", "Podaj zakres czasu w sekundach", parent=self)
+            return
+        if t1 <= t0:
+            messagebox.showerror("Błąd", "Koniec zakresu musi być późniejszy niż początek", parent=self)
+            return
+        self.set_view(t0, t1)
+    
+    def pan(self, fraction):
+        """Przesuwa widok o ułamek jego szerokości (ujemny - w lewo)"""
+        t0, t1 = self.view
+        shift = (t1 - t0) * fraction
+        self.set_view(t0 + shift, t1 + shift)
+    
+    def zoom(self, factor, center=None):
+        """Zmienia szerokość widoku factor razy wokół center (domyślnie środka)"""
+        t0, t1 = self.view
+        center = (t0 + t1) / 2 if center is None else center
+        self.set_view(center - (center - t0) * factor, center + (t1 - center) * factor)
+    
+    def tick(self):
+        """Co sekundę dokłada nowe próbki, gdy widok podąża za bieżącym pomiarem"""
+        if not self.winfo_exists():
+            return
+        if self.follow and self.drag is None:
+            time_range = self.source.time_range()
+            if time_range is not None:
+                if self.follow == 'all':
+                    self.view = (time_range[0], max(time_range[1], time_range[0] + 1))
+                else:
+                    width = self.view[1] - self.view[0]
+                    self.view = (time_range[1] - width, time_range[1])
+                self.refresh()
+        self.after(1000, self.tick)
+    
+    def refresh(self):
+        """Wczytuje widoczny zakres i przerysowuje wykres"""
+        from history import value_range
+        t0, t1 = self.view
+        pixels = max(int(self.ax1.bbox.width), 100)
+        started = time.perf_counter()
+        lows, highs = self.source.load(t0, t1, pixels)
+        elapsed = time.perf_counter() - started
+        self.prefetcher.request(self.source, t0, t1, pixels)
+        
+        self.lows, self.highs = lows, highs
+        self.x = (lows[TIME] + highs[TIME]) / 2
+        self.temperature_line.set_data(*envelope_points(self.x, lows[TEMPERATURE], self.x, highs[TEMPERATURE]))
+        self.current_line.set_data(*envelope_points(self.x, lows[CURRENT], self.x, highs[CURRENT]))
+        self.setpoint_line.set_data(self.x, highs[SETPOINT])
+        self.ax1.set_xlim(t0, t1)
+        temperature_range = value_range(lows, highs, TEMPERATURE)
+        if temperature_range is not None:
+            self.ax1.set_ylim(temperature_range[0] - 1, temperature_range[1] + 1)
+        current_range = value_range(lows, highs, CURRENT)
+        if current_range is not None:
+            self.ax2.set_ylim(current_range[0] - 0.5, current_range[1] + 0.5)
+        self.canvas.draw_idle()
+        
+        try:
+            focused = self.focus_get()
+        except KeyError:  # Fokus na rozwiniętej liście Combobox
+            focused = None
+        for entry, value in ((self.from_entry, t0), (self.to_entry, t1)):
+            if focused is not entry:
+                entry.delete(0, END)
+                entry.insert(0, f"{value:.1f}")
+        self.status.config(text=f"{self.source.describe()} | punkty: {len(self.x)} | wczytanie: "
+                                f"{elapsed * 1000:.1f} ms | pamięć podręczna: {self.cache.describe()}")
+    
+    def on_scroll(self, event):
+        """Kółko myszy przybliża i oddala wokół kursora"""
+        if event.xdata is not None:
+            self.zoom(0.8 if event.button == 'up' else 1.25, event.xdata)
+    
+    def on_press(self, event):
+        if event.button == 1 and event.inaxes is not None:
+            self.drag = (event.x, self.view)
+    
+    def on_motion(self, event):
+        """Przeciąganie przesuwa widok; bez przeciągania - odczyt wartości pod kursorem"""
+        if self.drag is not None:
+            x, (t0, t1) = self.drag
+            shift = (x - event.x) / max(self.ax1.bbox.width, 1) * (t1 - t0)
+            self.set_view(t0 + shift, t1 + shift)
+            return
+        if event.inaxes is None or self.x is None or len(self.x) == 0:
+            return
+        from history import nearest
+        index = nearest(self.x, event.xdata)
+        
+        def value(column, unit, digits):
+            low, high = self.lows[column, index], self.highs[column, index]
+            if low != low or high != high:
+                return "brak"  # NaN, np. nastawa przed pierwszą odpowiedzią TPRS
+            if low == high:
+                return f"{low:.{digits}f}{unit}"
+            return f"{low:.{digits}f}–{high:.{digits}f}{unit}"
+        self.readout.config(text=f"Czas: {self.x[index]:.2f} s   Temperatura: {value(TEMPERATURE, '°C', 2)}   "
+                                 f"Prąd: {value(CURRENT, ' A', 3)}   Nastawa: {value(SETPOINT, '°C', 1)}")
+        self.cursor_line.set_xdata([self.x[index]])
+        self.cursor_line.set_visible(True)
+        self.canvas.draw_idle()
+    
+    def on_release(self, event):
+        self.drag = None
+    
+    def close(self):
+        """Kończy wątek wczytywania z wyprzedzeniem i zwalnia nagrania"""
+        self.prefetcher.stop()
+        for source in self.sources:
+            source.close()
+        self.destroy()
+
 class StreamToFunction:
     """Klasa do przekierowywania stdout - zachowana dla kompatybilności"""
     def __init__(self, func):
@@ -988,24 +1509,17 @@ if __name__ == "__main__":
     if not check_dependencies():
         sys.exit(1)
     
+    import argparse
+    parser = argparse.ArgumentParser(description="Kontroler Temperatury - Fotonika")
+    parser.add_argument('--profile-startup', action='store_true', help="wypisz czasy etapów uruchamiania")
+    parser.add_argument('--replay', metavar='PLIK', help="odtwórz zapisany pomiar (data.json, data.csv, .kbin) zamiast urządzenia")
+    parser.add_argument('--speed', type=float, default=1.0, help="prędkość odtwarzania (1 - czas rzeczywisty, 0 - maksymalna)")
+    args = parser.parse_args()
+    
     try:
-        # Sprawdzenie pliku konfiguracyjnego
-        if not os.path.exists("config.json"):
-            print("Brak pliku config.json - tworzenie domyślnego")
-            default_config = {
-                "port": "9600",
-                "serial_port": get_default_serial_port(),
-                "temp_range": "-10 /+50", 
-                "fold": True,
-                "pid": [6, 7, 4],
-                "current_off": False
-            }
-            with open("config.json", "w") as f:
-                json.dump(default_config, f, indent=4)
-        
         # Utwórz i uruchom aplikację
-        window = App()
-        window.title("Kontroler Temperatury - Fotonika")
+        window = App(replay=args.replay, replay_speed=args.speed)
+        window.title("Kontroler Temperatury - Fotonika" + (f" - odtwarzanie {args.replay}" if args.replay else ""))
         window.protocol("WM_DELETE_WINDOW", lambda: window.on_closing())
         
         # Utwórz menu
@@ -1018,10 +1532,14 @@ if __name__ == "__main__":
         fileMenu.add_command(label="Eksportuj konfigurację", command=lambda: window.export_config())
         fileMenu.add_separator()
         fileMenu.add_command(label="Eksportuj dane do CSV", command=lambda: window.export_csv())
+        fileMenu.add_command(label="Historia pomiaru", command=lambda: HistoryWindow(window.container, window))
+        fileMenu.add_checkbutton(label="Profilowanie", variable=window.profiling,
+                                 command=lambda: window.toggle_profiling())
         fileMenu.add_separator()
         fileMenu.add_command(label="Zapisz i zamknij", command=lambda: window.on_closing())
         menu.add_cascade(label="Plik", menu=fileMenu)
         
+        profiler.milestone('start pętli zdarzeń')
         print("Aplikacja uruchomiona pomyślnie")
         window.mainloop()
         
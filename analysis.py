@@ -0,0 +1,222 @@
+"""Analiza odpowiedzi skokowej: czas narastania, przeregulowanie, czas ustalania, uchyb ustalony
+
+Pomiar dzielony jest na skoki w miejscach zmiany nastawy (kolumna setpoint zapisywana
+z każdą próbką). Wskaźniki wszystkich skoków liczone są naraz operacjami NumPy
+(searchsorted, reduceat, cumsum) - bez pętli po próbkach ani po skokach.
+
+Definicje (A - wielkość skoku, y0 - temperatura tuż przed zmianą nastawy):
+- czas narastania: od przekroczenia y0 + 10% A do przekroczenia y0 + 90% A,
+- przeregulowanie: największe przekroczenie nastawy w kierunku skoku, w % A,
+- czas ustalania: od zmiany nastawy do chwili, od której temperatura pozostaje w paśmie
+  max(2% |A|, 0.1°C) wokół nastawy (NaN, jeśli do końca skoku nie pozostała),
+- uchyb ustalony: średnia (nastawa - temperatura) z ostatnich 10 s skoku.
+
+Uruchomienie: python3 analysis.py nagrania/nagranie-<data>.kbin [--csv wyniki.csv]
+Pliki data.json/data.csv nie mają nastawy - dla nich --setpoint T traktuje cały pomiar
+jako jeden skok do T.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from samplestore import TIME, TEMPERATURE, SETPOINT
+
+DEFAULT_BAND = 0.02        # Pasmo ustalania jako ułamek wielkości skoku
+DEFAULT_TOLERANCE = 0.1    # Najwęższe pasmo ustalania [°C] (szum czujnika)
+DEFAULT_TAIL = 10.0        # Końcówka skoku do uchybu ustalonego [s]
+DEFAULT_MIN_STEP = 0.1     # Mniejsze zmiany nastawy nie są analizowane [°C]
+LIVE_INTERVAL = 1.0        # Co ile sekund przeliczać bieżący skok [s]
+
+STEP_FIELDS = ('start', 'end', 'initial', 'setpoint', 'rise_time', 'overshoot',
+               'settling_time', 'steady_state_error')
+STEP_HEADER = ('Początek [s]', 'Koniec [s]', 'Temp. początkowa [°C]', 'Nastawa [°C]',
+               'Czas narastania [s]', 'Przeregulowanie [%]', 'Czas ustalania [s]', 'Uchyb ustalony [°C]')
+
+
+def setpoint_changes(setpoint):
+    """Zwraca numery próbek, od których obowiązuje nowa nastawa (bez próbek z nieznaną nastawą)"""
+    setpoint = np.asarray(setpoint)
+    previous, current = setpoint[:-1], setpoint[1:]
+    changed = (current != previous) & ~np.isnan(current) & ~np.isnan(previous)
+    return np.flatnonzero(changed) + 1
+
+
+def _first_true(positions, lower, upper):
+    """Dla każdego przedziału [lower, upper) zwraca pierwszą pozycję z positions albo -1"""
+    found = np.searchsorted(positions, lower)
+    result = np.full(len(lower), -1)
+    inside = found < len(positions)
+    inside[inside] = positions[found[inside]] < upper[inside]
+    result[inside] = positions[found[inside]]
+    return result
+
+
+def _last_true(positions, lower, upper):
+    """Dla każdego przedziału [lower, upper) zwraca ostatnią pozycję z positions albo -1"""
+    found = np.searchsorted(positions, upper) - 1
+    result = np.full(len(lower), -1)
+    inside = found >= 0
+    inside[inside] = positions[found[inside]] >= lower[inside]
+    result[inside] = positions[found[inside]]
+    return result
+
+
+def analyze_steps(times, temperature, setpoint, starts=None, band=DEFAULT_BAND, tolerance=DEFAULT_TOLERANCE,
+                  tail=DEFAULT_TAIL, min_step=DEFAULT_MIN_STEP):
+    """Zwraca słownik tablic (po jednym elemencie na skok) z kluczami STEP_FIELDS.
+
+    starts - numery próbek początku skoków (domyślnie zmiany nastawy); skok trwa do
+    następnego początku albo końca danych. Początki bez poprzedniej próbki lub poza danymi
+    są pomijane. Czasy w sekundach względem początku skoku.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    temperature = np.asarray(temperature, dtype=np.float64)
+    setpoint = np.asarray(setpoint, dtype=np.float64)
+    starts = setpoint_changes(setpoint) if starts is None else np.asarray(starts, dtype=np.intp)
+    starts = starts[(starts >= 1) & (starts < len(times))]
+    ends = np.append(starts[1:], len(times)).astype(np.intp)
+
+    initial = temperature[starts - 1]
+    target = setpoint[starts]
+    amplitude = target - initial
+    keep = np.abs(amplitude) >= min_step
+    starts, ends, initial, target, amplitude = starts[keep], ends[keep], initial[keep], target[keep], amplitude[keep]
+    if len(starts) == 0:
+        return {name: np.empty(0) for name in STEP_FIELDS}
+
+    # Próbki wszystkich skoków jedna za drugą: offsets - początek skoku w tej tablicy
+    lengths = ends - starts
+    offsets = np.cumsum(lengths) - lengths
+    limits = offsets + lengths
+    index = np.arange(lengths.sum()) + np.repeat(starts - offsets, lengths)
+    t = times[index]
+    y = temperature[index]
+    t0 = times[starts]
+
+    # Odpowiedź znormalizowana: 0 na początku skoku, 1 na nastawie
+    response = (y - np.repeat(initial, lengths)) / np.repeat(amplitude, lengths)
+    t10 = _first_true(np.flatnonzero(response >= 0.1), offsets, limits)
+    t90 = _first_true(np.flatnonzero(response >= 0.9), offsets, limits)
+    rise_time = np.where((t10 >= 0) & (t90 >= 0), t[t90] - t[t10], np.nan)
+    overshoot = np.maximum(np.maximum.reduceat(response, offsets) - 1.0, 0.0) * 100.0
+
+    # Ustalenie: ostatnia próbka poza pasmem; jeśli to ostatnia próbka skoku - jeszcze nie ustalono
+    error = np.repeat(target, lengths) - y
+    width = np.maximum(band * np.abs(amplitude), tolerance)
+    last_outside = _last_true(np.flatnonzero(np.abs(error) > np.repeat(width, lengths)), offsets, limits)
+    settled_at = np.where(last_outside >= 0, last_outside + 1, offsets)
+    settling_time = np.full(len(starts), np.nan)
+    settled = settled_at < limits
+    settling_time[settled] = t[settled_at[settled]] - t0[settled]
+
+    # Uchyb ustalony: średnia z końcówki skoku przez sumy skumulowane
+    sums = np.concatenate(([0.0], np.cumsum(error)))
+    tail_start = np.maximum(np.searchsorted(t, t[limits - 1] - tail, side='left'), offsets)
+    steady_state_error = (sums[limits] - sums[tail_start]) / (limits - tail_start)
+
+    return {
+        'start': t0,
+        'end': t[limits - 1],
+        'initial': initial,
+        'setpoint': target,
+        'rise_time': rise_time,
+        'overshoot': overshoot,
+        'settling_time': settling_time,
+        'steady_state_error': steady_state_error,
+    }
+
+
+def step_text(step):
+    """Jednoliniowy opis skoku (słownik z wartościami STEP_FIELDS)"""
+    def seconds(value):
+        return f"{value:.1f} s" if np.isfinite(value) else "-"
+    settling = seconds(step['settling_time']) if np.isfinite(step['settling_time']) else "trwa"
+    return (f"Skok {step['initial']:.1f}→{step['setpoint']:.1f}°C: narastanie {seconds(step['rise_time'])}, "
+            f"przeregulowanie {step['overshoot']:.1f}%, ustalanie {settling}, "
+            f"uchyb {step['steady_state_error']:+.2f}°C")
+
+
+class StepAnalyzer:
+    """Wskaźniki bieżącego skoku liczone na żywym buforze (SampleStore) dla StartPage"""
+
+    def __init__(self, interval=LIVE_INTERVAL, clock=time.monotonic, **params):
+        self.interval = interval
+        self.clock = clock
+        self.params = params
+        self.scanned = 0       # Do której próbki szukano zmian nastawy
+        self.change = None     # Numer próbki ostatniej zmiany nastawy
+        self.result = None
+        self._next = 0.0
+
+    def reset(self):
+        self.scanned = 0
+        self.change = None
+        self.result = None
+        self._next = 0.0
+
+    def update(self, store):
+        """Zwraca słownik wskaźników bieżącego skoku albo None (przeliczany co interval)"""
+        now = self.clock()
+        if now < self._next:
+            return self.result
+        self._next = now + self.interval
+
+        # Nowe zmiany nastawy - przeglądane są tylko próbki od poprzedniego wywołania
+        count = store.count
+        first = max(self.scanned - 1, store.first_index)
+        changes = setpoint_changes(store.window(first, count)[SETPOINT])
+        if len(changes):
+            self.change = first + int(changes[-1])
+        self.scanned = count
+
+        if self.change is None or self.change - 1 < store.first_index:
+            self.result = None
+            return None
+        block = store.window(self.change - 1, count)
+        steps = analyze_steps(block[TIME], block[TEMPERATURE], block[SETPOINT], starts=[1], **self.params)
+        self.result = {name: float(values[-1]) for name, values in steps.items()} if len(steps['start']) else None
+        return self.result
+
+
+def write_steps_csv(path, steps):
+    """Zapisuje wskaźniki skoków w układzie CSV aplikacji (separator ';')"""
+    table = np.column_stack([steps[name] for name in STEP_FIELDS])
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        file.write(';'.join(STEP_HEADER) + '\n')
+        np.savetxt(file, table, delimiter=';', fmt='%.4f')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analiza odpowiedzi skokowej zapisanego pomiaru")
+    parser.add_argument('path', help="pomiar (.kbin, data.json lub data.csv)")
+    parser.add_argument('--setpoint', type=float, help="nastawa dla plików bez kolumny nastawy (jeden skok)")
+    parser.add_argument('--band', type=float, default=DEFAULT_BAND, help="pasmo ustalania (ułamek skoku)")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help="najwęższe pasmo ustalania [°C]")
+    parser.add_argument('--tail', type=float, default=DEFAULT_TAIL, help="końcówka skoku do uchybu ustalonego [s]")
+    parser.add_argument('--csv', help="zapisz wyniki do pliku CSV")
+    args = parser.parse_args()
+
+    from recording import load_measurement
+    records, _ = load_measurement(args.path)
+    setpoint = records['setpoint'].astype(np.float64)
+    starts = None
+    if args.setpoint is not None:
+        setpoint = np.full(len(records), args.setpoint)
+        starts = [1]
+    elif np.isnan(setpoint).all():
+        parser.error("plik nie zawiera nastawy - podaj --setpoint")
+
+    steps = analyze_steps(records['time'], records['temperature'], setpoint, starts=starts,
+                          band=args.band, tolerance=args.tolerance, tail=args.tail)
+    for number in range(len(steps['start'])):
+        step = {name: values[number] for name, values in steps.items()}
+        print(f"{number + 1:>3}. t={step['start']:.1f} s  {step_text(step)}")
+    print(f"Skoki: {len(steps['start'])}")
+    if args.csv:
+        write_steps_csv(args.csv, steps)
+        print(f"Zapisano: {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
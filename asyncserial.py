@@ -0,0 +1,249 @@
+"""Transport asyncio dla protokołu kontrolera
+
+Port szeregowy jest otwierany bez blokowania (timeout=0), a jego deskryptor obsługuje
+pętla zdarzeń (loop.add_reader/add_writer) - nie ma wątku ani readline() z limitem czasu.
+Zapytania *GET...; czekają na odpowiedź przez `await transport.query(...)` z własnym
+limitem czasu; odpowiedzi przypisywane są do najstarszego oczekującego zapytania danego
+typu (urządzenie odpowiada w kolejności zapytań). Odpowiedzi bez zapytania trafiają do
+funkcji on_unsolicited.
+
+Zapytanie, które przekroczyło czas, zostawia w kolejce znacznik ważny przez late_window s:
+spóźniona odpowiedź trafia na znacznik i jest odrzucana, a nowe zapytania tego typu czekają
+z wysłaniem, aż znaczniki wygasną - inaczej każda następna wartość pochodziłaby z poprzedniego
+zapytania. Zniekształcona odpowiedź kończy najstarsze zapytanie wyjątkiem ValueError.
+
+Przykład:
+
+    transport = await AsyncTransport.open('/dev/ttyUSB0', 9600)
+    temperatura = await transport.query('*GETTACT;', timeout=0.5)
+    await run_polling(transport, PollingEngine({'TACT': 20}), print)
+
+Uruchomienie z wiersza poleceń: python3 asyncserial.py PORT '*GETTACT;' '*GETIOUT;'
+
+Wymaga pętli z add_reader (Linux, macOS); na Windows pozostaje SerialCommunicator.
+"""
+import argparse
+import asyncio
+import os
+import time
+from collections import deque
+
+from protocol import FrameParser, response_type
+
+DEFAULT_QUERY_TIMEOUT = 0.5   # Limit czasu odpowiedzi [s]
+DEFAULT_LATE_WINDOW = 0.5     # Jak długo po przekroczeniu czasu może jeszcze przyjść odpowiedź [s]
+
+
+class AsyncTransport:
+    """Nieblokujący transport protokołu kontrolera oparty na pętli asyncio"""
+
+    def __init__(self, fd, loop=None, connection=None, on_unsolicited=None, late_window=DEFAULT_LATE_WINDOW):
+        self.fd = fd
+        self.loop = loop or asyncio.get_running_loop()
+        self.connection = connection  # Obiekt serial.Serial (zamykany razem z transportem)
+        self.on_unsolicited = on_unsolicited
+        self.late_window = late_window
+        self.closed = False
+        self.late_replies = 0  # Odrzucone odpowiedzi na zapytania, które przekroczyły czas
+        self.parser = FrameParser()
+        self._tx = bytearray()
+        self._waiters = {}  # typ odpowiedzi -> deque [Future, ważność znacznika] w kolejności zapytań
+        os.set_blocking(fd, False)
+        self.loop.add_reader(fd, self._on_readable)
+
+    @classmethod
+    async def open(cls, port, baud_rate=9600, on_unsolicited=None):
+        """Otwiera port szeregowy w trybie nieblokującym"""
+        import serial
+        connection = serial.Serial(port, baud_rate, timeout=0, write_timeout=0)
+        try:
+            fd = connection.fileno()
+        except AttributeError:
+            connection.close()
+            raise NotImplementedError("Port bez deskryptora pliku - użyj SerialCommunicator")
+        return cls(fd, asyncio.get_running_loop(), connection, on_unsolicited)
+
+    def send(self, command):
+        """Wysyła komendę bez czekania na odpowiedź (np. *SETTPRS, A/a)"""
+        if self.closed:
+            raise ConnectionError("Transport zamknięty")
+        pending = bool(self._tx)
+        self._tx += command.encode('Latin-1')
+        if not pending:
+            self._on_writable()
+
+    async def query(self, command, timeout=DEFAULT_QUERY_TIMEOUT):
+        """Wysyła zapytanie *GET...; i zwraca wartość odpowiedzi (TimeoutError po timeout s)"""
+        kind = response_type(command)
+        if kind is None:
+            raise ValueError(f"Komenda {command!r} nie oczekuje odpowiedzi")
+        deadline = self.loop.time() + timeout
+        waiters = self._waiters.setdefault(kind, deque())
+        while True:
+            # Nie wysyłaj, dopóki może przyjść spóźniona odpowiedź na wcześniejsze zapytanie
+            quiet = max((expires for _, expires in waiters if expires is not None), default=0.0)
+            now = self.loop.time()
+            if quiet <= now:
+                break
+            if quiet >= deadline:
+                await asyncio.sleep(deadline - now)
+                raise asyncio.TimeoutError
+            await asyncio.sleep(quiet - now)
+
+        entry = [self.loop.create_future(), None]
+        waiters.append(entry)
+        sent = False
+        try:
+            self.send(command)
+            sent = True
+            return await asyncio.wait_for(entry[0], deadline - self.loop.time())
+        finally:
+            if entry in waiters:
+                if sent:
+                    entry[1] = self.loop.time() + self.late_window  # Znacznik na spóźnioną odpowiedź
+                else:
+                    waiters.remove(entry)
+
+    def close(self):
+        """Zamyka transport i przerywa oczekujące zapytania"""
+        if self.closed:
+            return
+        self.closed = True
+        self.loop.remove_reader(self.fd)
+        self.loop.remove_writer(self.fd)
+        for waiters in self._waiters.values():
+            for future, _ in waiters:
+                if not future.done():
+                    future.set_exception(ConnectionError("Transport zamknięty"))
+        self._waiters.clear()
+        if self.connection is not None:
+            self.connection.close()
+
+    def _on_writable(self):
+        try:
+            written = os.write(self.fd, self._tx)
+        except BlockingIOError:
+            written = 0
+        except OSError as e:
+            self._fail(e)
+            return
+        del self._tx[:written]
+        if self._tx:
+            self.loop.add_writer(self.fd, self._on_writable)
+        else:
+            self.loop.remove_writer(self.fd)
+
+    def _on_readable(self):
+        try:
+            data = os.read(self.fd, 4096)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            self._fail(e)
+            return
+        if not data:
+            self._fail(ConnectionError("Port zamknięty"))
+            return
+
+        for kind, value, frame in self.parser.feed(data):
+            self._dispatch(kind, value, frame)
+
+    def _dispatch(self, kind, value, frame):
+        parsed = (kind, value) if kind is not None and value is not None else None
+        waiters = self._waiters.get(kind) if kind is not None else None
+        now = self.loop.time()
+        while waiters:
+            future, expires = waiters.popleft()
+            if expires is not None and expires < now:
+                continue  # Odpowiedź na to zapytanie już nie przyjdzie
+            if expires is not None or future.done():
+                # Spóźniona odpowiedź na zapytanie, które przekroczyło czas
+                self.late_replies += 1
+                return
+            if value is None:
+                future.set_exception(ValueError(f"Zniekształcona odpowiedź {frame.decode('Latin-1').strip()!r}"))
+            else:
+                future.set_result(value)
+            return
+        if self.on_unsolicited:
+            self.on_unsolicited(frame.decode('Latin-1').strip(), parsed)
+
+    def _fail(self, error):
+        for waiters in self._waiters.values():
+            for future, _ in waiters:
+                if not future.done():
+                    future.set_exception(error)
+        self.close()
+
+
+async def run_polling(transport, engine, handler, stop=None):
+    """Odpytuje urządzenie według PollingEngine; handler(typ, wartość, czas) dla każdej odpowiedzi.
+
+    Działa do ustawienia zdarzenia stop (asyncio.Event) lub zamknięcia transportu.
+    """
+    wake = asyncio.Event()
+
+    async def poll_one(command, kind):
+        try:
+            value = await transport.query(command, engine.response_timeout)
+        except (asyncio.TimeoutError, ConnectionError):
+            return  # Przekroczenia czasu liczy engine.expire
+        except ValueError:
+            engine.on_response(kind, time.monotonic())  # Odpowiedź przyszła, ale bez wartości
+            return
+        finally:
+            wake.set()
+        now = time.monotonic()
+        engine.on_response(kind, now)
+        handler(kind, value, now)
+
+    tasks = set()
+    while not transport.closed and not (stop and stop.is_set()):
+        now = time.monotonic()
+        engine.expire(now)
+        for command in engine.due_commands(now):
+            task = asyncio.ensure_future(poll_one(command, response_type(command)))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        wake.clear()
+        try:
+            await asyncio.wait_for(wake.wait(), engine.time_to_next(time.monotonic()))
+        except asyncio.TimeoutError:
+            pass
+
+    for task in tasks:
+        task.cancel()
+
+
+async def _main(args):
+    transport = await AsyncTransport.open(args.port, args.baud)
+    try:
+        for command in args.commands:
+            if response_type(command) is None:
+                transport.send(command)
+                print(f"{command} -> wysłano")
+                continue
+            started = time.monotonic()
+            try:
+                value = await transport.query(command, args.timeout)
+                print(f"{command} -> {value} ({(time.monotonic() - started) * 1000:.1f} ms)")
+            except asyncio.TimeoutError:
+                print(f"{command} -> brak odpowiedzi w {args.timeout} s")
+            except ValueError as e:
+                print(f"{command} -> {e}")
+    finally:
+        transport.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Zapytania do kontrolera przez transport asyncio")
+    parser.add_argument('port', help="port szeregowy")
+    parser.add_argument('commands', nargs='+', help="komendy, np. '*GETTACT;'")
+    parser.add_argument('--baud', type=int, default=9600, help="prędkość portu")
+    parser.add_argument('--timeout', type=float, default=DEFAULT_QUERY_TIMEOUT, help="limit czasu odpowiedzi [s]")
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
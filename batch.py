@@ -0,0 +1,253 @@
+"""Zbiorcza analiza katalogów pomiar-* (równolegle, z pamięcią podręczną wyników)
+
+Przeszukuje drzewo katalogów, w każdym katalogu pomiar-* wczytuje pliki danych
+(nagrania data*.kbin, a gdy ich brak - data.json albo data.csv), liczy statystyki
+i wskaźniki odpowiedzi skokowej (analysis.py) w puli procesów na wszystkich rdzeniach
+i zapisuje jedną tabelę CSV (separator ';', wiersz na plik danych).
+
+Wyniki zapamiętywane są w pliku .analiza-cache.json w katalogu głównym. Plik danych
+o niezmienionym rozmiarze i czasie modyfikacji nie jest ponownie wczytywany; po zmianie
+samego czasu modyfikacji (kopia, touch) porównywany jest skrót zawartości. Zmiana
+parametrów analizy unieważnia całą pamięć podręczną.
+
+Uruchomienie: python3 batch.py ~/Pomiary [-o analiza.csv] [--jobs 8] [--setpoint 30]
+"""
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from analysis import analyze_steps, DEFAULT_BAND, DEFAULT_TOLERANCE, DEFAULT_TAIL
+from export import write_file_atomic
+from recording import load_measurement, FLAG_TEST_START, FLAG_TEST_STOP
+
+RUN_PREFIX = 'pomiar-'
+CACHE_NAME = '.analiza-cache.json'
+CACHE_VERSION = 1
+HASH_BLOCK = 1 << 20  # Blok odczytu przy liczeniu skrótu [B]
+
+SUMMARY_FIELDS = ('samples', 'duration', 'temperature_min', 'temperature_max', 'temperature_mean',
+                  'temperature_final', 'current_mean', 'current_max', 'steps', 'rise_time_mean',
+                  'overshoot_max', 'settling_time_mean', 'steady_state_error_mean')
+INTEGER_FIELDS = ('samples', 'steps')
+SUMMARY_HEADER = ('Pomiar', 'Plik', 'Próbki', 'Czas trwania [s]', 'Temp. min [°C]', 'Temp. max [°C]',
+                  'Temp. średnia [°C]', 'Temp. końcowa [°C]', 'Prąd średni [A]', 'Prąd max [A]', 'Skoki',
+                  'Czas narastania śr. [s]', 'Przeregulowanie max [%]', 'Czas ustalania śr. [s]',
+                  'Uchyb ustalony śr. |.| [°C]', 'Błąd')
+
+
+def _natural_key(text):
+    """Klucz sortowania 'pomiar-2025-01-01 (2)' przed 'pomiar-2025-01-01 (10)'"""
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', text)]
+
+
+def find_runs(root):
+    """Zwraca posortowaną listę ścieżek plików danych ze wszystkich katalogów pomiar-* pod root"""
+    files = []
+    for directory, subdirs, names in os.walk(root):
+        if not os.path.basename(directory).startswith(RUN_PREFIX):
+            continue
+        subdirs[:] = []  # Wewnątrz katalogu pomiaru nie szukamy dalej
+        recordings = [name for name in names if name.startswith('data') and name.endswith('.kbin')]
+        if not recordings:
+            recordings = [name for name in ('data.json', 'data.csv') if name in names][:1]
+        files.extend(os.path.join(directory, name) for name in recordings)
+    return sorted(files, key=lambda path: _natural_key(os.path.relpath(path, root)))
+
+
+def file_hash(path):
+    """Skrót zawartości pliku (BLAKE2b) do rozpoznania niezmienionych danych"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(HASH_BLOCK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def test_window(records):
+    """Odcinek od ostatniego Start do następnego Stop (jak w data.json); bez znaczników - całość"""
+    flags = records['flags']
+    starts = np.flatnonzero(flags & FLAG_TEST_START)
+    if len(starts) == 0:
+        return records
+    stops = np.flatnonzero(flags & FLAG_TEST_STOP)
+    stops = stops[stops > starts[-1]]
+    return records[starts[-1]:stops[0] + 1 if len(stops) else len(records)]
+
+
+def summarize(records, params):
+    """Statystyki i uśrednione wskaźniki skoków pomiaru; zwraca słownik z kluczami SUMMARY_FIELDS"""
+    times = records['time'].astype(np.float64)
+    temperature = records['temperature'].astype(np.float64)
+    current = records['current'].astype(np.float64)
+    setpoint = records['setpoint'].astype(np.float64)
+    starts = None
+    if params['setpoint'] is not None:
+        setpoint = np.full(len(records), params['setpoint'])
+        starts = [1]
+
+    summary = dict.fromkeys(SUMMARY_FIELDS, float('nan'))
+    summary['samples'] = len(records)
+    summary['steps'] = 0
+    if len(records) == 0:
+        return summary
+    summary.update(duration=times[-1] - times[0], temperature_min=np.nanmin(temperature),
+                   temperature_max=np.nanmax(temperature), temperature_mean=np.nanmean(temperature),
+                   temperature_final=temperature[-1], current_mean=np.nanmean(current),
+                   current_max=np.nanmax(current))
+
+    if len(records) > 1:
+        steps = analyze_steps(times, temperature, setpoint, starts=starts, band=params['band'],
+                              tolerance=params['tolerance'], tail=params['tail'])
+        count = len(steps['start'])
+        summary['steps'] = count
+        if count:
+            with warnings.catch_warnings():
+                # Same NaN (np. żaden skok nie ustalony) dają NaN bez ostrzeżeń
+                warnings.simplefilter('ignore', RuntimeWarning)
+                summary.update(rise_time_mean=np.nanmean(steps['rise_time']),
+                               overshoot_max=np.nanmax(steps['overshoot']),
+                               settling_time_mean=np.nanmean(steps['settling_time']),
+                               steady_state_error_mean=np.nanmean(np.abs(steps['steady_state_error'])))
+    return {name: float(value) for name, value in summary.items()}
+
+
+def analyze_file(path, params, known_hash=None):
+    """Zadanie procesu roboczego: zwraca (skrót, wynik albo None, jeśli skrót = known_hash, błąd)"""
+    try:
+        digest = file_hash(path)
+        if digest == known_hash:
+            return digest, None, None
+        records, _ = load_measurement(path)
+        return digest, summarize(test_window(np.array(records)), params), None
+    except Exception as e:
+        return None, None, f"{type(e).__name__}: {e}"
+
+
+def load_cache(path, params):
+    """Wczytuje pamięć podręczną; inna wersja lub inne parametry analizy - pusta"""
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            cache = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    if cache.get('version') != CACHE_VERSION or cache.get('params') != params:
+        return {}
+    return cache.get('files', {})
+
+
+def save_cache(path, params, entries):
+    data = {'version': CACHE_VERSION, 'params': params, 'files': entries}
+    write_file_atomic(path, lambda file: json.dump(data, file), encoding='utf-8')
+
+
+def analyze_tree(root, params, jobs=None, cache_path=None, progress=None):
+    """Analizuje wszystkie pomiary pod root; zwraca (wiersze, liczba przeliczonych plików)
+
+    Wiersz to słownik z kluczami 'path', 'error' i SUMMARY_FIELDS; kolejność jak w find_runs.
+    """
+    cache_path = cache_path or os.path.join(root, CACHE_NAME)
+    cached = load_cache(cache_path, params)
+    entries = {}
+    todo = []
+    for path in find_runs(root):
+        key = os.path.relpath(path, root)
+        stat = os.stat(path)
+        entry = cached.get(key)
+        if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            entries[key] = entry
+            continue
+        # Ten sam rozmiar, inny czas modyfikacji - może wystarczy porównać skrót
+        known_hash = entry['hash'] if entry and entry['size'] == stat.st_size else None
+        entries[key] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'hash': None,
+                        'summary': None, 'error': None}
+        todo.append((key, path, known_hash, entry))
+
+    try:
+        if todo:
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                futures = {pool.submit(analyze_file, path, params, known_hash): (key, entry)
+                           for key, path, known_hash, entry in todo}
+                for done, future in enumerate(as_completed(futures), 1):
+                    key, previous = futures[future]
+                    digest, summary, error = future.result()
+                    entry = entries[key]
+                    if summary is None and error is None:
+                        # Zawartość bez zmian - wynik z pamięci podręcznej
+                        summary, error = previous['summary'], previous['error']
+                    entry.update(hash=digest, summary=summary, error=error)
+                    if progress:
+                        progress(done, len(todo), key)
+    finally:
+        # Także po przerwaniu (Ctrl+C) - gotowe wyniki nie przepadają
+        save_cache(cache_path, params, {key: entry for key, entry in entries.items()
+                                        if entry['hash'] is not None or entry['error'] is not None})
+
+    rows = []
+    for key, entry in entries.items():
+        row = dict.fromkeys(SUMMARY_FIELDS, float('nan'))
+        row.update(entry['summary'] or {})
+        row.update(path=key, error=entry['error'])
+        rows.append(row)
+    return rows, len(todo)
+
+
+def _cell(field, value):
+    if np.isnan(value):
+        return ''
+    return int(value) if field in INTEGER_FIELDS else f'{value:.4f}'
+
+
+def write_table(path, rows):
+    """Zapisuje tabelę zbiorczą w układzie CSV aplikacji (separator ';')"""
+    def write(file):
+        writer = csv.writer(file, delimiter=';')
+        writer.writerow(SUMMARY_HEADER)
+        for row in rows:
+            directory, name = os.path.split(row['path'])
+            values = [_cell(field, row[field]) for field in SUMMARY_FIELDS]
+            writer.writerow([directory, name, *values, row['error'] or ''])
+    write_file_atomic(path, write, encoding='utf-8', newline='')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Zbiorcza analiza katalogów pomiar-* do jednej tabeli CSV")
+    parser.add_argument('root', help="katalog z pomiarami (przeszukiwany rekurencyjnie)")
+    parser.add_argument('-o', '--output', help="plik wynikowy CSV (domyślnie <root>/analiza.csv)")
+    parser.add_argument('-j', '--jobs', type=int, help="liczba procesów (domyślnie liczba rdzeni)")
+    parser.add_argument('--cache', help=f"plik pamięci podręcznej (domyślnie <root>/{CACHE_NAME})")
+    parser.add_argument('--setpoint', type=float, help="nastawa dla plików bez kolumny nastawy (jeden skok)")
+    parser.add_argument('--band', type=float, default=DEFAULT_BAND, help="pasmo ustalania (ułamek skoku)")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help="najwęższe pasmo ustalania [°C]")
+    parser.add_argument('--tail', type=float, default=DEFAULT_TAIL, help="końcówka skoku do uchybu ustalonego [s]")
+    args = parser.parse_args()
+
+    params = {'setpoint': args.setpoint, 'band': args.band, 'tolerance': args.tolerance, 'tail': args.tail}
+    output = args.output or os.path.join(args.root, 'analiza.csv')
+
+    def progress(done, total, key):
+        if not sys.stdout.isatty():
+            return
+        print(f"\r[{done}/{total}] {key}"[:100].ljust(100), end='', flush=True)
+
+    started = time.monotonic()
+    rows, processed = analyze_tree(args.root, params, args.jobs, args.cache, progress)
+    if processed and sys.stdout.isatty():
+        print()
+    write_table(output, rows)
+    errors = sum(1 for row in rows if row['error'])
+    print(f"Pliki danych: {len(rows)}, przeliczone: {processed}, z pamięci podręcznej: {len(rows) - processed}, "
+          f"błędy: {errors} ({time.monotonic() - started:.1f} s)")
+    print(f"Zapisano: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,456 @@
+"""Test wydajności komunikacji: SerialCommunicator + ścieżka danych GUI na symulatorze
+
+Uruchomienie (z katalogu aplikacji): python3 benchmark.py [--duration 30] [--tact 20] [--gui]
+Wiele urządzeń we wspólnej pętli: python3 benchmark.py --devices 4 lub --scaling
+Parser odpowiedzi (zgodność i szybkość, bez portu): python3 benchmark.py --parser
+Odtworzenie zapisanego pomiaru z maksymalną prędkością: python3 benchmark.py --replay data.json [--gui]
+Przybliżanie wykresu długiego pomiaru (poziomy historii): python3 benchmark.py --zoom 48
+"""
+import argparse
+import asyncio
+import os
+import re
+import tempfile
+import time
+
+import numpy as np
+
+import Kontroler
+from asyncserial import AsyncTransport, run_polling
+from devices import DeviceManager
+from polling import PollingEngine
+from decimation import MinMaxDecimator
+from extrema import ExtremaTracker
+from protocol import FrameParser, parse_response
+from recording import Recorder
+from replay import ReplaySource
+from samplestore import SampleStore, DEFAULT_CAPACITY, DEFAULT_TIERS, TEMPERATURE, CURRENT
+from simulator import DeviceSimulator
+
+# Typowy strumień odpowiedzi: 4 x TACT na 1 x IOUT (format symulatora)
+PARSER_FRAMES = (b'*TACT  25.31\r\n', b'*TACT  25.33\r\n', b'*IOUT    1.250A\r\n',
+                 b'*TACT  25.36\r\n', b'*TACT  25.38\r\n')
+
+
+def percentiles(values):
+    """Zwraca percentyle opóźnień w milisekundach"""
+    if not values:
+        return "brak danych"
+    ms = np.asarray(values) * 1000.0
+    p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+    return f"p50 {p50:.1f} ms, p90 {p90:.1f} ms, p99 {p99:.1f} ms, max {ms.max():.1f} ms"
+
+
+def drive_data_path(communicator, duration):
+    """Odbiera dane tak jak App.update_graph (co 200 ms), bez interfejsu"""
+    cursor = communicator.cursor()
+    samples = 0
+    end = time.monotonic() + duration
+    while time.monotonic() < end:
+        time.sleep(0.2)
+        samples += cursor.fetch().shape[1]
+    samples += cursor.fetch().shape[1]
+    return samples
+
+
+def drive_gui(port, baud_rate, duration):
+    """Uruchamia prawdziwe okno aplikacji podłączone do symulatora"""
+    Kontroler.config['serial_port'] = port
+    Kontroler.config['port'] = str(baud_rate)
+    window = Kontroler.App()
+    window.after(int(duration * 1000), window.quit)
+    window.mainloop()
+    communicator = window.communicator
+    communicator.disconnect()
+    samples = window.store.count
+    window.destroy()
+    return communicator, samples
+
+
+def drive_asyncio(port, baud_rate, duration, engine):
+    """Odpytuje symulator przez transport asyncio (jedna pętla zdarzeń, bez wątków)"""
+    samples = 0
+
+    def handler(kind, value, now):
+        nonlocal samples
+        if kind == 'TACT':
+            samples += 1
+
+    async def measure():
+        transport = await AsyncTransport.open(port, baud_rate)
+        stop = asyncio.Event()
+        asyncio.get_running_loop().call_later(duration, stop.set)
+        try:
+            await run_polling(transport, engine, handler, stop)
+        finally:
+            transport.close()
+
+    asyncio.run(measure())
+    return samples
+
+
+def run(duration, rates, max_in_flight, latency, jitter, error_rate, drop_rate, baud_rate, gui, use_asyncio=False):
+    """Przeprowadza pomiar i zwraca słownik z wynikami"""
+    simulator = DeviceSimulator(latency=latency, jitter=jitter, error_rate=error_rate, drop_rate=drop_rate, seed=1)
+    port = simulator.start()
+    Kontroler.config['polling'] = {'rates': rates, 'max_in_flight': max_in_flight}
+    messages = []
+
+    try:
+        if gui:
+            communicator, samples = drive_gui(port, baud_rate, duration)
+            engine = communicator.polling
+        elif use_asyncio:
+            engine = PollingEngine(rates, max_in_flight)
+            samples = drive_asyncio(port, baud_rate, duration, engine)
+        else:
+            communicator = Kontroler.SerialCommunicator(
+                port=port, baud_rate=baud_rate, console_func=messages.append,
+                polling=PollingEngine(rates, max_in_flight))
+            if not communicator.connect():
+                raise RuntimeError(f"Nie udało się połączyć z symulatorem: {messages}")
+            communicator.start_communication()
+            samples = drive_data_path(communicator, duration)
+            communicator.disconnect()
+            engine = communicator.polling
+    finally:
+        simulator.stop()
+
+    sent = simulator.responses.get('TACT', 0)
+    return {
+        'samples': samples,
+        'samples_per_s': samples / duration,
+        'rates': engine.rate_report(),
+        'latency': {name: percentiles(list(query.latencies)) for name, query in engine.queries.items()},
+        'dropped': max(0, sent - samples),
+        'timeouts': sum(query.timeouts for query in engine.queries.values()),
+        'device_dropped': simulator.dropped,
+        'device_corrupted': simulator.corrupted,
+    }
+
+
+def run_devices(count, duration, rates, max_in_flight, latency, jitter, baud_rate):
+    """Mierzy łączną przepustowość count symulatorów obsługiwanych przez DeviceManager"""
+    simulators = [DeviceSimulator(latency=latency, jitter=jitter, seed=number) for number in range(count)]
+    messages = []
+    communicators = []
+    try:
+        for simulator in simulators:
+            communicator = Kontroler.SerialCommunicator(
+                port=simulator.start(), baud_rate=baud_rate, console_func=messages.append,
+                polling=PollingEngine(rates, max_in_flight))
+            if not communicator.connect():
+                raise RuntimeError(f"Nie udało się połączyć z symulatorem: {messages}")
+            communicators.append(communicator)
+
+        manager = DeviceManager(communicators, console_func=messages.append)
+        started = time.process_time()
+        manager.start()
+        cursors = [communicator.cursor() for communicator in communicators]
+        samples = [0] * count
+        end = time.monotonic() + duration
+        while time.monotonic() < end:
+            time.sleep(0.2)
+            for number, cursor in enumerate(cursors):
+                samples[number] += cursor.fetch().shape[1]
+        manager.stop()
+        cpu = time.process_time() - started
+        for communicator in communicators:
+            communicator.disconnect()
+    finally:
+        for simulator in simulators:
+            simulator.stop()
+
+    return {
+        'devices': count,
+        'samples': sum(samples),
+        'samples_per_s': sum(samples) / duration,
+        'slowest_per_s': min(samples) / duration,
+        'cpu_percent': 100.0 * cpu / duration,
+        'latency': percentiles([t for c in communicators for t in c.polling.queries['TACT'].latencies]),
+    }
+
+
+def print_devices(result):
+    print(f"{result['devices']:>3} urz.: {result['samples_per_s']:8.1f} próbek/s łącznie, "
+          f"najwolniejsze {result['slowest_per_s']:.1f}/s, CPU {result['cpu_percent']:.0f}%, "
+          f"opóźnienie TACT {result['latency']}")
+
+
+def drive_replay_path(source, store, frame_interval=0.1, pixels=1000):
+    """Odbiera odtwarzane próbki jak StartPage.update_graph (decymacja, zakresy osi) i mierzy klatki"""
+    cursor = source.cursor()
+    decimators = [MinMaxDecimator(TEMPERATURE), MinMaxDecimator(CURRENT)]
+    extrema = [ExtremaTracker(TEMPERATURE, Kontroler.FOLD_WINDOW), ExtremaTracker(CURRENT, Kontroler.FOLD_WINDOW)]
+    frame_costs = []
+    while True:
+        finished = not source.running
+        time.sleep(frame_interval)
+        cursor.fetch()
+        if len(store):
+            started = time.perf_counter()
+            times = store.columns()['time']
+            x0, x1 = times[0], times[-1]
+            for decimator in decimators:
+                decimator.update(store, x0, x1, pixels)
+            for tracker in extrema:
+                tracker.update(store)
+                tracker.range(False)
+            frame_costs.append(time.perf_counter() - started)
+        if finished:
+            return cursor, frame_costs
+
+
+def drive_replay_gui(path):
+    """Odtwarza pomiar z maksymalną prędkością w prawdziwym oknie aplikacji"""
+    window = Kontroler.App(replay=path, replay_speed=0)
+
+    def check():
+        if window.replay.finished or (window.connecting is None and not window.replay.running):
+            window.quit()
+        else:
+            window.after(100, check)
+    window.after(100, check)
+    window.mainloop()
+    source, cursor, recorder = window.replay, window.cursors[0], window.recorder
+    frames = Kontroler.registry.get('kontroler_frame_seconds')
+    frame_costs = [frames.percentile(q) for q in (50, 99)] if frames is not None and frames.count else []
+    count = window.scheduler.frames
+    window.finish_closing(True)  # Kończy też nagranie
+    return source, cursor, recorder.records if recorder is not None else 0, frame_costs, count
+
+
+def run_replay(path, gui=False):
+    """Odtwarza pomiar z maksymalną prędkością przez bufor, wykres i nagrywanie; zwraca wyniki"""
+    directory = tempfile.mkdtemp(prefix='replay-')
+    Kontroler.config['recording_dir'] = directory
+    if gui:
+        source, cursor, records, frame_costs, frames = drive_replay_gui(path)
+        frame_text = (f"p50 {frame_costs[0] * 1000:.1f} ms, p99 {frame_costs[1] * 1000:.1f} ms"
+                      if frame_costs else "brak danych")
+    else:
+        store = SampleStore(Kontroler.config.get('buffer_capacity', DEFAULT_CAPACITY))
+        source = ReplaySource(path, store=store, speed=0)
+        if not source.connect():
+            raise RuntimeError(f"Nie udało się wczytać pomiaru: {path}")
+        recorder = Recorder(store, os.path.join(directory, 'odtwarzanie.kbin'))
+        recorder.start()
+        source.start_communication()
+        cursor, costs = drive_replay_path(source, store)
+        recorder.stop()
+        records = recorder.records
+        frames = len(costs)
+        frame_text = percentiles(costs)
+    total = len(source.records)
+    return {
+        'samples': total,
+        'replayed': source.position,
+        'samples_per_s': source.position / source.elapsed if source.elapsed else 0.0,
+        'seconds': source.elapsed,
+        'frames': frames,
+        'frame': frame_text,
+        'dropped': cursor.dropped,
+        'recorded': records,
+        'directory': directory,
+    }
+
+
+def parse_lines(rx, data):
+    """Parser sprzed FrameParser: dekodowanie każdej linii do str i parse_response"""
+    rx += data
+    results = []
+    while True:
+        end = rx.find(b'\n')
+        if end < 0:
+            break
+        response = rx[:end].decode('Latin-1').strip()
+        del rx[:end + 1]
+        if response:
+            try:
+                results.append(parse_response(response))
+            except (ValueError, IndexError):
+                results.append(None)
+    return results
+
+
+# Ramki w układzie urządzenia (wartość w stałych kolumnach) - tu FrameParser musi zgadzać się z parse_response
+DEVICE_FRAMES = (b'*TACT 23.456 C', b'*TACT 023.45;', b'*TACT  -5.20', b'*TPRS  25.00', b'*IOUT    0.500A;',
+                 b'*IOUT    1.250A', b'*IOUT    -0.853A', b'*TACT ', b'*TACT abc', b'*IOUT x', b'*XYZ 1.0')
+# Ramki, w których kolumny parse_response gubią znak lub cyfry - FrameParser czyta całą liczbę
+SIGNED_FRAMES = {b'*IOUT   -0.500A': -0.5, b'*IOUT  -12.500A': -12.5, b'*IOUT   +1.5A': 1.5,
+                 b'*TACT -105.25': -105.25, b'*TPRS   -7.5;': -7.5}
+
+
+def reference_number(line):
+    """Niezależny odczyt wartości ramki (wyrażenie regularne zamiast float() na polu; None - brak)"""
+    match = re.fullmatch(r' *([-+]?(?:[0-9]+\.?[0-9]*|\.[0-9]+))[AC; ]*', line[6:])
+    return None if match is None else float(match.group(1))
+
+
+def frame_parser_value(frame):
+    """(typ, wartość) ostatniej przyjętej ramki FrameParser albo None"""
+    result = None
+    for kind, value, _ in FrameParser().feed(frame + b'\r\n'):
+        if kind is not None and value is not None:
+            result = (kind, value)
+    return result
+
+
+def check_parser(random_frames=20000):
+    """Sprawdza FrameParser; zwraca (liczba ramek, lista różnic (ramka, oczekiwane, FrameParser)).
+
+    Ramki w układzie urządzenia (DEVICE_FRAMES i wartości jak w simulator.py) porównywane
+    są z parse_response, SIGNED_FRAMES z podanymi wartościami, a losowe ramki
+    z niezależnym reference_number.
+    """
+    rng = np.random.default_rng(0)
+    device = list(DEVICE_FRAMES)
+    for value in rng.uniform(-9.999, 99.999, random_frames // 10):
+        device += [f'*TACT {value:6.2f}'.encode(), f'*IOUT    {value / 10:.3f}A'.encode()]
+    cases = []
+    for frame in device:
+        # Porównywane są przyjęte wartości: ramka bez wartości odpada w obu parserach
+        try:
+            expected = parse_response(frame.decode('Latin-1').strip())
+        except (ValueError, IndexError):
+            expected = None
+        cases.append((frame, expected if expected and expected[1] is not None else None))
+    cases += [(frame, (frame[1:5].decode(), value)) for frame, value in SIGNED_FRAMES.items()]
+
+    alphabet = np.frombuffer(b' 0123456789.-+;AC', dtype=np.uint8)
+    for prefix in (b'*TACT ', b'*TPRS ', b'*IOUT '):
+        for length in rng.integers(1, 12, random_frames // 3):
+            frame = prefix + rng.choice(alphabet, length).tobytes()
+            value = reference_number(frame.decode('Latin-1').rstrip())
+            cases.append((frame, None if value is None else (prefix[1:5].decode(), value)))
+
+    differences = [(frame, expected, actual) for frame, expected in cases
+                   if (actual := frame_parser_value(frame)) != expected]
+    return len(cases), differences
+
+
+def bench_parser(frames=100000, chunk_sizes=(16, 64, 1024), repeat=3):
+    """Mikrotest parserów: czas na ramkę [ns] przy odczycie porcjami po chunk bajtów"""
+    stream = b''.join(PARSER_FRAMES) * (frames // len(PARSER_FRAMES))
+    count = len(stream.split(b'\n')) - 1
+    results = []
+    for chunk in chunk_sizes:
+        chunks = [stream[i:i + chunk] for i in range(0, len(stream), chunk)]
+        timings = {}
+        for name in ('linie', 'ramki'):
+            best = None
+            for _ in range(repeat):
+                if name == 'linie':
+                    rx = bytearray()
+                    started = time.perf_counter()
+                    parsed = sum(len(parse_lines(rx, data)) for data in chunks)
+                else:
+                    frame_parser = FrameParser()
+                    started = time.perf_counter()
+                    parsed = sum(len(frame_parser.feed(data)) for data in chunks)
+                elapsed = time.perf_counter() - started
+                assert parsed == count
+                best = elapsed if best is None else min(best, elapsed)
+            timings[name] = best / count * 1e9
+        results.append((chunk, timings['linie'], timings['ramki']))
+    return results
+
+
+def fill_store(store, hours, rate=20.0):
+    """Dopisuje syntetyczny pomiar o długości hours godzin (wolne zmiany + szum)"""
+    rng = np.random.default_rng(0)
+    times = np.arange(int(hours * 3600 * rate)) / rate
+    temperature = 25 + 10 * np.sin(times / 3600) + rng.normal(0, 0.2, len(times))
+    for t, value in zip(times.tolist(), temperature.tolist()):
+        store.append(t, value, value / 10, 25.0)
+    return times[-1]
+
+
+def bench_zoom(hours=48.0, pixels=1000, frames=20):
+    """Czas klatki [ms] (średni, maksymalny) przy przybliżaniu od całego pomiaru do 5 minut:
+    z poziomami historii i z samych surowych próbek (bufor mieszczący cały pomiar)"""
+    capacity = int(hours * 3600 * 20) + 1
+    results = {}
+    for name, tiers in (('poziomy', DEFAULT_TIERS), ('surowe', ())):
+        store = SampleStore(capacity, tiers)
+        last = fill_store(store, hours)
+        store.update_tiers()  # W aplikacji poziomy uzupełniane są co klatkę
+        decimators = [MinMaxDecimator(TEMPERATURE), MinMaxDecimator(CURRENT)]
+        spans = np.geomspace(last, 300.0, frames)
+        costs = []
+        for span in np.concatenate((spans, spans[::-1])):
+            started = time.perf_counter()
+            for decimator in decimators:
+                decimator.update(store, last - span, last, pixels)
+            costs.append(time.perf_counter() - started)
+        results[name] = (1000 * np.mean(costs), 1000 * np.max(costs))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test wydajności komunikacji na symulatorze urządzenia")
+    parser.add_argument('--duration', type=float, default=10.0, help="czas pomiaru [s]")
+    parser.add_argument('--tact', type=float, default=20.0, help="częstotliwość TACT [Hz]")
+    parser.add_argument('--iout', type=float, default=5.0, help="częstotliwość IOUT [Hz]")
+    parser.add_argument('--tprs', type=float, default=0.0, help="częstotliwość TPRS [Hz] (0 - na żądanie)")
+    parser.add_argument('--in-flight', type=int, default=2, help="limit zapytań w locie")
+    parser.add_argument('--latency', type=float, default=0.02, help="opóźnienie odpowiedzi symulatora [s]")
+    parser.add_argument('--jitter', type=float, default=0.005, help="rozrzut opóźnienia [s]")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="udział zniekształconych odpowiedzi")
+    parser.add_argument('--drop-rate', type=float, default=0.0, help="udział utraconych odpowiedzi")
+    parser.add_argument('--baud', type=int, default=9600, help="prędkość portu")
+    parser.add_argument('--gui', action='store_true', help="mierz przez prawdziwe okno aplikacji")
+    parser.add_argument('--asyncio', action='store_true', help="odpytuj przez transport asyncio (asyncserial.py)")
+    parser.add_argument('--devices', type=int, default=0, help="liczba symulatorów we wspólnej pętli (DeviceManager)")
+    parser.add_argument('--scaling', action='store_true', help="porównaj 1, 2, 4 i 8 urządzeń")
+    parser.add_argument('--parser', action='store_true', help="mikrotest parsera odpowiedzi (bez symulatora)")
+    parser.add_argument('--replay', metavar='PLIK', help="odtwórz zapisany pomiar z maksymalną prędkością")
+    parser.add_argument('--zoom', type=float, metavar='GODZINY', help="przybliżanie wykresu pomiaru o tej długości")
+    args = parser.parse_args()
+
+    if args.zoom:
+        for name, (mean_ms, max_ms) in bench_zoom(args.zoom).items():
+            print(f"Klatka ({name}): średnio {mean_ms:.2f} ms, najdłuższa {max_ms:.2f} ms")
+        return
+
+    if args.replay:
+        result = run_replay(args.replay, args.gui)
+        print(f"Odtworzono {result['replayed']}/{result['samples']} próbek w {result['seconds']:.2f} s "
+              f"({result['samples_per_s']:.0f} próbek/s)")
+        print(f"Klatki: {result['frames']}, czas klatki {result['frame']}")
+        print(f"Pominięte przez wykres: {result['dropped']}, zapisane w nagraniu: {result['recorded']} "
+              f"({result['directory']})")
+        return
+
+    if args.parser:
+        checked, differences = check_parser()
+        print(f"Sprawdzone ramki: {checked}, różnice: {len(differences)}")
+        for frame, expected, actual in differences[:10]:
+            print(f"  {frame!r}: oczekiwane {expected}, FrameParser {actual}")
+        if differences:
+            raise SystemExit(1)
+        for chunk, lines_ns, frames_ns in bench_parser():
+            print(f"Porcje {chunk:>5} B: linie {lines_ns:7.0f} ns/ramkę, FrameParser {frames_ns:7.0f} ns/ramkę "
+                  f"({lines_ns / frames_ns:.1f}x)")
+        return
+
+    rates = {'TACT': args.tact, 'IOUT': args.iout, 'TPRS': args.tprs}
+    if args.devices or args.scaling:
+        for count in ((1, 2, 4, 8) if args.scaling else (args.devices,)):
+            print_devices(run_devices(count, args.duration, rates, args.in_flight,
+                                      args.latency, args.jitter, args.baud))
+        return
+
+    result = run(args.duration, rates, args.in_flight, args.latency, args.jitter,
+                 args.error_rate, args.drop_rate, args.baud, args.gui, args.asyncio)
+
+    print(f"Próbki temperatury: {result['samples']} ({result['samples_per_s']:.1f} próbek/s)")
+    print(f"Częstotliwość osiągnięta/zadana: {result['rates']}")
+    for name, text in result['latency'].items():
+        print(f"Opóźnienie {name}: {text}")
+    print(f"Utracone próbki: {result['dropped']} (przekroczenia czasu: {result['timeouts']}, "
+          f"urządzenie: utracone {result['device_dropped']}, zniekształcone {result['device_corrupted']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Kolejka komend użytkownika z priorytetami i łączeniem komend tego samego rodzaju
+
+Komendy czekają w klasach priorytetu: najpierw bezpieczeństwo (wyłączenie prądu `a`),
+potem sterowanie (nastawa, PID, włączenie prądu i pozostałe); zapytania cykliczne
+(PollingEngine) wysyłane są dopiero po nich. Nowa komenda tego samego rodzaju co
+czekająca (np. kolejne *SETTPRS przy przeciąganiu suwaka) zastępuje ją na jej miejscu
+w kolejce, więc na urządzenie trafia tylko ostatnia wartość. Jak PollingEngine, klasa
+nie wykonuje operacji wejścia/wyjścia; add() wywołuje wątek okna, pop_all() wątek komunikacji.
+"""
+import threading
+import time
+from collections import deque
+
+from protocol import command_class, SAFETY, CONTROL
+
+PRIORITY_NAMES = {SAFETY: 'bezpieczeństwo', CONTROL: 'sterowanie'}
+
+
+class PendingCommand:
+    """Komenda czekająca na wysłanie"""
+
+    def __init__(self, command, kind, priority, queued_at):
+        self.command = command
+        self.kind = kind          # Rodzaj do łączenia (None - komenda niełączona)
+        self.priority = priority
+        self.queued_at = queued_at  # Przyjęcie najstarszej z połączonych komend (do opóźnienia kolejki)
+        self.updated_at = queued_at  # Przyjęcie ostatniej połączonej komendy
+        self.merged = 0           # Ile wcześniejszych komend zastąpiła
+
+
+class CommandScheduler:
+    """Kolejki komend według priorytetu z łączeniem komend zastąpionych nowszymi"""
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.queues = {priority: deque() for priority in sorted(PRIORITY_NAMES)}
+        self.pending = {}     # rodzaj -> PendingCommand czekająca w kolejce
+        self.queued = 0       # Komendy przyjęte
+        self.coalesced = 0    # Komendy zastąpione przed wysłaniem
+        self._lock = threading.Lock()
+
+    def add(self, command):
+        """Dodaje komendę; zwraca True, jeśli zastąpiła czekającą komendę tego samego rodzaju"""
+        priority, kind = command_class(command)
+        now = self.clock()
+        with self._lock:
+            self.queued += 1
+            previous = self.pending.get(kind) if kind is not None else None
+            if previous is not None:
+                self.coalesced += 1
+                if priority < previous.priority:
+                    # Np. "a" po "A": przenieś do pilniejszej kolejki
+                    self.queues[previous.priority].remove(previous)
+                    self.queues[priority].append(previous)
+                    previous.priority = priority
+                previous.command = command
+                previous.updated_at = now
+                previous.merged += 1
+                return True
+            entry = PendingCommand(command, kind, priority, now)
+            self.queues[priority].append(entry)
+            if kind is not None:
+                self.pending[kind] = entry
+            return False
+
+    def pop_all(self):
+        """Zwraca wszystkie czekające komendy w kolejności wysyłania (od najpilniejszych)"""
+        with self._lock:
+            entries = []
+            for queue in self.queues.values():
+                entries.extend(queue)
+                queue.clear()
+            self.pending.clear()
+        return entries
+
+    def depth(self):
+        """Liczba komend czekających na wysłanie"""
+        with self._lock:
+            return sum(len(queue) for queue in self.queues.values())
+
+    def clear(self):
+        with self._lock:
+            for queue in self.queues.values():
+                queue.clear()
+            self.pending.clear()
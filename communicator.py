@@ -0,0 +1,358 @@
+"""Komunikacja z kontrolerem bez interfejsu graficznego: konfiguracja, porty i SerialCommunicator"""
+import os
+import time
+import json
+import serial
+import threading
+import platform
+import profiling
+from polling import PollingEngine
+from commandscheduler import CommandScheduler
+from metrics import registry
+from protocol import FrameParser
+from samplestore import SampleStore, SampleCursor, DEFAULT_CAPACITY
+
+CONFIG_FILE = 'config.json'
+DEFAULT_CONFIG = {
+    "port": "9600",
+    "temp_range": "-10 /+50",
+    "fold": True,
+    "pid": [6, 7, 4],
+    "current_off": False,
+    "polling": {
+        "rates": {"TACT": 10.0, "IOUT": 5.0, "TPRS": 0.0},
+        "max_in_flight": 2,
+        "response_timeout": 0.5
+    }
+}
+
+config = {}  # Wspólna konfiguracja (wypełnia load_config)
+
+def load_config(path=CONFIG_FILE):
+    """Wczytuje konfigurację do słownika config; brakujący plik tworzy z ustawieniami domyślnymi"""
+    if not os.path.exists(path):
+        print(f"Brak pliku {path} - tworzenie domyślnego")
+        default_config = dict(DEFAULT_CONFIG, serial_port=get_default_serial_port())
+        with open(path, "w") as f:
+            json.dump(default_config, f, indent=4)
+    with open(path, 'r') as file:
+        config.clear()
+        config.update(json.load(file))
+    return config
+
+def get_available_serial_ports():
+    """Zwraca listę dostępnych portów szeregowych według systemu"""
+    ports = []
+    try:
+        # Automatyczne wykrywanie portów (moduł importowany dopiero tutaj - start bez tego kosztu)
+        import serial.tools.list_ports
+        available_ports = serial.tools.list_ports.comports()
+        for port in available_ports:
+            ports.append(port.device)
+    except:
+        pass
+    
+    if not ports:
+        # Domyślne porty według systemu
+        system = platform.system().lower()
+        if 'windows' in system:
+            ports = ['COM1', 'COM2', 'COM3', 'COM4', 'COM5']
+        elif 'linux' in system:
+            ports = ['/dev/ttyUSB0', '/dev/ttyUSB1', '/dev/ttyACM0', '/dev/ttyACM1', '/dev/ttyS0', '/dev/ttyS1']
+        elif 'darwin' in system:  # macOS
+            ports = ['/dev/tty.usbserial', '/dev/tty.usbmodem', '/dev/cu.usbserial', '/dev/cu.usbmodem']
+        else:
+            ports = ['/dev/ttyUSB0', '/dev/ttyACM0']  # Domyślnie Linux
+    
+    return ports if ports else ['brak_portów']
+
+def get_default_serial_port():
+    """Zwraca domyślny port szeregowy według systemu"""
+    system = platform.system().lower()
+    if 'windows' in system:
+        return 'COM4'
+    elif 'linux' in system:
+        # Sprawdź które porty faktycznie istnieją
+        common_linux_ports = ['/dev/ttyUSB0', '/dev/ttyACM0', '/dev/ttyUSB1', '/dev/ttyACM1']
+        for port in common_linux_ports:
+            if os.path.exists(port):
+                return port
+        return '/dev/ttyUSB0'  # Domyślny jeśli nic nie znaleziono
+    elif 'darwin' in system:  # macOS
+        return '/dev/cu.usbserial'
+    else:
+        return '/dev/ttyUSB0'
+
+class SerialCommunicator:
+    """Klasa odpowiedzialna za komunikację z urządzeniem w osobnym wątku"""
+    
+    def __init__(self, port=None, baud_rate=9600, console_func=None, polling=None, store=None):
+        self.port = port or get_default_serial_port()
+        self.baud_rate = baud_rate
+        self.console_func = console_func or (lambda x: None)
+        self.connection = None
+        self.connected = False
+        self.running = False
+        self.thread = None
+        
+        # Komendy do wysłania (priorytety, łączenie zastąpionych komend)
+        self.commands = CommandScheduler()
+        
+        # Wspólny bufor próbek (czas, temperatura, prąd, nastawa) - czytelnicy
+        # odbierają nowe próbki przez SampleCursor zamiast kolejki danych
+        self.store = store if store is not None else SampleStore(config.get('buffer_capacity', DEFAULT_CAPACITY))
+        
+        # Ostatnie odczytane wartości
+        self.last_temperature = 0.0
+        self.last_current = 0.0
+        self.set_temperature = float('nan')  # Nieznana do pierwszej odpowiedzi TPRS
+        
+        # Silnik odpytywania (częstotliwości zapytań, limit zapytań w locie)
+        self.polling = polling or PollingEngine.from_config(config)
+        self.report_interval = 30.0  # Co ile sekund raportować osiągniętą częstotliwość
+        self.last_report = time.monotonic()
+        
+        # Stan sesji komunikacji
+        self.error_count = 0
+        self.max_errors = 10
+        self.parser = FrameParser()  # Odebrane bajty bez kompletnej ramki
+        self.wake_func = None   # Budzi wspólną pętlę DeviceManager po dodaniu komendy
+        
+        self.start_time = time.time()
+        self._register_metrics()
+    
+    def _register_metrics(self):
+        """Rejestruje metryki urządzenia (etykieta port) we wspólnym rejestrze"""
+        labels = {'port': self.port}
+        self.metric_errors = registry.counter('kontroler_comm_errors_total', "Błędy komunikacji", **labels)
+        self.metric_parse_errors = registry.counter('kontroler_parse_errors_total',
+                                                    "Odpowiedzi ze zniekształconą wartością", **labels)
+        self.metric_unknown = registry.counter('kontroler_unknown_responses_total', "Nierozpoznane linie", **labels)
+        self.metric_latency = {}
+        registry.function('kontroler_samples_total', "Zapisane próbki temperatury",
+                          lambda: self.store.count, 'counter', **labels)
+        registry.function('kontroler_connected', "Czy urządzenie jest połączone",
+                          lambda: int(self.connected), **labels)
+        registry.function('kontroler_command_queue_depth', "Komendy czekające na wysłanie",
+                          self.commands.depth, **labels)
+        registry.function('kontroler_commands_coalesced_total', "Komendy zastąpione nowszymi przed wysłaniem",
+                          lambda: self.commands.coalesced, 'counter', **labels)
+        registry.function('kontroler_queries_in_flight', "Zapytania czekające na odpowiedź",
+                          lambda: len(self.polling.in_flight), **labels)
+        for name, query in self.polling.queries.items():
+            self.metric_latency[name] = registry.histogram('kontroler_query_latency_seconds',
+                                                           "Czas zapytanie-odpowiedź", type=name, **labels)
+            registry.function('kontroler_query_timeouts_total', "Zapytania bez odpowiedzi",
+                              lambda query=query: query.timeouts, 'counter', type=name, **labels)
+            registry.function('kontroler_query_rate_hz', "Osiągnięta częstotliwość odpowiedzi",
+                              query.achieved_rate, type=name, **labels)
+    
+    def _count_error(self):
+        """Liczy błąd komunikacji (licznik zatrzymania i metryka)"""
+        self.error_count += 1
+        self.metric_errors.inc()
+        
+    def connect(self):
+        """Nawiązuje połączenie z urządzeniem"""
+        try:
+            # Sprawdź czy port istnieje (ważne na Linuxie)
+            if not platform.system().lower().startswith('win') and not os.path.exists(self.port):
+                self.console_func(f"Port {self.port} nie istnieje")
+                return False
+                
+            self.connection = serial.Serial(self.port, self.baud_rate, timeout=0.5)
+            self.connected = True
+            self.console_func(f"Połączono z urządzeniem na porcie {self.port}")
+            return True
+        except serial.SerialException as e:
+            self.connected = False
+            self.console_func(f"Błąd połączenia szeregowego z portem {self.port}: {e}")
+            return False
+        except PermissionError as e:
+            self.connected = False
+            self.console_func(f"Brak uprawnień do portu {self.port}: {e}")
+            self.console_func("Na Linuxie spróbuj: sudo usermod -a -G dialout $USER")
+            return False
+        except Exception as e:
+            self.connected = False
+            self.console_func(f"Błąd połączenia z portem {self.port}: {e}")
+            return False
+    
+    def disconnect(self):
+        """Rozłącza z urządzeniem i zatrzymuje wątki"""
+        self.running = False
+        
+        if self.thread:
+            self.thread.join(timeout=2)
+            
+        if self.connection:
+            self.connection.close()
+        self.connected = False
+        self.console_func("Rozłączono z urządzeniem")
+    
+    def start_communication(self):
+        """Rozpoczyna komunikację w osobnym wątku"""
+        if not self.connected:
+            return False
+            
+        self.running = True
+        self.thread = threading.Thread(target=self._communication_loop, name=f'komunikacja {self.port}', daemon=True)
+        self.thread.start()
+        self.console_func("Rozpoczęto komunikację w tle")
+        return True
+    
+    def _communication_loop(self):
+        """Główna pętla komunikacji działająca w tle"""
+        self.begin_session()
+        while self.running and self.service(time.monotonic()):
+            profiling.checkpoint()
+            time.sleep(self.wait_time(time.monotonic()))
+        self.end_session()
+        profiling.release()
+    
+    def begin_session(self):
+        """Przygotowuje komunikację (wątek własny lub wspólna pętla DeviceManager)"""
+        self.error_count = 0
+        self.last_report = time.monotonic()
+        self.parser.clear()
+        
+        # Odczytaj nastawę urządzenia na starcie
+        self.polling.trigger('TPRS')
+    
+    def end_session(self):
+        """Kończy komunikację"""
+        if self.error_count >= self.max_errors:
+            self.console_func(f"Zbyt wiele błędów komunikacji ({self.error_count}), zatrzymywanie...")
+            self.connected = False
+        
+        self.console_func("Zakończono pętlę komunikacji")
+    
+    def service(self, now, receive=True):
+        """Jeden krok komunikacji: komendy, zapytania, odbiór odpowiedzi.
+        
+        Zwraca False, gdy komunikację należy zakończyć.
+        """
+        if not self.connected or self.error_count >= self.max_errors:
+            return False
+        try:
+            if self._send_commands() and self._send_queries(now) and (not receive or self._receive()):
+                now = time.monotonic()
+                self.polling.expire(now)
+                
+                if now - self.last_report >= self.report_interval:
+                    self.console_func(f"Próbkowanie: {self.polling.rate_report()}")
+                    self.last_report = now
+                
+        except Exception as e:
+            self.console_func(f"Nieoczekiwany błąd komunikacji: {e}")
+            self._count_error()
+        return self.error_count < self.max_errors
+    
+    def wait_time(self, now):
+        """Czas [s] do następnego kroku: najbliższe zapytanie, ale często, gdy czekamy na odpowiedź"""
+        wait = self.polling.time_to_next(now)
+        if self.polling.in_flight:
+            wait = min(wait, 0.005)
+        return max(wait, 0.001)
+    
+    def _send_commands(self):
+        """Wysyła wszystkie czekające komendy użytkownika (najpilniejsze najpierw)"""
+        try:
+            entries = self.commands.pop_all()
+            for entry in entries:
+                self.connection.write(str.encode(entry.command))
+                self.metric_command_latency(entry.kind).observe(time.monotonic() - entry.queued_at)
+                if entry.kind == 'setpoint':
+                    self.polling.trigger('TPRS')  # Potwierdź nową nastawę
+        except Exception as e:
+            self.console_func(f"Błąd wysyłania komendy: {e}")
+            self._count_error()
+            return False
+        return True
+    
+    def metric_command_latency(self, kind):
+        """Histogram czasu od dodania komendy do zapisu do portu dla danego rodzaju"""
+        return registry.histogram('kontroler_command_latency_seconds', "Czas kolejka-port komendy",
+                                  kind=kind or 'inna', port=self.port)
+    
+    def _send_queries(self, now):
+        """Wysyła zaplanowane zapytania (do limitu zapytań w locie)"""
+        try:
+            for command in self.polling.due_commands(now):
+                self.connection.write(str.encode(command))
+            self.connection.flush()  # Wymusza wysłanie
+        except Exception as e:
+            self.console_func(f"Błąd wysyłania standardowego zapytania: {e}")
+            self._count_error()
+            return False
+        return True
+    
+    def _receive(self):
+        """Odczytuje wszystkie dostępne bajty i przetwarza kompletne ramki odpowiedzi"""
+        try:
+            waiting = self.connection.in_waiting
+            if not waiting:
+                return True
+            for kind, value, frame in self.parser.feed(self.connection.read(waiting)):
+                kind = self._process_response(kind, value, frame)
+                query = self.polling.on_response(kind, time.monotonic()) if kind else None
+                if query is not None and kind in self.metric_latency:
+                    self.metric_latency[kind].observe(query.last_latency)
+                self.error_count = 0  # Reset licznika błędów po udanej komunikacji
+        except Exception as e:
+            self.console_func(f"Błąd odbioru danych: {e}")
+            self._count_error()
+            return False
+        return True
+    
+    def _process_response(self, kind, value, frame):
+        """Przetwarza sparsowaną ramkę odpowiedzi i zwraca jej typ (None dla błędnej)"""
+        if kind is None:
+            self.metric_unknown.inc()
+            return None
+        if value is None:
+            self.metric_parse_errors.inc()
+            self.console_func(f"Błąd parsowania odpowiedzi '{frame.decode('Latin-1').strip()}'")
+            return None
+        
+        if kind == 'TPRS':
+            self.set_temperature = value
+            
+        elif kind == 'TACT':
+            self.last_temperature = value
+            # Prąd próbkowany rzadziej - zapisz ostatnią znaną wartość
+            self.store.append(time.time() - self.start_time, self.last_temperature,
+                              self.last_current, self.set_temperature)
+            
+        elif kind == 'IOUT':
+            self.last_current = value
+        return kind
+    
+    def send_command(self, command):
+        """Dodaje komendę do kolejki wysyłania"""
+        if self.connected:
+            merged = self.commands.add(command)
+            if self.wake_func:
+                self.wake_func()
+            if merged:
+                self.console_func(f"Komenda zastąpiła czekającą: {command}")
+            else:
+                self.console_func(f"Dodano komendę do kolejki: {command}")
+        else:
+            self.console_func("Brak połączenia - komenda nie została wysłana")
+    
+    def cursor(self, position=0):
+        """Zwraca kursor odczytu nowych próbek (SampleCursor.fetch zamiast kolejki danych)"""
+        return SampleCursor(self.store, position)
+    
+    def rate_report(self):
+        """Zwraca raport częstotliwości próbkowania (osiągnięta/zadana)"""
+        return self.polling.rate_report()
+    
+    def get_poll_stats(self):
+        """Zwraca częstotliwość próbkowania zadaną i osiągniętą"""
+        return self.polling.stats()
+    
+    def get_all_data(self):
+        """Zwraca wszystkie zebrane dane jako widoki bufora (bez kopiowania)"""
+        return self.store.columns()
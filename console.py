@@ -0,0 +1,95 @@
+"""Bufor komunikatów konsoli: poziomy, ograniczanie częstotliwości i zbiorcze wyświetlanie"""
+import queue
+import time
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+LEVELS = {'DEBUG': DEBUG, 'INFO': INFO, 'WARNING': WARNING, 'ERROR': ERROR}
+
+DEFAULT_MAX_LINES = 1000
+DEFAULT_RATE_LIMIT = 5        # Komunikatów jednej kategorii na okres
+DEFAULT_RATE_PERIOD = 1.0     # Długość okresu ograniczania [s]
+
+
+class ConsoleSink:
+    """Zbiera komunikaty z dowolnych wątków i wydaje je partiami wątkowi GUI.
+
+    Komunikaty poniżej ustawionego poziomu są odrzucane od razu. Z każdej kategorii
+    przepuszczanych jest najwyżej rate_limit komunikatów na okres, a pozostałe są
+    zliczane i raportowane jedną linią ("+312 komunikatów: sample").
+    """
+
+    def __init__(self, level=INFO, max_lines=DEFAULT_MAX_LINES,
+                 rate_limit=DEFAULT_RATE_LIMIT, rate_period=DEFAULT_RATE_PERIOD):
+        self.level = level
+        self.max_lines = max_lines
+        self.rate_limit = rate_limit
+        self.rate_period = rate_period
+        self._queue = queue.SimpleQueue()
+        self._windows = {}  # kategoria -> [początek okresu, przepuszczone, pominięte]
+
+    def set_level(self, level):
+        """Ustawia minimalny poziom komunikatów (liczba lub nazwa)"""
+        self.level = LEVELS.get(level, level) if isinstance(level, str) else level
+
+    def enabled(self, level):
+        """Sprawdza, czy komunikaty danego poziomu będą wyświetlane"""
+        return level >= self.level
+
+    def log(self, message, level=INFO, category=None):
+        """Dodaje komunikat (bezpieczne z każdego wątku)"""
+        if level >= self.level:
+            self._queue.put((time.time(), level, category, message))
+
+    def drain(self, now=None):
+        """Zwraca linie do wyświetlenia w tej klatce"""
+        now = time.time() if now is None else now
+        lines = []
+        while True:
+            try:
+                timestamp, level, category, message = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if level < self.level:
+                continue
+            if category is not None and not self._admit(category, timestamp, lines):
+                continue
+            lines.append(self._format(timestamp, level, message))
+
+        # Zakończ okresy, które minęły, i zgłoś pominięte komunikaty
+        for category, window in list(self._windows.items()):
+            if now - window[0] >= self.rate_period:
+                self._report_suppressed(category, window, lines, now)
+                del self._windows[category]
+        return lines
+
+    def _admit(self, category, timestamp, lines):
+        """Sprawdza limit kategorii; zwraca False, jeśli komunikat należy pominąć"""
+        window = self._windows.get(category)
+        if window is None or timestamp - window[0] >= self.rate_period:
+            if window is not None:
+                self._report_suppressed(category, window, lines, timestamp)
+            window = self._windows[category] = [timestamp, 0, 0]
+        if window[1] < self.rate_limit:
+            window[1] += 1
+            return True
+        window[2] += 1
+        return False
+
+    def _report_suppressed(self, category, window, lines, timestamp):
+        if window[2]:
+            lines.append(self._format(timestamp, INFO, f"+{window[2]} komunikatów: {category}"))
+
+    @staticmethod
+    def _format(timestamp, level, message):
+        prefix = '' if level == INFO else f"[{_level_name(level)}] "
+        return f"{time.strftime('%H:%M:%S', time.localtime(timestamp))}: {prefix}{message}\n"
+
+
+def _level_name(level):
+    for name, value in LEVELS.items():
+        if value == level:
+            return name
+    return str(level)
@@ -0,0 +1,245 @@
+"""Akwizycja bez interfejsu graficznego (np. serwery bez X)
+
+Uruchomienie (z katalogu aplikacji):
+    python3 daemon.py [--port /dev/ttyUSB0] [--setpoint 25] [--pid 6 7 4] [--current on] [--stdin]
+
+Porty, prędkość, odpytywanie i nagrywanie pochodzą z config.json (jak w aplikacji okienkowej).
+Zatrzymanie: SIGTERM (kill PID, systemctl stop) lub SIGINT (Ctrl+C) - demon kończy nagrania
+(stopka z indeksem czasu) i zamyka porty. Z opcją --stdin przyjmuje komendy ze standardowego
+wejścia: "setpoint 25", "pid 6 7 4", "current on|off", "status", "profile", "stop".
+SIGUSR1 (kill -USR1 PID) lub komenda "profile" włącza i wyłącza profilowanie (pliki .pstats
+i .folded w katalogu nagrań).
+Z --metrics-port (lub metrics_port w config.json) udostępnia metryki Prometheus na 127.0.0.1.
+
+Moduł nie importuje tkinter ani matplotlib.
+"""
+import argparse
+import math
+import signal
+import sys
+import threading
+import time
+
+import profiling
+from communicator import SerialCommunicator, config, load_config, get_default_serial_port, CONFIG_FILE
+from devices import DeviceManager
+from metrics import MetricsServer
+from protocol import setpoint_command, pid_command, current_command
+from recording import Recorder, recording_filename, DEFAULT_RECORDING_DIR, DEFAULT_FSYNC_INTERVAL
+from samplestore import SampleStore, DEFAULT_CAPACITY
+
+STATUS_INTERVAL = 60.0  # Co ile sekund wypisywać stan pomiaru
+
+
+def log(message):
+    """Wypisuje komunikat z czasem na standardowe wyjście"""
+    print(f"{time.strftime('%H:%M:%S')}: {message}", flush=True)
+
+
+class AcquisitionDaemon:
+    """Akwizycja z jednego lub kilku kontrolerów, komendy i ciągłe nagrywanie bez GUI"""
+
+    def __init__(self, ports, baud_rate=9600, recording=True, console_func=log):
+        self.console_func = console_func
+        self.recording = recording
+        capacity = config.get('buffer_capacity', DEFAULT_CAPACITY)
+        self.communicators = [SerialCommunicator(port=port, baud_rate=baud_rate, console_func=console_func,
+                                                 store=SampleStore(capacity))
+                              for port in ports]
+        for communicator in self.communicators[1:]:
+            communicator.start_time = self.communicators[0].start_time  # Wspólna oś czasu
+        self.devices = DeviceManager(self.communicators, console_func=console_func)
+        self.recorders = []
+        self.stop_event = threading.Event()
+        self.wake_event = threading.Event()  # Przerywa czekanie w run() (zatrzymanie, profilowanie)
+        self.profile_requested = False
+
+    def start(self):
+        """Łączy z urządzeniami, uruchamia komunikację i nagrywanie; zwraca False bez połączenia"""
+        for communicator in self.communicators:
+            communicator.connect()
+        if not self.devices.start():
+            self.console_func("Brak połączenia z urządzeniem")
+            return False
+
+        if self.recording:
+            for number, communicator in enumerate(self.communicators, start=1):
+                if not communicator.connected:
+                    continue
+                try:
+                    recorder = Recorder(communicator.store,
+                                        recording_filename(config.get('recording_dir', DEFAULT_RECORDING_DIR), number),
+                                        metadata={'config': config.copy(), 'serial_port': communicator.port},
+                                        fsync_interval=config.get('fsync_interval', DEFAULT_FSYNC_INTERVAL),
+                                        console_func=self.console_func)
+                    recorder.start()
+                    self.recorders.append(recorder)
+                except Exception as e:
+                    self.console_func(f"Nie udało się rozpocząć nagrywania ({communicator.port}): {e}")
+        return True
+
+    def send(self, command):
+        """Wysyła komendę do wszystkich połączonych urządzeń"""
+        for communicator in self.devices.active:
+            communicator.send_command(command)
+
+    def command(self, line):
+        """Wykonuje komendę tekstową ("setpoint 25", "pid 6 7 4", "current on", "status", "profile", "stop")"""
+        words = line.split()
+        if not words:
+            return
+        try:
+            name, arguments = words[0].lower(), words[1:]
+            if name == 'setpoint':
+                self.send(setpoint_command(float(arguments[0])))
+            elif name == 'pid':
+                self.send(pid_command(*(float(value) for value in arguments[:3])))
+            elif name == 'current':
+                self.send(current_command(arguments[0].lower() in ('on', '1', 'tak')))
+            elif name == 'status':
+                self.console_func(self.status())
+            elif name == 'profile':
+                self.request_profiling()
+            elif name == 'stop':
+                self.request_stop()
+            else:
+                self.console_func(f"Nieznana komenda: {line.strip()}")
+        except (IndexError, TypeError, ValueError):
+            self.console_func(f"Błędne argumenty komendy: {line.strip()}")
+
+    def status(self):
+        """Zwraca jednoliniowe podsumowanie stanu urządzeń"""
+        parts = []
+        for communicator in self.communicators:
+            latest = communicator.store.latest()
+            if latest is None:
+                parts.append(f"{communicator.port}: brak danych")
+            else:
+                setpoint = communicator.set_temperature
+                setpoint = 'nieznana' if math.isnan(setpoint) else f"{setpoint}°C"
+                parts.append(f"{communicator.port}: {latest[1]:.2f}°C, {latest[2]:.3f}A "
+                             f"(zadana {setpoint}, {communicator.store.count} próbek)")
+        return "; ".join(parts)
+
+    def request_stop(self):
+        """Zleca zatrzymanie (bezpieczne w obsłudze sygnału i w innym wątku)"""
+        self.stop_event.set()
+        self.wake_event.set()
+
+    def request_profiling(self):
+        """Zleca przełączenie profilowania w wątku głównym (run); jak request_stop"""
+        self.profile_requested = True
+        self.wake_event.set()
+
+    def toggle_profiling(self):
+        """Rozpoczyna lub kończy profilowanie wątków akwizycji"""
+        try:
+            started, result = profiling.toggle(config.get('recording_dir', DEFAULT_RECORDING_DIR))
+        except Exception as e:
+            self.console_func(f"Błąd profilowania: {e}")
+            return
+        if started:
+            self.console_func("Rozpoczęto profilowanie")
+        else:
+            stats_path, folded_path = result
+            self.console_func(f"Profilowanie zakończone: {stats_path or 'brak profilu cProfile'}, {folded_path}")
+
+    def read_commands(self, stream):
+        """Czyta komendy z podanego strumienia (w osobnym wątku)"""
+        def reader():
+            for line in stream:
+                self.command(line)
+        threading.Thread(target=reader, daemon=True).start()
+
+    def run(self, status_interval=STATUS_INTERVAL, duration=None):
+        """Czeka na sygnał zatrzymania (lub koniec czasu pracy), wypisując co jakiś czas stan"""
+        end = None if duration is None else time.monotonic() + duration
+        next_status = time.monotonic() + status_interval
+        while not self.stop_event.is_set():
+            now = time.monotonic()
+            if end is not None and now >= end:
+                break
+            self.wake_event.wait(min(next_status, end if end is not None else next_status) - now)
+            self.wake_event.clear()
+            if self.profile_requested:
+                self.profile_requested = False
+                self.toggle_profiling()
+            if self.stop_event.is_set():
+                break
+            if time.monotonic() >= next_status:
+                self.console_func(self.status())
+                next_status += status_interval
+            if not self.devices.active:
+                self.console_func("Utracono połączenie ze wszystkimi urządzeniami")
+                break
+
+    def stop(self):
+        """Kończy nagrania i zamyka połączenia"""
+        for recorder in self.recorders:
+            path = recorder.stop()
+            self.console_func(f"Nagranie zapisane: {path}")
+        self.recorders = []
+        self.devices.stop()
+        for communicator in self.communicators:
+            if communicator.connected:
+                communicator.disconnect()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Akwizycja bez interfejsu graficznego")
+    parser.add_argument('--config', default=CONFIG_FILE, help="plik konfiguracji")
+    parser.add_argument('--port', action='append', help="port szeregowy (można podać kilka razy)")
+    parser.add_argument('--baud', type=int, help="prędkość portu (domyślnie z konfiguracji)")
+    parser.add_argument('--setpoint', type=float, help="temperatura zadana na starcie [°C]")
+    parser.add_argument('--pid', type=float, nargs=3, metavar=('P', 'I', 'D'), help="nastawy PID na starcie")
+    parser.add_argument('--current', choices=['on', 'off'], help="włącz/wyłącz prąd na starcie")
+    parser.add_argument('--duration', type=float, help="czas pracy [s] (domyślnie do sygnału)")
+    parser.add_argument('--status-interval', type=float, default=STATUS_INTERVAL, help="co ile sekund wypisywać stan")
+    parser.add_argument('--no-recording', action='store_true', help="nie zapisuj nagrania .kbin")
+    parser.add_argument('--metrics-port', type=int, help="port HTTP metryk Prometheus (domyślnie metrics_port z konfiguracji)")
+    parser.add_argument('--stdin', action='store_true', help="przyjmuj komendy ze standardowego wejścia")
+    args = parser.parse_args()
+
+    load_config(args.config)
+    ports = args.port or config.get('serial_ports') or [config.get('serial_port', get_default_serial_port())]
+    daemon = AcquisitionDaemon(ports, args.baud or int(config.get('port', 9600)),
+                               recording=config.get('recording', True) and not args.no_recording)
+
+    # Sygnały tylko ustawiają zdarzenie - zamykanie i profilowanie odbywają się w głównym wątku (run)
+    def request_stop(signum, frame):
+        log(f"Otrzymano sygnał {signal.Signals(signum).name} - zatrzymywanie")
+        daemon.request_stop()
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+    if hasattr(signal, 'SIGUSR1'):
+        signal.signal(signal.SIGUSR1, lambda signum, frame: daemon.request_profiling())
+
+    if not daemon.start():
+        daemon.stop()
+        sys.exit(1)
+    metrics_server = None
+    metrics_port = args.metrics_port or config.get('metrics_port')
+    if metrics_port:
+        metrics_server = MetricsServer(int(metrics_port)).start()
+        log(f"Metryki: {metrics_server.address}")
+    try:
+        if args.pid:
+            daemon.send(pid_command(*args.pid))
+        if args.setpoint is not None:
+            daemon.send(setpoint_command(args.setpoint))
+        if args.current:
+            daemon.send(current_command(args.current == 'on'))
+        if args.stdin:
+            daemon.read_commands(sys.stdin)
+        daemon.run(args.status_interval, args.duration)
+    finally:
+        if profiling.current() is not None:
+            daemon.toggle_profiling()
+        daemon.stop()
+        if metrics_server is not None:
+            metrics_server.stop()
+        log("Akwizycja zakończona")
+
+
+if __name__ == "__main__":
+    main()
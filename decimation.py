@@ -0,0 +1,163 @@
+"""Decymacja min/max serii pomiarowych przed rysowaniem"""
+import math
+
+import numpy as np
+
+from samplestore import TIME
+
+POINTS_PER_PIXEL = 2  # Docelowa liczba punktów na piksel szerokości wykresu
+
+
+def minmax_buckets(keys, x, y):
+    """Redukuje posortowane po kluczu próbki do (klucz, x i y minimum, x i y maksimum) na kubełek.
+
+    Jedno przejście bez sortowania: minimum to pierwsza, a maksimum ostatnia próbka
+    kubełka o wartości skrajnej (NaN pomijane; kubełek z samych NaN daje jego pierwszą próbkę).
+    """
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(keys)) + 1))
+    bucket = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, len(keys))))
+    numbers = np.arange(len(starts))
+    low = np.fmin.reduceat(y, starts)
+    high = np.fmax.reduceat(y, starts)
+    hits = np.flatnonzero((y == low[bucket]) | np.isnan(low)[bucket])
+    imin = hits[np.searchsorted(bucket[hits], numbers, side='left')]
+    hits = np.flatnonzero((y == high[bucket]) | np.isnan(high)[bucket])
+    imax = hits[np.searchsorted(bucket[hits], numbers, side='right') - 1]
+    return keys[starts], x[imin], y[imin], x[imax], y[imax]
+
+
+def envelope_points(xmin, ymin, xmax, ymax):
+    """Układa minimum i maksimum każdego kubełka w kolejności czasu jako linię do narysowania"""
+    min_first = xmin <= xmax
+    xs = np.empty(2 * len(xmin))
+    ys = np.empty(2 * len(xmin))
+    xs[0::2] = np.where(min_first, xmin, xmax)
+    xs[1::2] = np.where(min_first, xmax, xmin)
+    ys[0::2] = np.where(min_first, ymin, ymax)
+    ys[1::2] = np.where(min_first, ymax, ymin)
+    return xs, ys
+
+
+class MinMaxDecimator:
+    """Przyrostowa decymacja jednej kolumny bufora próbek do obwiedni min/max.
+
+    Szerokość kubełka jest potęgą dwójki, więc zmienia się dopiero wtedy, gdy widoczny
+    zakres urośnie lub zmaleje dwukrotnie - do tego czasu nowe próbki są tylko
+    dokładane do istniejących kubełków, a pełne przeliczenie następuje przy zmianie
+    szerokości kubełka lub przesunięciu zakresu przed najstarszy kubełek.
+
+    Gdy kubełek jest co najmniej tak szeroki jak najdrobniejszy poziom historii bufora,
+    obwiednia powstaje z poziomu historii zamiast z surowych próbek - koszt zależy
+    wtedy od szerokości wykresu w pikselach, a nie od długości pomiaru.
+    """
+
+    def __init__(self, column, points_per_pixel=POINTS_PER_PIXEL):
+        self.column = column
+        self.points_per_pixel = points_per_pixel
+        self.reset()
+
+    def reset(self):
+        """Czyści stan decymacji"""
+        self.bucket_width = None
+        self.next_index = 0  # Numer pierwszej próbki, która nie trafiła jeszcze do kubełków
+        self.keys = np.empty(0, dtype=np.int64)
+        self.xmin = np.empty(0)
+        self.ymin = np.empty(0)
+        self.xmax = np.empty(0)
+        self.ymax = np.empty(0)
+
+    def update(self, store, x0, x1, pixels):
+        """Zwraca (x, y) do narysowania dla widocznego zakresu [x0, x1]"""
+        store.update_tiers()
+        block = store.last()
+        times = block[TIME]
+        if len(times) == 0:
+            return times, block[self.column]
+
+        first = np.searchsorted(times, x0, side='left')
+        last = np.searchsorted(times, x1, side='right')
+        visible = last - first
+        target = max(1, int(pixels) * self.points_per_pixel)
+        if visible <= target:
+            # Mało punktów - rysuj surowe dane bez decymacji
+            self.reset()
+            return times[first:last], block[self.column][first:last]
+
+        # Kubełek o szerokości potęgi dwójki: od 1 do 2 punktów na piksel
+        span = max(x1 - x0, 1e-9)
+        bucket_width = 2.0 ** math.ceil(math.log2(span / (target / 2)))
+        level = store.tier_level(bucket_width)
+        if level is not None:
+            self.reset()
+            return self._from_tier(store, level, x0, x1, target)
+        first_key = math.floor(x0 / bucket_width)
+
+        if (bucket_width != self.bucket_width or self.next_index < store.first_index
+                or len(self.keys) == 0 or first_key < self.keys[0]):
+            self._rebuild(store, bucket_width, first_key)
+        else:
+            self._append(store)
+            self._trim(first_key)
+
+        # Kubełki za prawą krawędzią zostają (dokładanie trwa), ale nie są rysowane
+        stop = np.searchsorted(self.keys, math.floor(x1 / bucket_width), side='right')
+        return envelope_points(self.xmin[:stop], self.ymin[:stop], self.xmax[:stop], self.ymax[:stop])
+
+    def _from_tier(self, store, level, x0, x1, target):
+        """Obwiednia z poziomu historii; nadmiar kubełków łączony po 2^k (granice wyrównane)"""
+        x, ymin, ymax = store.summary(level, self.column, x0)
+        stop = np.searchsorted(x, x1 + store.tiers[level].width / 2, side='right')
+        x, ymin, ymax = x[:stop], ymin[:stop], ymax[:stop]
+        if len(x) > target:
+            width = store.tiers[level].width * 2.0 ** math.ceil(math.log2(len(x) / target))
+            keys = np.floor(x / width)
+            starts = np.concatenate(([0], np.flatnonzero(np.diff(keys)) + 1))
+            x = x[starts]
+            ymin = np.minimum.reduceat(ymin, starts)
+            ymax = np.maximum.reduceat(ymax, starts)
+        return envelope_points(x, ymin, x, ymax)
+
+    def _rebuild(self, store, bucket_width, first_key):
+        """Przelicza kubełki od nowa dla nowej szerokości kubełka"""
+        self.reset()
+        self.bucket_width = bucket_width
+        block = store.last()
+        times = block[TIME]
+        first = np.searchsorted(times, first_key * bucket_width, side='left')
+        self.next_index = store.count - (len(times) - first)
+        self._append(store)
+
+    def _append(self, store):
+        """Dokłada do kubełków próbki dopisane od ostatniej aktualizacji"""
+        block = store.window(self.next_index)
+        self.next_index = store.count
+        if block.shape[1] == 0:
+            return
+        x = block[TIME]
+        y = block[self.column]
+        keys = np.floor(x / self.bucket_width).astype(np.int64)
+        keys, xmin, ymin, xmax, ymax = minmax_buckets(keys, x, y)
+
+        if len(self.keys) and keys[0] == self.keys[-1]:
+            # Pierwszy nowy kubełek kontynuuje ostatni istniejący - połącz je
+            if ymin[0] < self.ymin[-1]:
+                self.xmin[-1], self.ymin[-1] = xmin[0], ymin[0]
+            if ymax[0] >= self.ymax[-1]:
+                self.xmax[-1], self.ymax[-1] = xmax[0], ymax[0]
+            keys, xmin, ymin, xmax, ymax = keys[1:], xmin[1:], ymin[1:], xmax[1:], ymax[1:]
+
+        self.keys = np.concatenate((self.keys, keys))
+        self.xmin = np.concatenate((self.xmin, xmin))
+        self.ymin = np.concatenate((self.ymin, ymin))
+        self.xmax = np.concatenate((self.xmax, xmax))
+        self.ymax = np.concatenate((self.ymax, ymax))
+
+    def _trim(self, first_key):
+        """Usuwa kubełki, które wyszły poza lewą krawędź widocznego zakresu"""
+        keep = np.searchsorted(self.keys, first_key, side='left')
+        if keep:
+            self.keys = self.keys[keep:]
+            self.xmin = self.xmin[keep:]
+            self.ymin = self.ymin[keep:]
+            self.xmax = self.xmax[keep:]
+            self.ymax = self.ymax[keep:]
@@ -0,0 +1,183 @@
+"""Obsługa wielu kontrolerów w jednym procesie
+
+Wszystkie połączenia są obsługiwane przez jeden wątek: pętla czeka w selektorze na dane
+z dowolnego portu albo na termin najbliższego zapytania, a potem wykonuje krok
+komunikacji (SerialCommunicator.service) każdego urządzenia. Tam, gdzie port nie ma
+deskryptora pliku (Windows), pętla sprawdza porty co POLL_INTERVAL.
+
+Błąd selektora (np. deskryptor zamknięty przez rozłączenie portu) odłącza tylko urządzenie
+z nieprawidłowym deskryptorem; pozostałe są obsługiwane dalej.
+"""
+import os
+import selectors
+import socket
+import threading
+import time
+
+import profiling
+
+POLL_INTERVAL = 0.005     # Krok pętli bez deskryptorów plików [s]
+MAX_WAIT = 0.1            # Najdłuższe czekanie między krokami (raporty, limity czasu) [s]
+
+
+class DeviceManager:
+    """Wspólna pętla zdarzeń dla wielu obiektów SerialCommunicator"""
+
+    def __init__(self, communicators=(), console_func=print):
+        self.communicators = list(communicators)
+        self.console_func = console_func
+        self.running = False
+        self.thread = None
+        self.selector = None
+        self._wake_reader = None
+        self._wake_writer = None
+
+    def add(self, communicator):
+        """Dodaje urządzenie (przed start())"""
+        self.communicators.append(communicator)
+
+    @property
+    def active(self):
+        """Urządzenia, z którymi trwa komunikacja"""
+        return [c for c in self.communicators if c.connected]
+
+    def start(self):
+        """Uruchamia wspólną pętlę dla połączonych urządzeń"""
+        devices = self.active
+        if not devices:
+            return False
+
+        self.selector = selectors.DefaultSelector()
+        self._wake_reader, self._wake_writer = socket.socketpair()
+        self._wake_reader.setblocking(False)
+        self._wake_writer.setblocking(False)
+        self.selector.register(self._wake_reader, selectors.EVENT_READ, None)
+
+        self.polled = []  # Urządzenia bez deskryptora pliku
+        for communicator in devices:
+            communicator.begin_session()
+            communicator.wake_func = self.wake
+            try:
+                self.selector.register(communicator.connection.fileno(), selectors.EVENT_READ, communicator)
+            except (AttributeError, OSError, ValueError):
+                self.polled.append(communicator)
+
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, args=(devices,), name='komunikacja', daemon=True)
+        self.thread.start()
+        self.console_func(f"Rozpoczęto komunikację w tle ({len(devices)} urządz.)")
+        return True
+
+    def stop(self):
+        """Zatrzymuje pętlę (połączenia zamyka SerialCommunicator.disconnect)"""
+        self.running = False
+        self.wake()
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=2.0)
+        self.thread = None
+        for communicator in self.communicators:
+            communicator.wake_func = None
+        if self.selector:
+            self.selector.close()
+            self._wake_reader.close()
+            self._wake_writer.close()
+            self.selector = None
+
+    def wake(self):
+        """Przerywa czekanie pętli (np. po dodaniu komendy do kolejki)"""
+        try:
+            self._wake_writer.send(b'\0')
+        except (AttributeError, OSError):
+            pass
+
+    def _loop(self, devices):
+        while self.running and devices:
+            profiling.checkpoint()
+            now = time.monotonic()
+            timeout = min(MAX_WAIT, *(c.polling.time_to_next(now) for c in devices))
+            if self.polled:
+                timeout = min(timeout, POLL_INTERVAL)
+
+            try:
+                events = self.selector.select(max(timeout, 0))
+            except (OSError, ValueError) as e:
+                self._drop_bad_descriptors(devices, e)
+                continue
+
+            ready = set()
+            for key, _ in events:
+                if key.data is None:
+                    self._drain_wake()
+                else:
+                    ready.add(key.data)
+
+            now = time.monotonic()
+            for communicator in list(devices):
+                receive = communicator in ready or communicator in self.polled
+                if not communicator.service(now, receive=receive):
+                    self._remove(communicator, devices)
+                    communicator.end_session()
+
+        for communicator in devices:
+            communicator.end_session()
+        profiling.release()
+
+    def _remove(self, communicator, devices):
+        devices.remove(communicator)
+        if communicator in self.polled:
+            self.polled.remove(communicator)
+        else:
+            self._unregister(communicator)
+
+    def _unregister(self, communicator):
+        # Według klucza selektora - fileno() zamkniętego portu już nie działa
+        for key in list(self.selector.get_map().values()):
+            if key.data is communicator:
+                try:
+                    self.selector.unregister(key.fileobj)
+                except (KeyError, OSError, ValueError):
+                    pass
+
+    def _drop_bad_descriptors(self, devices, error):
+        """Po błędzie selektora odłącza urządzenia z nieprawidłowym deskryptorem"""
+        bad = []
+        for key in list(self.selector.get_map().values()):
+            communicator = key.data
+            if communicator is None:
+                continue
+            try:
+                os.fstat(key.fd)
+                valid = communicator.connection.fileno() == key.fd
+            except (AttributeError, OSError, ValueError):
+                valid = False
+            if not valid:
+                bad.append(communicator)
+        for communicator in bad:
+            self.console_func(f"{communicator.port}: błąd portu ({error}) - urządzenie odłączone")
+            self._remove(communicator, devices)
+            communicator.connected = False
+            communicator.end_session()
+        if not bad:
+            # Nie wiadomo, który deskryptor zawinił - dalej bez selektora, sprawdzając porty co POLL_INTERVAL
+            self.console_func(f"Błąd oczekiwania na dane ({error}) - porty sprawdzane cyklicznie")
+            for communicator in devices:
+                if communicator not in self.polled:
+                    self._unregister(communicator)
+                    self.polled.append(communicator)
+
+    def _drain_wake(self):
+        try:
+            while self._wake_reader.recv(4096):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+
+    def stats(self):
+        """Łączne statystyki: liczba urządzeń i próbek temperatury na sekundę"""
+        rates = [c.polling.stats()['TACT']['achieved_hz'] for c in self.communicators
+                 if 'TACT' in c.polling.queries]
+        return {
+            'devices': len(self.communicators),
+            'active': len(self.active),
+            'samples_per_second': sum(rates),
+        }
@@ -0,0 +1,153 @@
+"""Zbiorczy zapis danych pomiarowych do CSV i JSON w wątku w tle
+
+Wartości są formatowane całymi blokami (jedna operacja formatowania na blok wierszy)
+i dopisywane strumieniowo; wynik jest bajtowo zgodny z dotychczasowymi plikami
+(csv.writer z separatorem ';' oraz json.dump z indent=4).
+"""
+import csv
+import json
+import math
+import os
+import threading
+
+import numpy as np
+
+CSV_HEADER = ['Czas [s]', 'Temperatura [°C]', 'Prąd [A]']
+CSV_ROW_FORMAT = '%.3f;%.2f;%.4f\r\n'
+CHUNK_ROWS = 65536
+
+
+class ExportCancelled(Exception):
+    """Eksport przerwany przez użytkownika"""
+
+
+def _check(cancel):
+    if cancel is not None and cancel.is_set():
+        raise ExportCancelled()
+
+
+def write_csv(file, times, temperature, current, preamble=(), progress=None, cancel=None):
+    """Zapisuje kolumny w układzie data.csv (opcjonalnie poprzedzone wierszami preambuły)"""
+    writer = csv.writer(file, delimiter=';')
+    for row in preamble:
+        writer.writerow(row)
+    writer.writerow(CSV_HEADER)
+
+    n = min(len(times), len(temperature), len(current))
+    for start in range(0, n, CHUNK_ROWS):
+        _check(cancel)
+        stop = min(start + CHUNK_ROWS, n)
+        table = np.empty((stop - start, 3))
+        table[:, 0] = times[start:stop]
+        table[:, 1] = temperature[start:stop]
+        table[:, 2] = current[start:stop]
+        file.write((CSV_ROW_FORMAT * (stop - start)) % tuple(table.ravel().tolist()))
+        if progress:
+            progress(stop / n)
+
+
+def _json_numbers(values):
+    """Formatuje liczby tak jak json.dump"""
+    values = values.tolist()
+    if all(map(math.isfinite, values)):
+        return map(float.__repr__, values)
+    return map(json.dumps, values)
+
+
+def write_json(file, metadata, columns, progress=None, cancel=None):
+    """Zapisuje {"metadata": ..., kolumna: [...], ...} jak json.dump(indent=4), strumieniowo"""
+    file.write('{\n    "metadata": ')
+    file.write(json.dumps(metadata, indent=4).replace('\n', '\n    '))
+
+    total = sum(len(values) for _, values in columns) or 1
+    written = 0
+    for name, values in columns:
+        file.write(f',\n    {json.dumps(name)}: ')
+        if len(values) == 0:
+            file.write('[]')
+            continue
+        file.write('[\n        ')
+        for start in range(0, len(values), CHUNK_ROWS):
+            _check(cancel)
+            if start:
+                file.write(',\n        ')
+            file.write(',\n        '.join(_json_numbers(values[start:start + CHUNK_ROWS])))
+            written += min(CHUNK_ROWS, len(values) - start)
+            if progress:
+                progress(written / total)
+        file.write('\n    ]')
+    file.write('\n}')
+
+
+def write_file_atomic(path, write, encoding=None, newline=None):
+    """Zapisuje do pliku tymczasowego i podmienia go dopiero po udanym zapisie"""
+    temporary = path + '.part'
+    try:
+        with open(temporary, 'w', encoding=encoding, newline=newline) as file:
+            write(file)
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+class ExportJob:
+    """Wykonuje kolejne zadania zapisu w wątku w tle, udostępniając postęp i anulowanie.
+
+    Zadanie to funkcja przyjmująca (progress, cancel), gdzie progress(ułamek) zgłasza
+    postęp zadania, a cancel to threading.Event sprawdzane między blokami.
+    """
+
+    def __init__(self, tasks):
+        self.tasks = list(tasks)
+        self.progress = 0.0
+        self.done = False
+        self.error = None
+        self.cancel_event = threading.Event()
+        self.thread = None
+
+    @property
+    def cancelled(self):
+        """Czy zapis został anulowany"""
+        return self.cancel_event.is_set()
+
+    def start(self):
+        """Uruchamia zapis w tle"""
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return self
+
+    def cancel(self):
+        """Prosi o przerwanie zapisu przy najbliższym bloku"""
+        self.cancel_event.set()
+
+    def _run(self):
+        count = len(self.tasks) or 1
+        try:
+            for number, task in enumerate(self.tasks):
+                def progress(fraction, number=number):
+                    self.progress = (number + fraction) / count
+                task(progress, self.cancel_event)
+                self.progress = (number + 1) / count
+        except ExportCancelled:
+            pass
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+
+
+def csv_task(path, times, temperature, current, preamble=()):
+    """Zadanie ExportJob zapisujące plik CSV"""
+    def task(progress, cancel):
+        write_file_atomic(path, lambda file: write_csv(file, times, temperature, current, preamble, progress, cancel),
+                          encoding='utf-8', newline='')
+    return task
+
+
+def json_task(path, metadata, columns):
+    """Zadanie ExportJob zapisujące plik JSON"""
+    def task(progress, cancel):
+        write_file_atomic(path, lambda file: write_json(file, metadata, columns, progress, cancel))
+    return task
@@ -0,0 +1,85 @@
+"""Przyrostowe śledzenie minimum i maksimum serii pomiarowych"""
+from collections import deque
+
+import numpy as np
+
+from samplestore import TIME
+
+
+class WindowExtrema:
+    """Minimum i maksimum w przesuwnym oknie czasu (kolejki monotoniczne, zamortyzowane O(1))"""
+
+    def __init__(self, window):
+        self.window = window
+        self._min = deque()  # (czas, wartość) z rosnącymi wartościami
+        self._max = deque()  # (czas, wartość) z malejącymi wartościami
+
+    def push(self, t, value):
+        """Dodaje próbkę i usuwa te, które wypadły z okna"""
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((t, value))
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((t, value))
+
+        oldest = t - self.window
+        while self._min[0][0] < oldest:
+            self._min.popleft()
+        while self._max[0][0] < oldest:
+            self._max.popleft()
+
+    def clear(self):
+        self._min.clear()
+        self._max.clear()
+
+    @property
+    def min(self):
+        return self._min[0][1] if self._min else None
+
+    @property
+    def max(self):
+        return self._max[0][1] if self._max else None
+
+
+class ExtremaTracker:
+    """Śledzi min/max jednej kolumny bufora próbek w oknie czasu i w całej historii"""
+
+    def __init__(self, column, window):
+        self.column = column
+        self.windowed = WindowExtrema(window)
+        self.history_min = None
+        self.history_max = None
+        self.next_index = 0  # Numer pierwszej próbki jeszcze nieuwzględnionej
+
+    def update(self, store):
+        """Uwzględnia próbki dopisane do bufora od ostatniego wywołania"""
+        block = store.window(self.next_index)
+        self.next_index = store.count
+        if block.shape[1] == 0:
+            return
+        values = block[self.column]
+
+        low = float(values.min())
+        high = float(values.max())
+        self.history_min = low if self.history_min is None else min(self.history_min, low)
+        self.history_max = high if self.history_max is None else max(self.history_max, high)
+
+        # Do okna trafiają tylko próbki, które mogą się w nim jeszcze znaleźć
+        times = block[TIME]
+        first = np.searchsorted(times, times[-1] - self.windowed.window, side='left')
+        if first > 0:
+            self.windowed.clear()
+        for t, value in zip(times[first:].tolist(), values[first:].tolist()):
+            self.windowed.push(t, value)
+
+    def reset(self):
+        """Zapomina całą historię"""
+        self.windowed.clear()
+        self.history_min = self.history_max = None
+
+    def range(self, windowed=True):
+        """Zwraca (min, max) z okna lub z całej historii"""
+        if windowed:
+            return self.windowed.min, self.windowed.max
+        return self.history_min, self.history_max
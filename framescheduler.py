@@ -0,0 +1,60 @@
+"""Dobór odstępu między klatkami wykresu
+
+Odstęp dopasowuje się do częstotliwości napływu próbek (nie ma sensu rysować częściej,
+niż przychodzą dane) i do zmierzonego kosztu klatki: rysowanie może zająć najwyżej
+ułamek `budget` czasu wątku GUI. Bez nowych danych odstęp rośnie dwukrotnie co klatkę
+aż do max_interval, więc bezczynna aplikacja prawie nie zużywa procesora.
+"""
+
+DEFAULT_FRAME_BUDGET = 0.25   # Najwyżej 25% czasu wątku GUI na rysowanie
+DEFAULT_MIN_INTERVAL = 0.1    # Najkrótszy odstęp klatek [s] (10 klatek/s)
+DEFAULT_MAX_INTERVAL = 1.0    # Najdłuższy odstęp klatek [s] (bez nowych danych)
+SMOOTHING = 0.2               # Waga nowego pomiaru w średnich wykładniczych
+
+
+class FrameScheduler:
+    """Wyznacza odstęp do następnej klatki na podstawie próbek i kosztu rysowania"""
+
+    def __init__(self, budget=DEFAULT_FRAME_BUDGET, min_interval=DEFAULT_MIN_INTERVAL,
+                 max_interval=DEFAULT_MAX_INTERVAL):
+        self.budget = min(max(float(budget), 0.01), 1.0)
+        self.min_interval = float(min_interval)
+        self.max_interval = max(float(max_interval), self.min_interval)
+        self.interval = self.min_interval
+        self.sample_rate = 0.0   # Średnia liczba próbek na sekundę
+        self.frame_cost = 0.0    # Średni czas klatki [s]
+        self.frames = 0          # Narysowane klatki
+        self.skipped = 0         # Klatki pominięte (okno niewidoczne)
+        self._last_observation = None
+
+    @classmethod
+    def from_config(cls, config):
+        """Tworzy harmonogram według sekcji "frames" konfiguracji"""
+        frames = config.get('frames', {})
+        return cls(frames.get('budget', DEFAULT_FRAME_BUDGET),
+                   frames.get('min_interval', DEFAULT_MIN_INTERVAL),
+                   frames.get('max_interval', DEFAULT_MAX_INTERVAL))
+
+    def observe_samples(self, now, count):
+        """Uwzględnia liczbę próbek odebranych od poprzedniej obserwacji"""
+        if self._last_observation is not None and now > self._last_observation:
+            rate = count / (now - self._last_observation)
+            self.sample_rate += SMOOTHING * (rate - self.sample_rate)
+        self._last_observation = now
+
+    def observe_frame(self, cost):
+        """Uwzględnia czas narysowania klatki [s]"""
+        self.frames += 1
+        self.frame_cost = cost if self.frames == 1 else self.frame_cost + SMOOTHING * (cost - self.frame_cost)
+
+    def next_interval(self, new_data):
+        """Zwraca odstęp [s] do następnej klatki"""
+        # Budżet: klatka o koszcie c wymaga odstępu co najmniej c / budget
+        floor = max(self.min_interval, self.frame_cost / self.budget)
+        if new_data:
+            target = 1.0 / self.sample_rate if self.sample_rate > 0 else floor
+            interval = min(max(floor, target), max(floor, self.max_interval))
+        else:
+            interval = max(floor, min(self.interval * 2, self.max_interval))
+        self.interval = interval
+        return interval
@@ -0,0 +1,309 @@
+"""Przeglądanie historii pomiaru: wczytywanie na żądanie tylko widocznego zakresu czasu
+
+Źródła historii zwracają dla zakresu [t0, t1] obwiednię min/max o rozdzielczości
+wykresu (load), niezależnie od długości pomiaru:
+- RecordingHistory - zapisany pomiar (.kbin przez numpy.memmap, data.json/data.csv
+  wczytane raz); rekordy dzielone są na fragmenty po CHUNK_BUCKETS kubełków
+  o 2^poziom rekordach, a zdekodowane fragmenty trafiają do ChunkCache (LRU),
+- StoreHistory - bieżący pomiar z SampleStore: surowe próbki albo poziomy historii
+  bufora, więc przeglądanie nie przeszkadza akwizycji.
+
+Prefetcher w wątku w tle wczytuje fragmenty sąsiadujące z widokiem (przesunięcie
+o szerokość widoku w lewo i w prawo oraz widok oddalony), dzięki czemu przesuwanie
+i przybliżanie trafia zwykle w pamięć podręczną.
+"""
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+import profiling
+from decimation import POINTS_PER_PIXEL
+from recording import load_measurement
+from samplestore import COLUMNS, TIME
+
+CHUNK_BUCKETS = 4096                # Kubełków w jednym fragmencie
+DEFAULT_CACHE_BYTES = 64 * 1024 ** 2  # Limit pamięci podręcznej fragmentów [B]
+
+
+def reduce_buckets(lows, highs, keys):
+    """Łączy sąsiednie kubełki o tym samym kluczu (min z minimów, max z maksimów)"""
+    starts = np.concatenate(([0], np.flatnonzero(keys[1:] != keys[:-1]) + 1))
+    return np.minimum.reduceat(lows, starts, axis=1), np.maximum.reduceat(highs, starts, axis=1)
+
+
+def _level(count, pixels):
+    """Poziom (log2 rekordów na kubełek), przy którym count rekordów mieści się w ok. 2 punktach na piksel"""
+    target = max(1, int(pixels) * POINTS_PER_PIXEL)
+    return max(0, math.ceil(math.log2(count / target))) if count > target else 0
+
+
+def value_range(lows, highs, column):
+    """Zwraca (min, max) kolumny wczytanego zakresu albo None, gdy brak wartości"""
+    lows, highs = lows[column], highs[column]
+    if len(lows) == 0 or np.isnan(lows).all():
+        return None
+    return float(np.nanmin(lows)), float(np.nanmax(highs))
+
+
+def nearest(times, t):
+    """Numer kubełka o czasie najbliższym t (times posortowane, niepuste)"""
+    index = int(np.clip(np.searchsorted(times, t), 1, max(len(times) - 1, 1)))
+    if index >= len(times) or t - times[index - 1] < times[index] - t:
+        index -= 1
+    return index
+
+
+class ChunkCache:
+    """Pamięć podręczna zdekodowanych fragmentów z usuwaniem najdawniej używanych (LRU)"""
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._chunks = OrderedDict()  # klucz -> (lows, highs)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._chunks)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._chunks
+
+    def get(self, key):
+        with self._lock:
+            chunk = self._chunks.get(key)
+            if chunk is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._chunks.move_to_end(key)
+            return chunk
+
+    def put(self, key, chunk):
+        with self._lock:
+            previous = self._chunks.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous[0].nbytes + previous[1].nbytes
+            self._chunks[key] = chunk
+            self.bytes += chunk[0].nbytes + chunk[1].nbytes
+            while self.bytes > self.max_bytes and len(self._chunks) > 1:
+                _, (lows, highs) = self._chunks.popitem(last=False)
+                self.bytes -= lows.nbytes + highs.nbytes
+
+    def discard(self, source):
+        """Usuwa fragmenty jednego źródła (klucze zaczynają się od source)"""
+        with self._lock:
+            for key in [key for key in self._chunks if key[0] == source]:
+                lows, highs = self._chunks.pop(key)
+                self.bytes -= lows.nbytes + highs.nbytes
+
+    def describe(self):
+        lookups = self.hits + self.misses
+        ratio = f"{100 * self.hits / lookups:.0f}%" if lookups else "-"
+        return f"{len(self)} fragm., {self.bytes / 1024 ** 2:.1f} MB, trafienia {ratio}"
+
+
+class RecordingHistory:
+    """Zapisany pomiar: obwiednie widocznego zakresu składane z fragmentów w ChunkCache"""
+
+    def __init__(self, path, cache):
+        self.path = path
+        self.name = os.path.basename(os.path.dirname(os.path.abspath(path))) + '/' + os.path.basename(path)
+        self.cache = cache
+        self.records, self.metadata = load_measurement(path)
+        self.times = self.records['time']  # Widok pola (dla .kbin - bez wczytywania pliku)
+        self.level = 0                     # Poziom ostatniego wczytania (do opisu)
+
+    def time_range(self):
+        if len(self.records) == 0:
+            return None
+        return float(self.times[0]), float(self.times[-1])
+
+    def _span(self, t0, t1, pixels):
+        """Zwraca (poziom, pierwszy rekord, koniec) zakresu z jedną próbką zapasu po obu stronach"""
+        first = max(int(np.searchsorted(self.times, t0, side='left')) - 1, 0)
+        stop = min(int(np.searchsorted(self.times, t1, side='right')) + 1, len(self.records))
+        return _level(stop - first, pixels), first, stop
+
+    def _decode(self, level, number):
+        """Dekoduje fragment: (lows, highs) kolumn dla kubełków po 2^level rekordów"""
+        size = CHUNK_BUCKETS << level
+        records = self.records[number * size:(number + 1) * size]
+        columns = np.empty((len(COLUMNS), len(records)))
+        for index, name in enumerate(COLUMNS):
+            columns[index] = records[name]
+        if level == 0:
+            return columns, columns
+        return reduce_buckets(columns, columns, np.arange(len(records)) >> level)
+
+    def _chunk(self, level, number):
+        """Zwraca fragment z pamięci podręcznej albo dekoduje go i zapamiętuje"""
+        key = (self, level, number)
+        chunk = self.cache.get(key)
+        if chunk is None:
+            chunk = self._decode(level, number)
+            self.cache.put(key, chunk)
+        return chunk
+
+    def load(self, t0, t1, pixels):
+        """Zwraca (lows, highs) - kolumny x kubełki; wiersz TIME to czas pierwszej i ostatniej próbki"""
+        level, first, stop = self._span(t0, t1, pixels)
+        self.level = level
+        if stop <= first:
+            empty = np.empty((len(COLUMNS), 0))
+            return empty, empty
+        first_bucket, stop_bucket = first >> level, ((stop - 1) >> level) + 1
+        numbers = range(first_bucket // CHUNK_BUCKETS, (stop_bucket - 1) // CHUNK_BUCKETS + 1)
+        chunks = [self._chunk(level, number) for number in numbers]
+        lows = np.concatenate([chunk[0] for chunk in chunks], axis=1)
+        highs = np.concatenate([chunk[1] for chunk in chunks], axis=1)
+        offset = numbers[0] * CHUNK_BUCKETS
+        return lows[:, first_bucket - offset:stop_bucket - offset], highs[:, first_bucket - offset:stop_bucket - offset]
+
+    def prefetch(self, t0, t1, pixels):
+        """Dekoduje fragmenty zakresu, których brak w pamięci podręcznej (wątek w tle)"""
+        level, first, stop = self._span(t0, t1, pixels)
+        if stop <= first:
+            return
+        for number in range((first >> level) // CHUNK_BUCKETS, (((stop - 1) >> level)) // CHUNK_BUCKETS + 1):
+            key = (self, level, number)
+            if key not in self.cache:
+                self.cache.put(key, self._decode(level, number))
+
+    def describe(self):
+        return f"{len(self.records)} rekordów, poziom {self.level} ({1 << self.level} rek./kubełek)"
+
+    def close(self):
+        """Zwalnia fragmenty i rekordy (mapowanie pliku zamknie się po ostatnim odwołaniu)"""
+        self.cache.discard(self)
+        self.records = np.empty(0, dtype=self.records.dtype)
+        self.times = self.records['time']
+
+
+class StoreHistory:
+    """Bieżący pomiar z SampleStore: surowe próbki przy przybliżeniu, poziomy historii przy oddaleniu"""
+
+    def __init__(self, store, name="Bieżący pomiar"):
+        self.store = store
+        self.name = name
+        self.level = None  # Szerokość kubełka poziomu ostatniego wczytania [s] (None - surowe)
+
+    def time_range(self):
+        last = self.store.latest()
+        if last is None:
+            return None
+        starts = [tier.minimum[TIME, 0] for tier in self.store.tiers if len(tier)]
+        starts.append(self.store.window(self.store.first_index, self.store.first_index + 1)[TIME, 0])
+        return float(min(starts)), last[TIME]
+
+    def load(self, t0, t1, pixels):
+        """Zwraca (lows, highs) jak RecordingHistory.load"""
+        store = self.store
+        store.update_tiers()
+        target = max(1, int(pixels) * POINTS_PER_PIXEL)
+        level = store.tier_level(2 * (t1 - t0) / target)
+        block = store.last()
+        if level is None and store.tiers and len(store.tiers[0]) and (block.shape[1] == 0 or t0 < block[TIME, 0]):
+            level = 0  # Początek zakresu nadpisany w buforze - zostały tylko poziomy historii
+        if level is None:
+            self.level = None
+            first = max(int(np.searchsorted(block[TIME], t0, side='left')) - 1, 0)
+            stop = int(np.searchsorted(block[TIME], t1, side='right')) + 1
+            lows = highs = block[:, first:stop]
+            if lows.shape[1] > target:
+                # Grupy po 2^k próbek wyrównane do numeru próbki - stabilne przy przesuwaniu
+                shift = math.ceil(math.log2(lows.shape[1] / target))
+                keys = (np.arange(lows.shape[1]) + store.first_index + first) >> shift
+                lows, highs = reduce_buckets(lows, highs, keys)
+            return lows, highs
+
+        tier = store.tiers[level]
+        self.level = tier.width
+        values = [(column, store.summary(level, column, t0 - tier.width))
+                  for column in range(len(COLUMNS)) if column != TIME]
+        x = values[0][1][0]
+        stop = min(int(np.searchsorted(x, t1, side='right')) + 1, len(x))
+        lows = np.empty((len(COLUMNS), stop))
+        highs = np.empty_like(lows)
+        lows[TIME] = highs[TIME] = x[:stop]  # Środek kubełka
+        for column, (_, low, high) in values:
+            # Kolejne wywołania mogą już widzieć nowe próbki - długość wyznacza pierwsze
+            lows[column], highs[column] = low[:stop], high[:stop]
+        if stop > target:
+            width = tier.width * 2.0 ** math.ceil(math.log2(stop / target))
+            lows, highs = reduce_buckets(lows, highs, np.floor(lows[TIME] / width))
+        return lows, highs
+
+    def prefetch(self, t0, t1, pixels):
+        """Dane są w pamięci - nie ma czego wczytywać z wyprzedzeniem"""
+
+    def describe(self):
+        kind = "surowe próbki" if self.level is None else f"poziom {self.level:g} s"
+        return f"{self.store.count} próbek, {kind}"
+
+    def close(self):
+        pass
+
+
+def neighbours(t0, t1):
+    """Zakresy do wczytania z wyprzedzeniem: w prawo, w lewo i widok oddalony dwukrotnie"""
+    width = t1 - t0
+    return [(t1, t1 + width), (t0 - width, t0), (t0 - width / 2, t1 + width / 2)]
+
+
+class Prefetcher:
+    """Wątek w tle wczytujący z wyprzedzeniem zakresy sąsiednie widokowi.
+
+    Każde request() zastępuje niewykonane jeszcze zlecenia - po szybkim przewinięciu
+    wczytywane są tylko okolice ostatniego widoku. Błędy wczytywania trafiają do
+    console_func; widok i tak wczyta potrzebny zakres sam.
+    """
+
+    def __init__(self, console_func=None):
+        self.console_func = console_func or (lambda x: None)
+        self.pending = []
+        self.loaded = 0   # Wykonane zlecenia
+        self.errors = 0   # Zlecenia zakończone błędem
+        self.seconds = 0.0
+        self.running = True
+        self._condition = threading.Condition()
+        self.thread = threading.Thread(target=self._loop, name='historia', daemon=True)
+        self.thread.start()
+
+    def request(self, source, t0, t1, pixels):
+        with self._condition:
+            self.pending = [(source, a, b, pixels) for a, b in neighbours(t0, t1)]
+            self._condition.notify()
+
+    def stop(self):
+        with self._condition:
+            self.running = False
+            self.pending = []
+            self._condition.notify()
+        self.thread.join(timeout=2.0)
+
+    def _loop(self):
+        while True:
+            with self._condition:
+                while self.running and not self.pending:
+                    self._condition.wait()
+                if not self.running:
+                    break
+                source, t0, t1, pixels = self.pending.pop(0)
+            profiling.checkpoint()
+            started = time.perf_counter()
+            try:
+                source.prefetch(t0, t1, pixels)
+            except Exception as e:
+                self.errors += 1
+                self.console_func(f"Błąd wczytywania historii z wyprzedzeniem ({source.name}): {e}")
+            self.seconds += time.perf_counter() - started
+            self.loaded += 1
+        profiling.release()
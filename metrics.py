@@ -0,0 +1,282 @@
+"""Metryki ścieżki akwizycji: liczniki, histogramy opóźnień i eksport w formacie Prometheus
+
+Histogramy są w stylu HDR: wartość (w mikrosekundach) trafia do przedziału o szerokości
+1/16 swojej potęgi dwójki, więc błąd względny percentyli nie przekracza ok. 6% w całym
+zakresie od mikrosekund do godzin, a zapis to kilka operacji na liczbach całkowitych.
+Każda metryka ma jeden wątek zapisujący (komunikator albo wątek okna); odczyt
+z innego wątku może zobaczyć wartości sprzed chwili, co dla monitoringu wystarcza.
+
+Serwer (MetricsServer) udostępnia http://127.0.0.1:<port>/metrics, np. do alarmu
+na spadek rate(kontroler_samples_total[1m]).
+"""
+import operator
+import threading
+
+SUB_BUCKET_BITS = 4
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+UNIT = 1e-6  # Rozdzielczość histogramów [s]
+UNITS_PER_SECOND = 1000000
+
+# Przybliżone granice przedziałów histogramu w eksporcie Prometheus [s]; eksportowane są
+# najbliższe nie mniejsze granice przedziałów HDR (np. 0.001 -> 0.001024), więc liczba przy
+# granicy le to dokładna liczba wartości mniejszych niż le (z rozdzielczością UNIT)
+EXPORT_BOUNDS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(text, quote=False):
+    """Ucieczka znaków według formatu tekstowego Prometheus (\\, \n, w etykietach także \")"""
+    text = str(text).replace('\\', '\\\\').replace('\n', '\\n')
+    return text.replace('"', '\\"') if quote else text
+
+
+def _labels_text(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value, quote=True)}"' for key, value in sorted(labels.items())) + '}'
+
+
+def _value_text(value):
+    """Wartość próbki: liczby całkowite dokładnie, ułamkowe repr() (bez zaokrąglania)"""
+    try:
+        return str(operator.index(value))
+    except TypeError:
+        pass
+    value = float(value)
+    if value != value:
+        return 'NaN'
+    if value in (float('inf'), float('-inf')):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(value)
+
+
+class Counter:
+    """Licznik rosnący"""
+    kind = 'counter'
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def samples(self, name, labels):
+        yield name, labels, self.value
+
+
+class FunctionMetric:
+    """Licznik lub wskaźnik, którego wartość jest odczytywana w chwili eksportu"""
+
+    def __init__(self, func, kind='gauge'):
+        self.func = func
+        self.kind = kind
+
+    @property
+    def value(self):
+        return self.func()
+
+    def samples(self, name, labels):
+        yield name, labels, self.func()
+
+
+class Gauge:
+    """Wartość bieżąca"""
+    kind = 'gauge'
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value):
+        self.value = value
+
+    def samples(self, name, labels):
+        yield name, labels, self.value
+
+
+class Histogram:
+    """Histogram w stylu HDR dla czasów [s]"""
+    kind = 'histogram'
+
+    def __init__(self):
+        self.counts = {}  # indeks przedziału -> liczba
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    @staticmethod
+    def _index(units):
+        if units < SUB_BUCKETS:
+            return units
+        shift = units.bit_length() - SUB_BUCKET_BITS - 1
+        return (shift + 1) * SUB_BUCKETS + (units >> shift) - SUB_BUCKETS
+
+    @staticmethod
+    def _upper(index):
+        """Górna granica przedziału [jednostki]"""
+        if index < SUB_BUCKETS:
+            return index + 1
+        shift = index // SUB_BUCKETS - 1
+        return ((index % SUB_BUCKETS + SUB_BUCKETS + 1) << shift)
+
+    @classmethod
+    def export_bounds(cls, bounds=EXPORT_BOUNDS):
+        """Granice przedziałów HDR [jednostki] najbliższe granicom bounds [s] od góry"""
+        return [cls._upper(cls._index(max(round(bound / UNIT), 1) - 1)) for bound in bounds]
+
+    def observe(self, seconds):
+        """Zapisuje jedną wartość [s]"""
+        index = self._index(max(int(seconds / UNIT), 0))
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q):
+        """Zwraca percentyl q (0-100) [s] lub None bez danych"""
+        if self.count == 0:
+            return None
+        rank = q / 100.0 * self.count
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(self._upper(index) * UNIT, self.max)
+        return self.max
+
+    def cumulative(self, bounds):
+        """Zwraca liczby wartości poniżej kolejnych granic przedziałów HDR [jednostki] (export_bounds)"""
+        items = sorted(self.counts.items())
+        result = []
+        position = seen = 0
+        for bound in bounds:
+            while position < len(items) and self._upper(items[position][0]) <= bound:
+                seen += items[position][1]
+                position += 1
+            result.append(seen)
+        return result
+
+    def samples(self, name, labels):
+        bounds = self.export_bounds()
+        for bound, count in zip(bounds, self.cumulative(bounds)):
+            yield f'{name}_bucket', dict(labels, le=repr(bound / UNITS_PER_SECOND)), count
+        yield f'{name}_bucket', dict(labels, le='+Inf'), self.count
+        yield f'{name}_sum', labels, self.sum
+        yield f'{name}_count', labels, self.count
+
+
+class MetricsRegistry:
+    """Zbiór metryk z etykietami (np. port urządzenia)"""
+
+    def __init__(self):
+        self._metrics = {}  # nazwa -> (opis, {etykiety: metryka})
+        self._lock = threading.Lock()
+
+    def _get(self, name, help, labels, factory):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            _, series = self._metrics.setdefault(name, (help, {}))
+            metric = series.get(key)
+            if metric is None:
+                metric = series[key] = factory()
+            return metric
+
+    def counter(self, name, help, **labels):
+        """Zwraca licznik o danej nazwie i etykietach (tworzy go przy pierwszym użyciu)"""
+        return self._get(name, help, labels, Counter)
+
+    def gauge(self, name, help, **labels):
+        """Zwraca wskaźnik o danej nazwie i etykietach"""
+        return self._get(name, help, labels, Gauge)
+
+    def histogram(self, name, help, **labels):
+        """Zwraca histogram czasów o danej nazwie i etykietach"""
+        return self._get(name, help, labels, Histogram)
+
+    def function(self, name, help, func, kind='gauge', **labels):
+        """Rejestruje metrykę odczytywaną funkcją func() przy eksporcie (zastępuje poprzednią)"""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            _, series = self._metrics.setdefault(name, (help, {}))
+            series[key] = FunctionMetric(func, kind)
+
+    def remove(self, **labels):
+        """Usuwa serie o podanych etykietach (np. po odłączeniu urządzenia)"""
+        with self._lock:
+            for _, series in self._metrics.values():
+                for key in [key for key in series if set(labels.items()) <= set(key)]:
+                    del series[key]
+
+    def get(self, name, **labels):
+        """Zwraca metrykę lub None"""
+        with self._lock:
+            entry = self._metrics.get(name)
+            return entry[1].get(tuple(sorted(labels.items()))) if entry else None
+
+    def series(self, name):
+        """Zwraca listę (etykiety, metryka) dla danej nazwy"""
+        with self._lock:
+            entry = self._metrics.get(name)
+            return [(dict(key), metric) for key, metric in entry[1].items()] if entry else []
+
+    def prometheus_text(self):
+        """Zwraca wszystkie metryki w formacie tekstowym Prometheus"""
+        with self._lock:
+            metrics = [(name, help, list(series.items())) for name, (help, series) in sorted(self._metrics.items())]
+        lines = []
+        for name, help, series in metrics:
+            if not series:
+                continue
+            lines.append(f'# HELP {name} {_escape(help)}')
+            lines.append(f'# TYPE {name} {series[0][1].kind}')
+            for key, metric in series:
+                try:
+                    for sample_name, labels, value in metric.samples(name, dict(key)):
+                        lines.append(f'{sample_name}{_labels_text(labels)} {_value_text(value)}')
+                except Exception:
+                    continue  # Metryka funkcyjna obiektu, którego już nie ma
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()  # Wspólny rejestr aplikacji
+
+
+class MetricsServer:
+    """Serwer HTTP udostępniający metryki pod /metrics (domyślnie tylko lokalnie)"""
+
+    def __init__(self, port, host='127.0.0.1', metrics=None):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # Tylko gdy serwer jest włączony
+        metrics = metrics or registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/metrics', '/'):
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus_text().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Bez wpisu na każde pobranie metryk
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def address(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}/metrics'
+
+    def start(self):
+        """Uruchamia serwer w wątku w tle"""
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
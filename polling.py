@@ -0,0 +1,181 @@
+"""Silnik cyklicznego odpytywania kontrolera temperatury"""
+from collections import deque
+
+# Domyślne częstotliwości odpytywania [Hz]; 0 oznacza zapytanie tylko na żądanie
+DEFAULT_POLL_RATES = {
+    'TACT': 10.0,
+    'IOUT': 5.0,
+    'TPRS': 0.0,
+}
+DEFAULT_MAX_IN_FLIGHT = 2
+DEFAULT_RESPONSE_TIMEOUT = 0.5
+LATENCY_HISTORY = 10000  # Liczba zapamiętanych czasów odpowiedzi na zapytanie
+
+
+class PollQuery:
+    """Pojedyncze zapytanie cykliczne wraz ze statystykami"""
+
+    def __init__(self, name, rate_hz=0.0):
+        self.name = name
+        self.command = f'*GET{name};'
+        self.rate_hz = float(rate_hz)
+        self.interval = 1.0 / self.rate_hz if self.rate_hz > 0 else None
+        self.next_due = 0.0
+        self.pending = False  # Zapytanie na żądanie czeka na wysłanie
+
+        # Statystyki
+        self.sent = 0
+        self.received = 0
+        self.timeouts = 0
+        self.first_response = None
+        self.last_response = None
+        self.last_latency = 0.0
+        self.latencies = deque(maxlen=LATENCY_HISTORY)
+
+    def achieved_rate(self):
+        """Zwraca faktycznie osiągniętą częstotliwość odpowiedzi [Hz]"""
+        if self.received < 2 or self.last_response == self.first_response:
+            return 0.0
+        return (self.received - 1) / (self.last_response - self.first_response)
+
+
+class PollingEngine:
+    """Planuje zapytania, pilnuje limitu zapytań w locie i dopasowuje odpowiedzi.
+
+    Silnik nie wykonuje operacji wejścia/wyjścia - zwraca komendy do wysłania
+    i przyjmuje informację o odebranych odpowiedziach, dzięki czemu może go
+    napędzać zarówno wątek komunikatora, jak i wspólna pętla zdarzeń.
+    """
+
+    def __init__(self, rates=None, max_in_flight=DEFAULT_MAX_IN_FLIGHT,
+                 response_timeout=DEFAULT_RESPONSE_TIMEOUT):
+        rates = dict(DEFAULT_POLL_RATES if rates is None else rates)
+        self.queries = {name: PollQuery(name, rate) for name, rate in rates.items()}
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.response_timeout = float(response_timeout)
+        self.in_flight = deque()  # (zapytanie, czas wysłania) w kolejności wysyłania
+        self.unmatched = 0
+
+    @classmethod
+    def from_config(cls, config):
+        """Tworzy silnik na podstawie sekcji 'polling' konfiguracji"""
+        polling = config.get('polling', {})
+        return cls(
+            rates=polling.get('rates', DEFAULT_POLL_RATES),
+            max_in_flight=polling.get('max_in_flight', DEFAULT_MAX_IN_FLIGHT),
+            response_timeout=polling.get('response_timeout', DEFAULT_RESPONSE_TIMEOUT),
+        )
+
+    def trigger(self, name):
+        """Zleca jednorazowe wysłanie zapytania (np. TPRS po zmianie nastawy)"""
+        query = self.queries.get(name)
+        if query is not None:
+            query.pending = True
+
+    def set_rate(self, name, rate_hz):
+        """Zmienia częstotliwość odpytywania w trakcie pracy"""
+        query = self.queries.get(name)
+        if query is None:
+            query = self.queries[name] = PollQuery(name, rate_hz)
+        query.rate_hz = float(rate_hz)
+        query.interval = 1.0 / query.rate_hz if query.rate_hz > 0 else None
+
+    def due_commands(self, now):
+        """Zwraca komendy, które należy teraz wysłać, i rejestruje je jako wysłane"""
+        commands = []
+        while len(self.in_flight) < self.max_in_flight:
+            query = self._most_overdue(now)
+            if query is None:
+                break
+            if query.pending:
+                query.pending = False
+            else:
+                # Nie kumuluj zaległości - przy przeciążeniu po prostu tracimy cykle
+                query.next_due += query.interval
+                if query.next_due <= now:
+                    query.next_due = now + query.interval
+            query.sent += 1
+            self.in_flight.append((query, now))
+            commands.append(query.command)
+        return commands
+
+    def _most_overdue(self, now):
+        """Wybiera zapytanie o najstarszym zaległym terminie"""
+        best = None
+        best_due = None
+        for query in self.queries.values():
+            if query.pending:
+                due = now
+            elif query.interval is not None and query.next_due <= now:
+                due = query.next_due
+            else:
+                continue
+            if best is None or due < best_due:
+                best, best_due = query, due
+        return best
+
+    def on_response(self, name, now):
+        """Dopasowuje odpowiedź do najstarszego zapytania danego typu w locie"""
+        for index, (query, sent_at) in enumerate(self.in_flight):
+            if query.name == name:
+                # Starsze zapytania innych typów bez odpowiedzi uznajemy za utracone
+                for _ in range(index):
+                    lost, _ = self.in_flight.popleft()
+                    lost.timeouts += 1
+                self.in_flight.popleft()
+                query.received += 1
+                query.last_latency = now - sent_at
+                query.latencies.append(query.last_latency)
+                if query.first_response is None:
+                    query.first_response = now
+                query.last_response = now
+                return query
+        self.unmatched += 1
+        return None
+
+    def expire(self, now):
+        """Usuwa zapytania, na które odpowiedź nie przyszła w wyznaczonym czasie"""
+        expired = 0
+        while self.in_flight and now - self.in_flight[0][1] > self.response_timeout:
+            query, _ = self.in_flight.popleft()
+            query.timeouts += 1
+            expired += 1
+        return expired
+
+    def time_to_next(self, now):
+        """Zwraca czas [s] do najbliższego zaplanowanego zapytania"""
+        if len(self.in_flight) >= self.max_in_flight:
+            return self.response_timeout
+        waits = []
+        for query in self.queries.values():
+            if query.pending:
+                return 0.0
+            if query.interval is not None:
+                waits.append(query.next_due - now)
+        if not waits:
+            return self.response_timeout
+        return max(0.0, min(waits))
+
+    def stats(self):
+        """Zwraca statystyki: częstotliwość zadana i osiągnięta dla każdego zapytania"""
+        return {
+            name: {
+                'requested_hz': query.rate_hz,
+                'achieved_hz': query.achieved_rate(),
+                'sent': query.sent,
+                'received': query.received,
+                'timeouts': query.timeouts,
+                'latency': query.last_latency,
+            }
+            for name, query in self.queries.items()
+        }
+
+    def rate_report(self):
+        """Zwraca czytelne podsumowanie częstotliwości próbkowania"""
+        parts = []
+        for name, stat in self.stats().items():
+            if stat['requested_hz'] > 0:
+                parts.append(f"{name} {stat['achieved_hz']:.1f}/{stat['requested_hz']:.1f} Hz")
+            else:
+                parts.append(f"{name} na żądanie ({stat['received']} odp.)")
+        return ', '.join(parts)
@@ -0,0 +1,205 @@
+"""Profilowanie na żądanie w trakcie pomiaru (bez restartu aplikacji)
+
+Sesja łączy dwa sposoby:
+- cProfile w wątkach, które wywołują checkpoint() w swojej pętli (wątek okna Tk,
+  pętla komunikacji, zapis nagrania) - wynik łączony do jednego pliku .pstats;
+  od Pythona 3.12 aktywny może być tylko jeden profiler w procesie, więc sesja
+  włącza jeden wspólny cProfile (sys.monitoring obejmuje wszystkie wątki),
+- próbkowanie stosów wszystkich wątków (sys._current_frames) - plik .folded w formacie
+  "wątek;funkcja;...;funkcja liczba", zgodny z flamegraph.pl i speedscope.
+
+Włączanie i wyłączanie: menu Plik > Profilowanie w oknie albo sygnał SIGUSR1
+(okno i daemon.py). Pliki trafiają do katalogu nagrań (recording_dir).
+"""
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+DEFAULT_SAMPLE_INTERVAL = 0.005  # Odstęp próbkowania stosów [s]
+HANDOFF_TIMEOUT = 1.5            # Ile czekać, aż wątki oddadzą swoje profile [s] (dłużej niż obieg zapisu nagrania)
+PER_THREAD = sys.version_info < (3, 12)  # Osobny cProfile w każdym wątku (do 3.11)
+
+_session = None
+_local = threading.local()
+
+
+class ProfileSession:
+    """Jedna sesja profilowania: cProfile w wątkach współpracujących i próbkowanie wszystkich"""
+
+    def __init__(self, directory, sample_interval=DEFAULT_SAMPLE_INTERVAL):
+        self.directory = directory
+        self.sample_interval = sample_interval
+        self.started = None
+        self.stacks = Counter()  # "wątek;ramka;..." -> liczba próbek
+        self.samples = 0
+        self._profiles = []      # (nazwa wątku, cProfile.Profile, zdarzenie oddania)
+        self._shared = None      # Wspólny cProfile całego procesu (Python 3.12+)
+        self.error = None        # Dlaczego cProfile nie działa (np. aktywny inny profiler)
+        self._lock = threading.Lock()
+        self._running = threading.Event()
+        self._sampler = None
+
+    def _attach(self):
+        """Włącza cProfile w bieżącym wątku (wywoływane przez checkpoint)"""
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError as e:
+            # Aktywny inny profiler (debuger, coverage) - wątek zostaje tylko próbkowany
+            self.error = str(e)
+            _local.profile = (self, None, None)
+            return
+        released = threading.Event()
+        with self._lock:
+            self._profiles.append((threading.current_thread().name, profile, released))
+        _local.profile = (self, profile, released)
+
+    def _sample_loop(self):
+        me = threading.get_ident()
+        while self._running.is_set():
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                parts = []
+                while frame is not None:
+                    code = frame.f_code
+                    parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                parts.append(names.get(ident, str(ident)))
+                self.stacks[';'.join(reversed(parts))] += 1
+            self.samples += 1
+            time.sleep(self.sample_interval)
+
+    def start(self):
+        self.started = datetime.now()
+        self._running.set()
+        if not PER_THREAD:
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+                self._shared = profile
+            except ValueError as e:
+                self.error = str(e)
+        self._sampler = threading.Thread(target=self._sample_loop, name='profilowanie', daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        """Kończy sesję, zapisuje pliki i zwraca ich ścieżki (pstats, folded)"""
+        self._running.clear()
+        self._sampler.join(timeout=2)
+        if self._shared is not None:
+            self._shared.disable()
+
+        # Wątki wyłączają swoje profile przy najbliższym checkpoint()
+        deadline = time.monotonic() + HANDOFF_TIMEOUT
+        with self._lock:
+            profiles = list(self._profiles)
+        for _, _, released in profiles:
+            released.wait(max(deadline - time.monotonic(), 0))
+
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, 'profil-{}'.format(self.started.strftime('%Y-%m-%d_%H%M%S')))
+        stats_path = base + '.pstats'
+        folded_path = base + '.folded'
+
+        stats = pstats.Stats(self._shared) if self._shared is not None else None
+        for name, profile, released in profiles:
+            if not released.is_set():
+                continue  # Wątek zakończył się lub utknął - jego profil pomijamy
+            if stats is None:
+                stats = pstats.Stats(profile)
+            else:
+                stats.add(profile)
+        if stats is not None:
+            stats.dump_stats(stats_path)
+        else:
+            stats_path = None
+
+        with open(folded_path, 'w', encoding='utf-8') as file:
+            for stack, count in sorted(self.stacks.items()):
+                file.write(f"{stack} {count}\n")
+        return stats_path, folded_path
+
+    def describe(self):
+        """Zwraca opis przebiegu sesji (wątki z cProfile i liczba próbek)"""
+        with self._lock:
+            threads = [name for name, _, _ in self._profiles]
+        if self._shared is not None:
+            profiled = "wspólny dla wszystkich wątków"
+        else:
+            profiled = ', '.join(threads) or 'brak wątków'
+        if self.error:
+            profiled += f" (cProfile niedostępny: {self.error})"
+        return f"cProfile: {profiled}; próbki stosów: {self.samples}"
+
+
+def checkpoint():
+    """Włącza lub wyłącza cProfile w bieżącym wątku zgodnie z aktywną sesją.
+
+    Wywoływane w każdym obiegu pętli wątków długo działających; bez sesji kosztuje
+    jedno sprawdzenie atrybutu. Nigdy nie zgłasza wyjątku - błąd profilowania nie może
+    przerwać pętli komunikacji ani zapisu.
+    """
+    try:
+        attached = getattr(_local, 'profile', None)
+        if attached is None:
+            if PER_THREAD and _session is not None and _session._running.is_set():
+                _session._attach()
+        elif attached[0] is not _session or not attached[0]._running.is_set():
+            release()
+    except Exception:
+        _local.profile = None
+
+
+def release():
+    """Oddaje profil bieżącego wątku (np. na końcu jego pętli)"""
+    attached = getattr(_local, 'profile', None)
+    if attached is not None:
+        _, profile, released = attached
+        _local.profile = None
+        if profile is not None:
+            try:
+                profile.disable()
+            finally:
+                released.set()
+
+
+def current():
+    """Zwraca trwającą sesję profilowania lub None"""
+    return _session
+
+
+def start(directory, sample_interval=DEFAULT_SAMPLE_INTERVAL):
+    """Rozpoczyna sesję profilowania (także cProfile w wątku wywołującym)"""
+    global _session
+    if _session is not None:
+        return _session
+    _session = ProfileSession(directory, sample_interval)
+    _session.start()
+    checkpoint()
+    return _session
+
+
+def stop():
+    """Kończy sesję i zwraca (ścieżka .pstats, ścieżka .folded) lub None bez sesji"""
+    global _session
+    session = _session
+    if session is None:
+        return None
+    _session = None
+    session._running.clear()
+    checkpoint()  # Wątek wywołujący oddaje swój profil od razu
+    return session.stop()
+
+
+def toggle(directory):
+    """Przełącza profilowanie; zwraca (True, sesja) po starcie lub (False, ścieżki) po zatrzymaniu"""
+    if _session is not None:
+        return False, stop()
+    return True, start(directory)
@@ -0,0 +1,137 @@
+"""Tekstowy protokół kontrolera: komendy *GET...; i odpowiedzi *TACT/*IOUT/*TPRS"""
+
+RESPONSE_TYPES = ('TPRS', 'TACT', 'IOUT')
+TERMINATOR = b'\n'      # Koniec ramki odpowiedzi (urządzenie wysyła "\r\n")
+RX_BUFFER_LIMIT = 4096  # Maksymalna długość odebranych danych bez końca ramki [B]
+TAG_LENGTH = 6          # Długość znacznika ramki ('*TACT ')
+
+# Klasy priorytetu komend użytkownika (mniejsza wartość - wysyłana wcześniej)
+SAFETY = 0
+CONTROL = 1
+
+
+def response_type(command):
+    """Zwraca typ odpowiedzi, na którą czeka komenda (None dla komend bez odpowiedzi)"""
+    command = command.strip()
+    if command.startswith('*GET') and command.endswith(';'):
+        return command[4:-1]
+    return None
+
+
+def command_class(command):
+    """Zwraca (priorytet, rodzaj) komendy; komendy tego samego rodzaju zastępują się.
+
+    Rodzaj None oznacza komendę, której nie wolno łączyć z innymi.
+    """
+    command = command.strip()
+    if command == 'a':
+        return SAFETY, 'current'
+    if command == 'A':
+        return CONTROL, 'current'
+    if command.startswith('*SETTPRS'):
+        return CONTROL, 'setpoint'
+    if command.startswith('*SETCK'):
+        return CONTROL, 'pid'
+    return CONTROL, None
+
+
+def parse_response(response):
+    """Zwraca (typ, wartość) odpowiedzi urządzenia albo None dla nieznanej linii.
+
+    Dawny parser pojedynczych linii tekstu (stałe kolumny), zostawiony jako punkt odniesienia
+    benchmarku; odbiór z portu używa FrameParser. Kolumny 9-14 *IOUT gubią znak i cyfry
+    dziesiątek, gdy liczba zaczyna się wcześniej (*IOUT   -0.500A daje 0.5).
+    Zniekształcona wartość zgłasza ValueError lub IndexError.
+    """
+    if '*TPRS ' in response:
+        return 'TPRS', float(response[5:12])
+    if '*TACT ' in response:
+        return 'TACT', float(response[5:12])
+    if '*IOUT ' in response:
+        return 'IOUT', float(response[9:15].replace('A', ''))
+    return None
+
+
+def _parse_number(frame):
+    """Liczba ze znakiem za znacznikiem ramki, w dowolnej kolumnie (*IOUT   -0.500A daje -0.5).
+
+    Za liczbą dopuszczalne są tylko spacje, jednostka (A, C) i ';'; cokolwiek innego
+    (np. przekłamane cyfry) zgłasza ValueError.
+    """
+    return float(frame[TAG_LENGTH:].rstrip(b'\r;AC '))
+
+
+# Prefiks ramki -> (typ odpowiedzi, parser wartości)
+FRAME_PARSERS = {
+    b'*TPRS ': ('TPRS', _parse_number),
+    b'*TACT ': ('TACT', _parse_number),
+    b'*IOUT ': ('IOUT', _parse_number),
+}
+
+
+class FrameParser:
+    """Dzieli odebrane bajty na ramki i parsuje je bez dekodowania do str.
+
+    feed() dołącza dane do bufora, rozcina wszystkie kompletne ramki jednym split()
+    i rozpoznaje typ po pierwszych bajtach ramki. Niepełna ramka czeka w buforze na
+    resztę; śmieci przed '*' (np. urwana poprzednia ramka) są pomijane.
+    """
+
+    def __init__(self, limit=RX_BUFFER_LIMIT):
+        self.buffer = bytearray()
+        self.limit = limit
+        self.discarded = 0  # Bajty śmieci pominięte przy szukaniu początku ramki
+
+    def clear(self):
+        self.buffer.clear()
+
+    def feed(self, data):
+        """Zwraca listę (typ, wartość, ramka) kompletnych ramek z data i reszty bufora.
+
+        Nieznana ramka ma typ None, zniekształcona wartość - wartość None.
+        """
+        buffer = self.buffer
+        buffer += data
+        end = buffer.rfind(TERMINATOR)
+        if end < 0:
+            if len(buffer) > self.limit:
+                self.discarded += len(buffer)
+                buffer.clear()  # Śmieci bez końca ramki
+            return []
+        frames = bytes(buffer[:end]).split(TERMINATOR)
+        del buffer[:end + 1]
+
+        results = []
+        for frame in frames:
+            entry = FRAME_PARSERS.get(frame[:TAG_LENGTH])
+            if entry is None:
+                start = frame.rfind(b'*')
+                if start > 0:
+                    self.discarded += start
+                    frame = frame[start:]
+                    entry = FRAME_PARSERS.get(frame[:TAG_LENGTH])
+                if entry is None:
+                    if frame.strip():
+                        results.append((None, None, frame))
+                    continue
+            kind, parse = entry
+            try:
+                results.append((kind, parse(frame), frame))
+            except ValueError:
+                results.append((kind, None, frame))
+        return results
+
+
+def setpoint_command(value):
+    """Komenda ustawienia temperatury zadanej"""
+    return f'*SETTPRS{value};'
+
+
+def pid_command(p, i, d):
+    """Komenda ustawienia nastaw PID"""
+    return f'*SETCK{p:.1f} {i:.1f} {d:.1f};'
+
+
+def current_command(enabled):
+    """Komenda włączenia (A) lub wyłączenia (a) prądu"""
+    return 'A' if enabled else 'a'
@@ -0,0 +1,457 @@
+"""Binarny format pomiarów (.kbin): ciągły zapis, odczyt przez numpy.memmap i konwersje
+
+Plik nagrania (.kbin):
+    nagłówek   - MAGIC, wersja, długość nagłówka, metadane JSON (dopełnione do HEADER_SIZE)
+    rekordy    - kolejne próbki o stałym rozmiarze (RECORD_DTYPE, 36 bajtów; wartości float64
+                 jak w data.json, więc konwersja w obie strony jest bezstratna)
+    stopka     - FOOTER_MAGIC, liczba rekordów, rzadki indeks (czas pierwszej próbki bloku,
+                 numer rekordu), metadane JSON; zapisywana przy zatrzymaniu nagrania
+    zakończenie - położenie stopki i END_MAGIC
+
+Po awarii stopki brak - liczbę rekordów wyznacza się wtedy z rozmiaru pliku. Pliki wersji 2
+(rekord 24 bajty, wartości float32) są nadal odczytywane.
+
+Konwersja z/do układu data.json / data.csv zapisywanego przy zamykaniu aplikacji:
+    python3 recording.py pomiar/data.json pomiar/data.kbin
+    python3 recording.py pomiar/data.kbin pomiar/data.csv
+"""
+import argparse
+import json
+import os
+import struct
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+import profiling
+from export import CSV_HEADER, write_csv, write_json
+from samplestore import TIME, TEMPERATURE, CURRENT, SETPOINT
+
+MAGIC = b'KTREC\x00'
+FOOTER_MAGIC = b'KTFOOT'
+END_MAGIC = b'KTEND\x00'
+VERSION = 3
+HEADER_SIZE = 4096
+HEADER_STRUCT = struct.Struct('<6sHI')
+FOOTER_STRUCT = struct.Struct('<6sQQI')  # magic, liczba rekordów, liczba wpisów indeksu, długość JSON
+END_STRUCT = struct.Struct('<Q6s')
+FLAGS_STRUCT = struct.Struct('<I')
+
+RECORD_DTYPE = np.dtype([
+    ('time', '<f8'),
+    ('temperature', '<f8'),
+    ('current', '<f8'),
+    ('setpoint', '<f8'),
+    ('flags', '<u4'),
+])
+# Układ rekordu według wersji pliku
+RECORD_DTYPES = {
+    2: np.dtype([('time', '<f8'), ('temperature', '<f4'), ('current', '<f4'), ('setpoint', '<f4'), ('flags', '<u4')]),
+    VERSION: RECORD_DTYPE,
+}
+INDEX_DTYPE = np.dtype([('time', '<f8'), ('record', '<u8')])
+
+DEFAULT_CHUNK_SIZE = 1024      # Rekordów na blok (wpis indeksu)
+DEFAULT_WRITE_INTERVAL = 1.0   # Co ile sekund dopisywać nowe próbki [s]
+DEFAULT_FSYNC_INTERVAL = 10.0  # Co ile sekund wymuszać zapis na nośnik [s]
+DEFAULT_RECORDING_DIR = 'nagrania'
+
+# Znaczniki rekordu (pole flags)
+FLAG_SETPOINT_CHANGE = 1  # Nastawa różni się od poprzedniej próbki
+FLAG_TEST_START = 2       # Naciśnięto Start (początek analizowanego odcinka)
+FLAG_TEST_STOP = 4        # Koniec analizowanego odcinka
+FLAG_NO_SETPOINT = 8      # Nastawa nieznana (np. dane zaimportowane z CSV/JSON)
+
+
+def recording_filename(directory=DEFAULT_RECORDING_DIR, device=1):
+    """Zwraca ścieżkę nowego pliku nagrania z bieżącą datą (i numerem urządzenia, jeśli nie pierwsze)"""
+    suffix = '' if device == 1 else f'-{device}'
+    name = 'nagranie-{}{}.kbin'.format(datetime.now().strftime('%Y-%m-%d_%H%M%S'), suffix)
+    return os.path.join(directory, name)
+
+
+def write_header(file, metadata):
+    """Zapisuje nagłówek pliku z metadanymi JSON"""
+    metadata = dict(metadata)
+    metadata['columns'] = list(RECORD_DTYPE.names)
+    header = json.dumps(metadata).encode('utf-8')
+    if HEADER_STRUCT.size + len(header) > HEADER_SIZE:
+        raise ValueError("Metadane nagrania nie mieszczą się w nagłówku")
+    file.write(HEADER_STRUCT.pack(MAGIC, VERSION, HEADER_SIZE))
+    file.write(header.ljust(HEADER_SIZE - HEADER_STRUCT.size, b' '))
+
+
+def write_footer(file, records, index, metadata):
+    """Zapisuje stopkę z rzadkim indeksem czasu i zakończenie pliku"""
+    footer_json = json.dumps(metadata).encode('utf-8')
+    index = np.asarray(index, dtype=INDEX_DTYPE)
+    footer_offset = file.tell()
+    file.write(FOOTER_STRUCT.pack(FOOTER_MAGIC, records, len(index), len(footer_json)))
+    file.write(index.tobytes())
+    file.write(footer_json)
+    file.write(END_STRUCT.pack(footer_offset, END_MAGIC))
+
+
+def to_records(time, temperature, current, setpoint=None, previous_setpoint=None):
+    """Składa kolumny w tablicę rekordów i wyznacza znaczniki zmian nastawy"""
+    records = np.empty(len(time), dtype=RECORD_DTYPE)
+    records['time'] = time
+    records['temperature'] = temperature
+    records['current'] = current
+    if setpoint is None:
+        records['setpoint'] = np.nan
+        records['flags'] = FLAG_NO_SETPOINT
+        return records
+    records['setpoint'] = setpoint
+    stored = records['setpoint']
+    unknown = np.isnan(stored)
+    changed = np.empty(len(stored), dtype=bool)
+    if len(stored):
+        # Przejście z/do nastawy nieznanej (NaN) nie jest zmianą - jak w analysis.setpoint_changes
+        changed[0] = previous_setpoint is not None and stored[0] != previous_setpoint \
+            and not unknown[0] and not np.isnan(previous_setpoint)
+        changed[1:] = (stored[1:] != stored[:-1]) & ~unknown[1:] & ~unknown[:-1]
+    records['flags'] = np.where(changed, FLAG_SETPOINT_CHANGE, 0) | np.where(unknown, FLAG_NO_SETPOINT, 0)
+    return records
+
+
+class Recorder:
+    """Dopisuje próbki ze wspólnego bufora do pliku w wątku w tle"""
+
+    def __init__(self, store, path, metadata=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                 write_interval=DEFAULT_WRITE_INTERVAL, fsync_interval=DEFAULT_FSYNC_INTERVAL,
+                 console_func=None):
+        self.store = store
+        self.path = path
+        self.metadata = dict(metadata or {})
+        self.chunk_size = int(chunk_size)
+        self.write_interval = write_interval
+        self.fsync_interval = fsync_interval
+        self.console_func = console_func or (lambda x: None)
+
+        self.file = None
+        self.thread = None
+        self.running = False
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+
+        self.next_index = 0       # Numer następnej próbki bufora do zapisania
+        self.records = 0          # Liczba zapisanych rekordów
+        self.lost = 0             # Próbki usunięte z bufora, zanim zdążono je zapisać
+        self.index = []           # (czas, numer rekordu) na początku każdego bloku
+        self.marks = {}           # Numer próbki bufora -> znaczniki do ustawienia
+        self.segments = []        # (numer próbki bufora, numer rekordu) na początku ciągłych odcinków zapisu
+        self._last_setpoint = None
+        self._last_fsync = 0.0
+
+    def start(self):
+        """Tworzy plik z nagłówkiem i uruchamia wątek zapisu"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.metadata.setdefault('start_time', datetime.now().isoformat())
+        self.metadata['first_sample'] = self.store.count  # Numer próbki bufora dla rekordu 0
+
+        self.file = open(self.path, 'w+b')  # Odczyt do poprawiania znaczników zapisanych już rekordów
+        write_header(self.file, self.metadata)
+        self._sync()
+
+        # Nagrywaj od bieżącej chwili
+        self.next_index = self.metadata['first_sample']
+        self.segments = [(self.next_index, 0)]
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, name='nagrywanie', daemon=True)
+        self.thread.start()
+        self.console_func(f"Rozpoczęto nagrywanie: {self.path}")
+
+    def mark(self, sample, flag):
+        """Ustawia znacznik na próbce bufora o podanym numerze (np. FLAG_TEST_START)
+
+        Próbka jeszcze niezapisana dostaje znacznik przy zapisie, zapisana - poprawką rekordu w pliku.
+        """
+        with self._lock:
+            if self.file is not None and sample >= self.next_index:
+                self.marks[sample] = self.marks.get(sample, 0) | flag
+                return
+            record = self._record_number(sample) if self.file is not None else None
+            if record is None:
+                self._mark_failed(sample, flag)
+                return
+            self.file.flush()
+            end = self.file.tell()
+            offset = HEADER_SIZE + record * RECORD_DTYPE.itemsize + RECORD_DTYPE.fields['flags'][1]
+            self.file.seek(offset)
+            flags, = FLAGS_STRUCT.unpack(self.file.read(FLAGS_STRUCT.size))
+            self.file.seek(offset)
+            self.file.write(FLAGS_STRUCT.pack(flags | flag))
+            self.file.seek(end)
+
+    def _record_number(self, sample):
+        """Numer rekordu zapisanej próbki bufora albo None (sprzed nagrania lub utracona)"""
+        ends = [record for _, record in self.segments[1:]] + [self.records]
+        for (first, record), end in zip(self.segments, ends):
+            if first <= sample and record + sample - first < end:
+                return record + sample - first
+        return None
+
+    def _mark_failed(self, sample, flag):
+        self.console_func(f"Nie ustawiono znacznika {flag} próbki {sample}: próbki nie ma w nagraniu")
+
+    def _loop(self):
+        """Pętla wątku zapisu"""
+        while self.running:
+            self._wake.wait(self.write_interval)
+            self._wake.clear()
+            profiling.checkpoint()
+            try:
+                self.write_pending()
+            except Exception as e:
+                self.console_func(f"Błąd zapisu nagrania: {e}")
+                self.running = False
+        profiling.release()
+
+    def write_pending(self):
+        """Dopisuje do pliku próbki, które pojawiły się w buforze"""
+        with self._lock:
+            if self.file is None:
+                return
+            first = self.store.first_index
+            if self.next_index < first:
+                self.lost += first - self.next_index
+                self.next_index = first
+                self.segments.append((first, self.records))
+
+            count = self.store.count
+            while self.next_index < count:
+                # Zapis blokami - wpis indeksu na początku każdego bloku
+                in_chunk = self.records % self.chunk_size
+                n = min(self.chunk_size - in_chunk, count - self.next_index)
+                block = self.store.window(self.next_index, self.next_index + n)
+                n = block.shape[1]
+                if n == 0:
+                    break
+                chunk = to_records(block[TIME], block[TEMPERATURE], block[CURRENT],
+                                   block[SETPOINT], self._last_setpoint)
+                self._last_setpoint = chunk['setpoint'][-1]
+                self._apply_marks(chunk, self.next_index)
+                if in_chunk == 0:
+                    self.index.append((float(chunk['time'][0]), self.records))
+                self.file.write(chunk.tobytes())
+                self.records += n
+                self.next_index += n
+
+            self.file.flush()
+            if time.monotonic() - self._last_fsync >= self.fsync_interval:
+                self._sync()
+
+    def _apply_marks(self, chunk, first_sample):
+        """Przenosi znaczniki zapisane przez mark() do rekordów bloku"""
+        for sample in [s for s in self.marks if s < first_sample + len(chunk)]:
+            flag = self.marks.pop(sample)
+            if sample >= first_sample:
+                chunk['flags'][sample - first_sample] |= flag
+            else:
+                self._mark_failed(sample, flag)  # Próbka usunięta z bufora przed zapisem
+
+    def _sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self._last_fsync = time.monotonic()
+
+    def stop(self, metadata=None):
+        """Zapisuje pozostałe próbki oraz stopkę z indeksem i zamyka plik"""
+        self.running = False
+        self._wake.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+        if self.file is None:
+            return self.path
+
+        self.write_pending()
+        with self._lock:
+            for sample, flag in sorted(self.marks.items()):
+                self._mark_failed(sample, flag)  # Próbka nie pojawiła się przed końcem nagrania
+            self.marks.clear()
+            footer_metadata = dict(self.metadata)
+            footer_metadata.update(metadata or {})
+            footer_metadata['stop_time'] = datetime.now().isoformat()
+            footer_metadata['lost_samples'] = self.lost
+            write_footer(self.file, self.records, self.index, footer_metadata)
+            self._sync()
+            self.file.close()
+            self.file = None
+        self.console_func(f"Zakończono nagrywanie: {self.path} ({self.records} próbek)")
+        return self.path
+
+
+class MeasurementFile:
+    """Odczyt pliku .kbin przez numpy.memmap - wycinki czasu bez wczytywania całego pliku"""
+
+    def __init__(self, path):
+        self.path = path
+        self.complete = False  # Czy plik ma stopkę (nagranie zamknięte poprawnie)
+        self.index = np.empty(0, dtype=INDEX_DTYPE)
+
+        size = os.path.getsize(path)
+        with open(path, 'rb') as file:
+            magic, version, header_size = HEADER_STRUCT.unpack(file.read(HEADER_STRUCT.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} nie jest plikiem nagrania")
+            dtype = RECORD_DTYPES.get(version)
+            if dtype is None:
+                raise ValueError(f"Nieobsługiwana wersja pliku nagrania: {version}")
+            self.version = version
+            self.header_size = header_size
+            self.metadata = json.loads(file.read(header_size - HEADER_STRUCT.size).decode('utf-8'))
+            count = (size - header_size) // dtype.itemsize
+
+            if size >= header_size + END_STRUCT.size:
+                file.seek(size - END_STRUCT.size)
+                footer_offset, end_magic = END_STRUCT.unpack(file.read(END_STRUCT.size))
+                if end_magic == END_MAGIC:
+                    file.seek(footer_offset)
+                    magic, count, index_len, json_len = FOOTER_STRUCT.unpack(file.read(FOOTER_STRUCT.size))
+                    self.index = np.frombuffer(file.read(index_len * INDEX_DTYPE.itemsize), dtype=INDEX_DTYPE)
+                    self.metadata.update(json.loads(file.read(json_len).decode('utf-8')))
+                    self.complete = True
+
+        if count > 0:
+            self.records = np.memmap(path, dtype=dtype, mode='r', offset=header_size, shape=(count,))
+        else:
+            self.records = np.empty(0, dtype=dtype)
+
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def time_range(self):
+        """Zwraca (czas pierwszej, czas ostatniej próbki)"""
+        if len(self.records) == 0:
+            return None
+        return float(self.records['time'][0]), float(self.records['time'][-1])
+
+    def locate(self, t, side='left'):
+        """Zwraca numer rekordu dla czasu t - O(log n), czyta tylko kilka stron pliku"""
+        lo, hi = 0, len(self.records)
+        if len(self.index):
+            # Rzadki indeks zawęża wyszukiwanie do jednego bloku
+            block = np.searchsorted(self.index['time'], t, side=side) - 1
+            if block >= 0:
+                lo = int(self.index['record'][block])
+            if block + 1 < len(self.index):
+                hi = int(self.index['record'][block + 1])
+        return lo + int(np.searchsorted(self.records['time'][lo:hi], t, side=side))
+
+    def time_slice(self, t0, t1):
+        """Zwraca rekordy o czasie w zakresie [t0, t1] jako widok pliku"""
+        return self.records[self.locate(t0, 'left'):self.locate(t1, 'right')]
+
+    def close(self):
+        """Zwalnia mapowanie pliku"""
+        mm = getattr(self.records, '_mmap', None)
+        self.records = np.empty(0, dtype=self.records.dtype)
+        if mm is not None:
+            mm.close()
+
+
+def write_measurement(path, records, metadata=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Zapisuje kompletny plik .kbin z gotowej tablicy rekordów"""
+    records = np.asarray(records, dtype=RECORD_DTYPE)
+    starts = np.arange(0, len(records), chunk_size)
+    index = np.empty(len(starts), dtype=INDEX_DTYPE)
+    index['time'] = records['time'][starts]
+    index['record'] = starts
+    with open(path, 'wb') as file:
+        write_header(file, metadata or {})
+        file.write(records.tobytes())
+        write_footer(file, len(records), index, metadata or {})
+
+
+def load_json(path):
+    """Wczytuje data.json zapisany przez aplikację i zwraca (rekordy, metadane)"""
+    with open(path, 'r') as file:
+        data = json.load(file)
+    n = min(len(data['time']), len(data['temperature']), len(data['current']))
+    records = to_records(np.asarray(data['time'][:n], dtype=np.float64),
+                         np.asarray(data['temperature'][:n], dtype=np.float64),
+                         np.asarray(data['current'][:n], dtype=np.float64))
+    return records, data.get('metadata', {})
+
+
+def load_csv(path):
+    """Wczytuje data.csv (także z nagłówkiem '#' z eksportu) i zwraca (rekordy, metadane)"""
+    with open(path, 'r', encoding='utf-8') as file:
+        lines = [line for line in file if line.strip() not in ('', '""') and not line.startswith(('#', '"#'))]
+    if lines and lines[0].startswith(CSV_HEADER[0]):
+        lines = lines[1:]
+    if lines:
+        table = np.loadtxt(lines, delimiter=';', dtype=np.float64, ndmin=2)
+    else:
+        table = np.empty((0, 3))
+    return to_records(table[:, 0], table[:, 1], table[:, 2]), {}
+
+
+def save_json(path, records, metadata=None):
+    """Zapisuje rekordy w układzie data.json aplikacji"""
+    metadata = metadata or {}
+    times = records['time']
+    json_metadata = {
+        "start_time": metadata.get('start_time', datetime.now().isoformat()),
+        "measurement_duration": float(times[-1] - times[0]) if len(times) > 0 else 0,
+        "total_samples": len(times),
+        "config": metadata.get('config', {})
+    }
+    columns = [(name, records[name].astype(np.float64)) for name in ('temperature', 'current', 'time')]
+    with open(path, 'w') as file:
+        write_json(file, json_metadata, columns)
+
+
+def save_csv(path, records):
+    """Zapisuje rekordy w układzie data.csv aplikacji"""
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        write_csv(file, records['time'], records['temperature'].astype(np.float64),
+                  records['current'].astype(np.float64))
+
+
+def load_measurement(path):
+    """Wczytuje pomiar .kbin, .json lub .csv (według rozszerzenia) i zwraca (rekordy, metadane)"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.kbin':
+        measurement = MeasurementFile(path)
+        return measurement.records, measurement.metadata
+    if ext == '.json':
+        return load_json(path)
+    if ext == '.csv':
+        return load_csv(path)
+    raise ValueError(f"Nieznany format źródła: {path}")
+
+
+def convert(source, target):
+    """Konwertuje pomiar między formatami .json, .csv i .kbin (według rozszerzeń)"""
+    target_ext = os.path.splitext(target)[1].lower()
+    records, metadata = load_measurement(source)
+
+    if target_ext == '.kbin':
+        write_measurement(target, records, metadata)
+    elif target_ext == '.json':
+        save_json(target, records, metadata)
+    elif target_ext == '.csv':
+        save_csv(target, records)
+    else:
+        raise ValueError(f"Nieznany format docelowy: {target}")
+    return len(records)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Konwersja pomiarów między formatami .json, .csv i .kbin")
+    parser.add_argument('source', help="plik źródłowy")
+    parser.add_argument('target', help="plik docelowy")
+    args = parser.parse_args()
+    count = convert(args.source, args.target)
+    print(f"Skonwertowano {count} próbek: {args.source} -> {args.target}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Odtwarzanie zapisanego pomiaru przez ścieżkę danych aplikacji (bez urządzenia)
+
+ReplaySource wczytuje data.json, data.csv lub nagranie .kbin i dopisuje próbki do
+SampleStore tak jak SerialCommunicator, więc wykres, konsola, nagrywanie i metryki
+działają bez zmian. Prędkość: 1 - czas rzeczywisty, 100 - sto razy szybciej,
+0 - tak szybko, jak pozwala zapis do bufora (test regresji wykresu i nagrywania).
+
+Uruchomienie: python3 Kontroler.py --replay pomiar-2025-01-01/data.json --speed 100
+Test regresji: python3 benchmark.py --replay pomiar-2025-01-01/data.json [--gui]
+"""
+import threading
+import time
+
+import numpy as np
+
+import profiling
+from metrics import registry
+from recording import load_measurement
+from samplestore import SampleStore, SampleCursor, DEFAULT_CAPACITY
+
+TICK = 0.005  # Co ile sekund dopisywać zaległe próbki przy zadanej prędkości [s]
+BATCH = 1000  # Próbek między sprawdzeniami zatrzymania przy maksymalnej prędkości
+
+
+class ReplaySource:
+    """Źródło próbek z zapisanego pomiaru z interfejsem SerialCommunicator (connect, cursor, ...)"""
+
+    def __init__(self, path, store=None, speed=1.0, console_func=None):
+        self.path = path
+        self.port = f"odtwarzanie:{path}"  # Etykieta w metrykach i metadanych nagrania
+        self.speed = max(float(speed), 0.0)
+        self.console_func = console_func or (lambda x: None)
+        self.store = store if store is not None else SampleStore(DEFAULT_CAPACITY)
+        self.connected = False
+        self.running = False
+        self.finished = False
+        self.thread = None
+        self.records = None
+        self.position = 0       # Numer następnej próbki do odtworzenia
+        self.started = None     # Czas rozpoczęcia odtwarzania (time.monotonic)
+        self.elapsed = 0.0      # Czas odtwarzania [s] (do przepustowości)
+
+        # Pola odczytywane przez okno jak w SerialCommunicator
+        self.last_temperature = 0.0
+        self.last_current = 0.0
+        self.set_temperature = float('nan')
+        self.start_time = time.time()
+        registry.function('kontroler_samples_total', "Zapisane próbki temperatury",
+                          lambda: self.store.count, 'counter', port=self.port)
+        registry.function('kontroler_connected', "Czy urządzenie jest połączone",
+                          lambda: int(self.connected), port=self.port)
+
+    def connect(self):
+        """Wczytuje plik pomiaru (odpowiednik otwarcia portu)"""
+        try:
+            records, _ = load_measurement(self.path)
+            self.records = np.array(records)  # Kopia - plik .kbin można zamknąć
+        except Exception as e:
+            self.console_func(f"Nie udało się wczytać pomiaru {self.path}: {e}")
+            return False
+        self.connected = True
+        self.console_func(f"Wczytano {len(self.records)} próbek do odtworzenia z {self.path}")
+        return True
+
+    def disconnect(self):
+        self.running = False
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout=2.0)
+        self.connected = False
+
+    def start_communication(self):
+        """Rozpoczyna odtwarzanie w wątku w tle"""
+        if not self.connected:
+            return False
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, name='odtwarzanie', daemon=True)
+        self.thread.start()
+        speed = "maksymalną prędkością" if self.speed == 0 else f"z prędkością {self.speed:g}x"
+        self.console_func(f"Rozpoczęto odtwarzanie {speed}")
+        return True
+
+    def _loop(self):
+        records = self.records
+        total = len(records)
+        times = records['time']
+        origin = float(times[0]) if total else 0.0
+        self.started = time.monotonic()
+        while self.running and self.position < total:
+            profiling.checkpoint()
+            if self.speed == 0:
+                stop = min(self.position + BATCH, total)
+            else:
+                # Wszystkie próbki, których czas (przeskalowany) już minął
+                due = origin + (time.monotonic() - self.started) * self.speed
+                stop = int(np.searchsorted(times, due, side='right'))
+            for record in records[self.position:stop].tolist():
+                self._append(record)
+            self.position = max(self.position, stop)
+            if self.speed != 0 and self.position < total:
+                time.sleep(TICK)
+        self.elapsed = time.monotonic() - self.started
+        profiling.release()
+        self.finished = self.position >= total
+        self.running = False
+        if self.finished:
+            self.console_func(f"Odtwarzanie zakończone: {total} próbek w {self.elapsed:.2f} s")
+
+    def _append(self, record):
+        """Dopisuje jedną próbkę tak jak SerialCommunicator po odpowiedzi TACT"""
+        time_, temperature, current, setpoint, _ = record
+        self.last_temperature = temperature
+        self.last_current = current
+        self.set_temperature = setpoint
+        self.store.append(time_, temperature, current, setpoint)
+
+    def send_command(self, command):
+        """Komendy nie mają dokąd trafić - tylko wpis w konsoli"""
+        self.console_func(f"Odtwarzanie - komenda pominięta: {command}")
+
+    def cursor(self, position=0):
+        return SampleCursor(self.store, position)
+
+    def get_all_data(self):
+        return self.store.columns()
+
+    def rate_report(self):
+        """Postęp odtwarzania (w miejscu raportu częstotliwości odpytywania)"""
+        total = len(self.records) if self.records is not None else 0
+        return f"odtwarzanie {self.position}/{total} próbek"
@@ -0,0 +1,240 @@
+"""Wspólny bufor próbek pomiarowych oparty na tablicach NumPy"""
+import threading
+
+import numpy as np
+
+DEFAULT_CAPACITY = 1000000  # ok. 14 h przy 20 próbkach/s, 64 MB pamięci
+DEFAULT_TIERS = (1.0, 10.0, 60.0, 600.0)  # Szerokości kubełków poziomów historii [s]
+
+# Kolumny rekordu próbki
+TIME, TEMPERATURE, CURRENT, SETPOINT = range(4)
+COLUMNS = ('time', 'temperature', 'current', 'setpoint')
+
+
+class AggregateTier:
+    """Poziom historii: zamknięte kubełki o stałej szerokości czasu z min/max/sumą każdej kolumny.
+
+    Wiersz TIME minimum i maksimum to czas pierwszej i ostatniej próbki kubełka. Kubełki
+    są wyrównane do wielokrotności szerokości, więc kubełek poziomu zgrubnego składa się
+    z całych kubełków poziomu drobniejszego (szerokości muszą być swoimi wielokrotnościami).
+    """
+
+    def __init__(self, width):
+        self.width = float(width)
+        self.size = 0
+        self.consumed = 0  # Ile kubełków poziomu drobniejszego już tu trafiło
+        self._count = np.empty(0)
+        self._minimum = np.empty((len(COLUMNS), 0))
+        self._maximum = np.empty((len(COLUMNS), 0))
+        self._total = np.empty((len(COLUMNS), 0))
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def count(self):
+        return self._count[:self.size]
+
+    @property
+    def minimum(self):
+        return self._minimum[:, :self.size]
+
+    @property
+    def maximum(self):
+        return self._maximum[:, :self.size]
+
+    @property
+    def total(self):
+        return self._total[:, :self.size]
+
+    def mean(self, column):
+        return self.total[column] / self.count
+
+    def add(self, count, minimum, maximum, total):
+        """Dokłada zamknięte kubełki z podanych (posortowanych po czasie) wejść.
+
+        Wejściem są surowe próbki (count = 1, minimum = maksimum = suma = wartość) albo
+        kubełki poziomu drobniejszego. Ostatni kubełek może się jeszcze zmienić, więc jego
+        wejścia zostają na następny raz; zwraca liczbę zużytych wejść.
+        """
+        keys = np.floor(minimum[TIME] / self.width)
+        starts = np.flatnonzero(keys[1:] != keys[:-1]) + 1
+        if len(starts) == 0:
+            return 0
+        used = int(starts[-1])
+        starts = np.concatenate(([0], starts[:-1]))
+        self._reserve(len(starts))
+        new = slice(self.size, self.size + len(starts))
+        self._count[new] = np.add.reduceat(count[:used], starts)
+        self._minimum[:, new] = np.minimum.reduceat(minimum[:, :used], starts, axis=1)
+        self._maximum[:, new] = np.maximum.reduceat(maximum[:, :used], starts, axis=1)
+        self._total[:, new] = np.add.reduceat(total[:, :used], starts, axis=1)
+        self.size += len(starts)
+        return used
+
+    def _reserve(self, n):
+        """Powiększa tablice (dwukrotnie), by zmieściły jeszcze n kubełków"""
+        if self.size + n <= len(self._count):
+            return
+        capacity = max(2 * len(self._count), self.size + n, 64)
+        self._count = np.resize(self._count, capacity)
+        for name in ('_minimum', '_maximum', '_total'):
+            grown = np.empty((len(COLUMNS), capacity))
+            grown[:, :self.size] = getattr(self, name)[:, :self.size]
+            setattr(self, name, grown)
+
+
+class SampleStore:
+    """Prealokowany bufor pierścieniowy rekordów (czas, temperatura, prąd, nastawa).
+
+    Każda próbka jest zapisywana dwukrotnie - w pozycji i oraz i + capacity - dzięki
+    czemu dowolne okno do capacity ostatnich próbek jest ciągłym wycinkiem tablicy
+    i można je zwrócić jako widok bez kopiowania. Zapisuje jeden wątek (komunikator),
+    czytać może dowolny; widok pozostaje poprawny, dopóki nie dopisze się do bufora
+    więcej niż capacity - len(widok) nowych próbek.
+
+    Obok surowych próbek bufor prowadzi poziomy historii (AggregateTier, np. 1 s, 10 s,
+    1 min, 10 min) obejmujące cały pomiar, także próbki już nadpisane w buforze. Poziomy
+    uzupełnia update_tiers() wywoływane przez czytelnika (wykres), nie wątek zapisu.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, tiers=DEFAULT_TIERS):
+        self.capacity = int(capacity)
+        self._data = np.zeros((len(COLUMNS), 2 * self.capacity), dtype=np.float64)
+        self.count = 0  # Całkowita liczba zapisanych próbek (numer następnej próbki)
+        self.tiers = [AggregateTier(width) for width in sorted(tiers)]
+        self.tiered = 0  # Numer pierwszej próbki, która nie trafiła jeszcze do poziomów historii
+        self._tier_lock = threading.Lock()
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    @property
+    def first_index(self):
+        """Numer najstarszej próbki dostępnej w buforze"""
+        return self.count - len(self)
+
+    def append(self, time, temperature, current, setpoint):
+        """Dopisuje jedną próbkę"""
+        position = self.count % self.capacity
+        record = (time, temperature, current, setpoint)
+        self._data[:, position] = record
+        self._data[:, position + self.capacity] = record
+        self.count += 1
+
+    def window(self, start, stop=None):
+        """Zwraca widok (kolumny x próbki) dla próbek o numerach [start, stop)"""
+        count = self.count
+        stop = count if stop is None else min(stop, count)
+        start = max(start, count - len(self), 0)
+        if stop <= start:
+            return self._data[:, 0:0]
+        position = start % self.capacity
+        return self._data[:, position:position + (stop - start)]
+
+    def read(self, cursor, copy=False):
+        """Zwraca próbki dopisane od numeru cursor: (kolumny x próbki, nowy kursor, pominięte).
+
+        Pominięte to próbki nadpisane, zanim czytelnik po nie sięgnął. Z copy=True wynik
+        jest kopią sprawdzaną po skopiowaniu (jak seqlock): próbki, które zapis zdążył
+        w trakcie kopiowania nadpisać, są odcinane i liczone jako pominięte.
+        """
+        count = self.count
+        start = max(cursor, count - self.capacity, 0)
+        dropped = start - cursor if cursor < start else 0
+        position = start % self.capacity
+        block = self._data[:, position:position + (count - start)]
+        if copy:
+            block = block.copy()
+            # append() nadpisuje pozycję próbki count - capacity, zanim zwiększy count
+            torn = min(self.count + 1 - self.capacity - start, block.shape[1])
+            if torn > 0:
+                block = block[:, torn:]
+                dropped += torn
+        return block, count, dropped
+
+    def last(self, n=None):
+        """Zwraca widok ostatnich n próbek (domyślnie wszystkich dostępnych)"""
+        n = len(self) if n is None else min(n, len(self))
+        return self.window(self.count - n)
+
+    def last_seconds(self, seconds):
+        """Zwraca widok próbek z ostatnich seconds sekund"""
+        block = self.last()
+        if block.shape[1] == 0:
+            return block
+        times = block[TIME]
+        first = np.searchsorted(times, times[-1] - seconds, side='left')
+        return block[:, first:]
+
+    def columns(self, n=None):
+        """Zwraca ostatnie n próbek jako słownik widoków kolumn"""
+        block = self.last(n)
+        return {name: block[index] for index, name in enumerate(COLUMNS)}
+
+    def update_tiers(self):
+        """Dokłada do poziomów historii próbki dopisane od ostatniego wywołania"""
+        with self._tier_lock:
+            # Próbki nadpisane przed agregacją (brak czytelnika przez capacity próbek) przepadają
+            start = max(self.tiered, self.first_index)
+            block = self.window(start)
+            if block.shape[1] == 0 or not self.tiers:
+                return
+            self.tiered = start + self.tiers[0].add(np.ones(block.shape[1]), block, block, block)
+            for finer, tier in zip(self.tiers, self.tiers[1:]):
+                new = slice(tier.consumed, finer.size)
+                tier.consumed += tier.add(finer.count[new], finer.minimum[:, new],
+                                          finer.maximum[:, new], finer.total[:, new])
+
+    def tier_level(self, bucket_width):
+        """Numer najgrubszego poziomu o kubełkach nie szerszych niż bucket_width (None - żaden)"""
+        widths = [tier.width for tier in self.tiers]
+        level = int(np.searchsorted(widths, bucket_width, side='right')) - 1
+        return level if level >= 0 else None
+
+    def summary(self, level, column, since=-np.inf):
+        """Zwraca (czas, minimum, maksimum) kolumny od czasu since z poziomu level.
+
+        Czas kubełka to środek między jego pierwszą i ostatnią próbką. Okres po ostatnim
+        zamkniętym kubełku poziomu uzupełniają kubełki poziomów drobniejszych i surowe
+        próbki, więc wynik sięga do najnowszej próbki.
+        """
+        parts = []
+        covered = since
+        for tier in reversed(self.tiers[:level + 1]):
+            minimum, maximum = tier.minimum, tier.maximum
+            first = np.searchsorted(maximum[TIME], covered, side='left')
+            if first < tier.size:
+                parts.append(((minimum[TIME, first:] + maximum[TIME, first:]) / 2,
+                              minimum[column, first:], maximum[column, first:]))
+                covered = (np.floor(maximum[TIME, -1] / tier.width) + 1) * tier.width
+        block = self.window(self.tiered)
+        first = np.searchsorted(block[TIME], covered, side='left')
+        parts.append((block[TIME, first:], block[column, first:], block[column, first:]))
+        return tuple(np.concatenate(values) for values in zip(*parts))
+
+    def latest(self):
+        """Zwraca ostatnią próbkę jako krotkę lub None"""
+        if self.count == 0:
+            return None
+        return tuple(float(value) for value in self._data[:, (self.count - 1) % self.capacity])
+
+
+class SampleCursor:
+    """Kursor czytelnika bufora: fetch() zwraca jednym wywołaniem wszystkie nowe próbki"""
+
+    def __init__(self, store, position=0):
+        self.store = store
+        self.position = position  # Numer następnej próbki do odczytu
+        self.dropped = 0          # Łączna liczba próbek nadpisanych przed odczytem
+
+    @property
+    def pending(self):
+        """Liczba próbek czekających na odczyt"""
+        return self.store.count - self.position
+
+    def fetch(self, copy=False):
+        """Zwraca próbki dopisane od poprzedniego wywołania (kolumny x próbki)"""
+        block, self.position, dropped = self.store.read(self.position, copy)
+        self.dropped += dropped
+        return block
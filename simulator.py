@@ -0,0 +1,234 @@
+"""Symulator kontrolera temperatury na pseudoterminalu (Linux)
+
+Uruchomienie: python3 simulator.py [--latency 0.02] [--jitter 0.005] [--error-rate 0.01]
+Wypisuje ścieżkę portu (np. /dev/pts/5), którą należy podać jako port szeregowy.
+"""
+import argparse
+import heapq
+import os
+import random
+import select
+import threading
+import time
+import tty
+
+
+class ThermalModel:
+    """Prosty model cieplny: element Peltiera z regulatorem PI i stratami do otoczenia"""
+
+    def __init__(self, ambient=22.0, tau=60.0, heat_gain=1.0, max_current=4.0, noise=0.01):
+        self.ambient = ambient
+        self.tau = tau              # Stała czasowa strat do otoczenia [s]
+        self.heat_gain = heat_gain  # Przyrost temperatury na amper [°C/s/A]
+        self.max_current = max_current
+        self.noise = noise
+        self.temperature = ambient
+        self.current = 0.0
+        self.setpoint = 20.0
+        self.pid = [6.0, 7.0, 4.0]
+        self.enabled = True
+        self.integral = 0.0
+        self.last_update = None
+
+    def update(self, now):
+        """Całkuje model do chwili now"""
+        if self.last_update is None:
+            self.last_update = now
+            return
+        dt = min(now - self.last_update, 1.0)
+        self.last_update = now
+        if dt <= 0:
+            return
+
+        if self.enabled:
+            error = self.setpoint - self.temperature
+            self.integral = max(-50.0, min(50.0, self.integral + error * dt))
+            current = 0.1 * self.pid[0] * error + 0.01 * self.pid[1] * self.integral
+            self.current = max(-self.max_current, min(self.max_current, current))
+        else:
+            self.current = 0.0
+            self.integral = 0.0
+
+        self.temperature += (self.heat_gain * self.current - (self.temperature - self.ambient) / self.tau) * dt
+
+    def read_temperature(self):
+        """Zwraca temperaturę z szumem pomiarowym"""
+        return self.temperature + random.gauss(0.0, self.noise)
+
+
+class DeviceSimulator:
+    """Symuluje kontroler na pseudoterminalu: odpowiada na *GET..., przyjmuje *SET... oraz A/a"""
+
+    def __init__(self, latency=0.02, jitter=0.005, error_rate=0.0, drop_rate=0.0, model=None, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate  # Prawdopodobieństwo zniekształconej lub uciętej odpowiedzi
+        self.drop_rate = drop_rate    # Prawdopodobieństwo braku odpowiedzi
+        self.model = model or ThermalModel()
+        self.random = random.Random(seed)
+
+        self.master_fd = None
+        self.slave_fd = None
+        self.port = None
+        self.running = False
+        self.thread = None
+
+        self._input = bytearray()
+        self._scheduled = []  # Kopiec (czas wysłania, numer, typ, bajty)
+        self._sequence = 0
+        self._last_send_at = 0.0
+
+        # Statystyki
+        self.commands = {}
+        self.responses = {}
+        self.dropped = 0
+        self.corrupted = 0
+
+    def start(self):
+        """Otwiera pseudoterminal i uruchamia wątek symulatora"""
+        self.master_fd, self.slave_fd = os.openpty()
+        tty.setraw(self.slave_fd)
+        self.port = os.ttyname(self.slave_fd)
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+        return self.port
+
+    def stop(self):
+        """Zatrzymuje symulator i zamyka pseudoterminal"""
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=2)
+        for fd in (self.master_fd, self.slave_fd):
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        self.master_fd = self.slave_fd = None
+
+    def _loop(self):
+        """Pętla: odbiera komendy i wysyła zaplanowane odpowiedzi"""
+        while self.running:
+            now = time.monotonic()
+            timeout = 0.05
+            if self._scheduled:
+                timeout = max(0.0, min(timeout, self._scheduled[0][0] - now))
+            try:
+                readable, _, _ = select.select([self.master_fd], [], [], timeout)
+                if readable:
+                    self._input += os.read(self.master_fd, 4096)
+                    self._parse_input()
+                self._flush_due(time.monotonic())
+            except OSError:
+                break
+
+    def _parse_input(self):
+        """Wydziela komendy: *...; oraz pojedyncze znaki A/a"""
+        while self._input:
+            if self._input[0] == ord('*'):
+                end = self._input.find(b';')
+                if end < 0:
+                    return
+                command = self._input[1:end].decode('Latin-1')
+                del self._input[:end + 1]
+                self._handle(command)
+            else:
+                char = chr(self._input[0])
+                del self._input[:1]
+                if char in 'Aa':
+                    self._count(self.commands, char)
+                    self.model.update(time.monotonic())
+                    self.model.enabled = char == 'A'
+
+    def _handle(self, command):
+        """Obsługuje pojedynczą komendę bez '*' i ';'"""
+        now = time.monotonic()
+        self.model.update(now)
+
+        if command.startswith('GET'):
+            name = command[3:]
+            self._count(self.commands, name)
+            if name == 'TACT':
+                self._respond(name, f"*TACT {self.model.read_temperature():6.2f}", now)
+            elif name == 'IOUT':
+                self._respond(name, f"*IOUT    {self.model.current:.3f}A", now)
+            elif name == 'TPRS':
+                self._respond(name, f"*TPRS {self.model.setpoint:6.2f}", now)
+        elif command.startswith('SETTPRS'):
+            self._count(self.commands, 'SETTPRS')
+            try:
+                self.model.setpoint = float(command[7:])
+            except ValueError:
+                pass
+        elif command.startswith('SETCK'):
+            self._count(self.commands, 'SETCK')
+            try:
+                self.model.pid = [float(v) for v in command[5:].split()][:3]
+            except ValueError:
+                pass
+
+    def _respond(self, name, line, now):
+        """Planuje odpowiedź z opóźnieniem, ewentualnie wstrzykując błąd"""
+        if self.random.random() < self.drop_rate:
+            self.dropped += 1
+            return
+        payload = (line + '\r\n').encode('Latin-1')
+        counted = name
+        if self.random.random() < self.error_rate:
+            counted = None
+            self.corrupted += 1
+            if self.random.random() < 0.5:
+                payload = payload[:len(payload) // 2]  # Ucięta ramka bez terminatora
+            else:
+                payload = payload[:6] + b'#?' + payload[8:]  # Zniekształcona wartość
+
+        delay = max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+        # Urządzenie odpowiada w kolejności zapytań
+        send_at = max(now + delay, self._last_send_at)
+        self._last_send_at = send_at
+        self._sequence += 1
+        heapq.heappush(self._scheduled, (send_at, self._sequence, counted, payload))
+
+    def _flush_due(self, now):
+        """Wysyła odpowiedzi, których czas nadszedł"""
+        while self._scheduled and self._scheduled[0][0] <= now:
+            _, _, name, payload = heapq.heappop(self._scheduled)
+            os.write(self.master_fd, payload)
+            if name:
+                self._count(self.responses, name)
+
+    @staticmethod
+    def _count(counter, key):
+        counter[key] = counter.get(key, 0) + 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Symulator kontrolera temperatury na pseudoterminalu")
+    parser.add_argument('--latency', type=float, default=0.02, help="opóźnienie odpowiedzi [s]")
+    parser.add_argument('--jitter', type=float, default=0.005, help="rozrzut opóźnienia [s]")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="udział zniekształconych odpowiedzi")
+    parser.add_argument('--drop-rate', type=float, default=0.0, help="udział utraconych odpowiedzi")
+    parser.add_argument('--ambient', type=float, default=22.0, help="temperatura otoczenia [°C]")
+    parser.add_argument('--tau', type=float, default=60.0, help="stała czasowa strat cieplnych [s]")
+    args = parser.parse_args()
+
+    simulator = DeviceSimulator(latency=args.latency, jitter=args.jitter,
+                                error_rate=args.error_rate, drop_rate=args.drop_rate,
+                                model=ThermalModel(ambient=args.ambient, tau=args.tau))
+    port = simulator.start()
+    print(f"Symulator działa na porcie: {port}")
+    print("Ctrl+C kończy pracę")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        simulator.stop()
+        print(f"Komendy: {simulator.commands}")
+        print(f"Odpowiedzi: {simulator.responses}, utracone: {simulator.dropped}, zniekształcone: {simulator.corrupted}")
+
+
+if __name__ == "__main__":
+    main()
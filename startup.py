@@ -0,0 +1,63 @@
+"""Pomiar czasu uruchamiania aplikacji (opcja --profile-startup)
+
+Etapy mierzone są zawsze (koszt pomijalny), a zestawienie jest wypisywane tylko po
+włączeniu profilowania. Czas liczony jest od zaimportowania tego modułu, czyli od
+pierwszej linii Kontroler.py (bez startu samego interpretera).
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+PROCESS_START = time.perf_counter()
+
+
+class StartupProfiler:
+    """Zbiera czasy etapów startu (także z wątków w tle) i chwile kluczowych zdarzeń"""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.phases = []       # (nazwa, początek, czas trwania) w sekundach od startu
+        self.milestones = []   # (nazwa, czas od startu)
+        self._lock = threading.Lock()
+        self._last_mark = PROCESS_START
+
+    @contextmanager
+    def phase(self, name):
+        """Mierzy czas wykonania bloku"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add(name, started, time.perf_counter())
+
+    def mark(self, name):
+        """Zamyka etap trwający od poprzedniego wywołania mark (np. grupę importów)"""
+        now = time.perf_counter()
+        self._add(name, self._last_mark, now)
+        self._last_mark = now
+
+    def milestone(self, name):
+        """Zapisuje chwilę zdarzenia (np. pierwsze narysowanie okna)"""
+        with self._lock:
+            self.milestones.append((name, time.perf_counter() - PROCESS_START))
+
+    def _add(self, name, started, stopped):
+        with self._lock:
+            self.phases.append((name, started - PROCESS_START, stopped - started))
+
+    def report(self):
+        """Zwraca zestawienie etapów i zdarzeń jako tekst"""
+        with self._lock:
+            phases = sorted(self.phases, key=lambda phase: phase[1])
+            milestones = sorted(self.milestones, key=lambda milestone: milestone[1])
+        lines = ["Czas uruchamiania [ms]:", f"  {'etap':<44} {'start':>8} {'czas':>8}"]
+        for name, started, duration in phases:
+            lines.append(f"  {name:<44} {started * 1000:8.1f} {duration * 1000:8.1f}")
+        for name, at in milestones:
+            lines.append(f"  {name:<44} {at * 1000:8.1f}")
+        return "\n".join(lines)
+
+    def print_report(self):
+        """Wypisuje zestawienie, jeśli profilowanie jest włączone"""
+        if self.enabled:
+            print(self.report(), flush=True)
@@ -0,0 +1,44 @@
+import json
+
+import numpy as np
+import pytest
+
+from samplestore import SampleStore
+
+TIMES = [0.0, 0.05, 0.1, 0.15]
+TEMPERATURES = [23.45, 23.46, 23.5, 24.0]
+CURRENTS = [0.5, 0.501, -0.25, 1.125]
+
+
+@pytest.fixture
+def make_store():
+    """Fabryka SampleStore wypełnionego kolumnami (skalary są powielane).
+
+    Próbki są dopisywane porcjami po pół bufora z update_tiers() po każdej, więc przy
+    przepełnieniu starsze próbki zostają w poziomach historii jak podczas akwizycji.
+    """
+    def make(times, temperature, current=0.0, setpoint=20.0, capacity=None, tiers=()):
+        times = np.asarray(times, dtype=np.float64)
+        columns = [np.broadcast_to(np.asarray(values, dtype=np.float64), times.shape)
+                   for values in (times, temperature, current, setpoint)]
+        store = SampleStore(capacity=capacity or max(len(times), 1), tiers=tiers)
+        step = max(store.capacity // 2, 1)
+        for start in range(0, len(times), step):
+            for row in zip(*(values[start:start + step].tolist() for values in columns)):
+                store.append(*row)
+            store.update_tiers()
+        return store
+    return make
+
+
+@pytest.fixture
+def data_json():
+    """Fabryka data.json w układzie aplikacji (json.dump z indent=4); zwraca zapisane dane"""
+    def write(path, times=TIMES, temperature=TEMPERATURES, current=CURRENTS):
+        data = {'metadata': {'start_time': '2025-01-01T12:00:00', 'measurement_duration': times[-1] - times[0],
+                             'total_samples': len(times), 'config': {}},
+                'temperature': list(temperature), 'current': list(current), 'time': list(times)}
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(data, indent=4))
+        return data
+    return write
@@ -0,0 +1,83 @@
+import math
+
+import numpy as np
+import pytest
+
+from analysis import StepAnalyzer, analyze_steps, setpoint_changes
+from samplestore import SampleStore
+
+DT = 0.05
+TAU = 10.0
+
+
+def first_order(times, start, initial, target):
+    """Odpowiedź inercyjna I rzędu na skok nastawy w chwili start"""
+    response = initial + (target - initial) * (1 - np.exp(-(times - start) / TAU))
+    return np.where(times < start, initial, response)
+
+
+def two_steps():
+    times = np.arange(0, 240, DT)
+    setpoint = np.where(times < 20, 20.0, np.where(times < 140, 30.0, 25.0))
+    temperature = np.where(times < 140, first_order(times, 20, 20.0, 30.0),
+                           first_order(times, 140, first_order(np.array([140.0]), 20, 20.0, 30.0)[0], 25.0))
+    return times, temperature, setpoint
+
+
+def test_setpoint_changes_ignore_unknown_setpoint():
+    setpoint = np.array([np.nan, np.nan, 20.0, 20.0, 30.0, np.nan, 30.0])
+    assert setpoint_changes(setpoint).tolist() == [4]
+
+
+def test_first_order_steps_match_closed_form():
+    times, temperature, setpoint = two_steps()
+    steps = analyze_steps(times, temperature, setpoint)
+
+    assert steps['start'].tolist() == pytest.approx([20.0, 140.0])
+    assert steps['setpoint'].tolist() == [30.0, 25.0]
+    assert steps['rise_time'] == pytest.approx([TAU * math.log(9)] * 2, abs=2 * DT)
+    assert steps['overshoot'] == pytest.approx([0.0, 0.0])
+    # Pasmo 2% skoku (0.2°C i 0.1°C przy skoku -5°C): t = -TAU * ln(pasmo / skok)
+    assert steps['settling_time'][0] == pytest.approx(-TAU * math.log(0.02), abs=2 * DT)
+    assert steps['steady_state_error'][0] == pytest.approx(0.0, abs=1e-3)
+
+
+def test_overshoot_is_percent_of_step():
+    times = np.arange(0, 60, DT)
+    setpoint = np.where(times < 10, 20.0, 30.0)
+    temperature = np.where(times < 10, 20.0, 30.0 + 2.0 * np.exp(-(times - 10)))
+    steps = analyze_steps(times, temperature, setpoint)
+    assert steps['overshoot'][0] == pytest.approx(20.0)
+
+
+def test_unsettled_step_has_nan_settling_time():
+    times = np.arange(0, 15, DT)
+    setpoint = np.where(times < 5, 20.0, 30.0)
+    steps = analyze_steps(times, first_order(times, 5, 20.0, 30.0), setpoint)
+    assert np.isnan(steps['settling_time'][0])
+
+
+@pytest.mark.parametrize('starts', [[1], [0, 5], [3, 100]])
+def test_starts_outside_data_are_dropped(starts):
+    steps = analyze_steps([0.0], [20.0], [30.0], starts=starts)
+    assert len(steps['start']) == 0
+
+
+def test_step_analyzer_follows_live_store():
+    times, temperature, setpoint = two_steps()
+    store = SampleStore(capacity=8192)
+    clock = [0.0]
+    analyzer = StepAnalyzer(clock=lambda: clock[0])
+
+    results = []
+    for start in range(0, len(times), 200):
+        for i in range(start, min(start + 200, len(times))):
+            store.append(times[i], temperature[i], 0.0, setpoint[i])
+        clock[0] += 1.0
+        results.append(analyzer.update(store))
+
+    assert results[0] is None  # Przed pierwszą zmianą nastawy
+    assert results[-1]['setpoint'] == 25.0
+    assert results[-1]['start'] == pytest.approx(140.0)
+    expected = analyze_steps(times, temperature, setpoint)
+    assert results[-1]['rise_time'] == pytest.approx(expected['rise_time'][-1])
@@ -0,0 +1,117 @@
+import asyncio
+import socket
+
+import pytest
+
+from asyncserial import AsyncTransport
+
+LATE_WINDOW = 0.1
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+async def open_pair(**kwargs):
+    """Transport na jednym końcu pary gniazd; drugi koniec udaje urządzenie"""
+    host, device = socket.socketpair()
+    device.setblocking(False)
+    transport = AsyncTransport(host.fileno(), asyncio.get_running_loop(), connection=host, **kwargs)
+    return transport, device
+
+
+def read_all(device):
+    try:
+        return device.recv(4096)
+    except BlockingIOError:
+        return b''
+
+
+def test_reply_matches_oldest_query_of_its_type():
+    async def scenario():
+        transport, device = await open_pair()
+        first = asyncio.ensure_future(transport.query('*GETTACT;'))
+        second = asyncio.ensure_future(transport.query('*GETTACT;'))
+        current = asyncio.ensure_future(transport.query('*GETIOUT;'))
+        await asyncio.sleep(0.01)
+        device.sendall(b'*IOUT    0.500A\r\n*TACT  21.00\r\n*TACT  22.00\r\n')
+        results = await asyncio.gather(first, second, current)
+        transport.close()
+        return results, read_all(device)
+
+    results, sent = run(scenario())
+    assert results == [21.0, 22.0, 0.5]
+    assert sent == b'*GETTACT;*GETTACT;*GETIOUT;'
+
+
+def test_late_reply_after_timeout_is_discarded():
+    async def scenario():
+        unsolicited = []
+        transport, device = await open_pair(late_window=LATE_WINDOW,
+                                            on_unsolicited=lambda *args: unsolicited.append(args))
+        with pytest.raises(asyncio.TimeoutError):
+            await transport.query('*GETTACT;', timeout=0.05)
+
+        # Następne zapytanie czeka, aż minie okno spóźnionej odpowiedzi
+        second = asyncio.ensure_future(transport.query('*GETTACT;', timeout=1.0))
+        await asyncio.sleep(0.02)
+        assert read_all(device) == b'*GETTACT;'
+        device.sendall(b'*TACT  21.00\r\n')  # Spóźniona odpowiedź na pierwsze zapytanie
+        await asyncio.sleep(0.02)
+        assert not second.done()
+
+        await asyncio.sleep(LATE_WINDOW)
+        assert read_all(device) == b'*GETTACT;'
+        device.sendall(b'*TACT  22.00\r\n')
+        value = await second
+        transport.close()
+        return value, transport.late_replies, unsolicited
+
+    value, late, unsolicited = run(scenario())
+    assert value == 22.0
+    assert late == 1
+    assert unsolicited == []
+
+
+def test_lost_reply_does_not_shift_later_replies():
+    async def scenario():
+        transport, device = await open_pair(late_window=LATE_WINDOW)
+        with pytest.raises(asyncio.TimeoutError):
+            await transport.query('*GETTACT;', timeout=0.05)
+        await asyncio.sleep(LATE_WINDOW)  # Odpowiedź nie przyszła - znacznik wygasa
+        query = asyncio.ensure_future(transport.query('*GETTACT;'))
+        await asyncio.sleep(0.01)
+        device.sendall(b'*TACT  23.00\r\n')
+        value = await query
+        transport.close()
+        return value, transport.late_replies
+
+    assert run(scenario()) == (23.0, 0)
+
+
+def test_malformed_reply_fails_oldest_query():
+    async def scenario():
+        transport, device = await open_pair()
+        first = asyncio.ensure_future(transport.query('*GETTACT;'))
+        second = asyncio.ensure_future(transport.query('*GETTACT;'))
+        await asyncio.sleep(0.01)
+        device.sendall(b'*TACT  2x.y0\r\n*TACT  24.00\r\n')
+        with pytest.raises(ValueError):
+            await asyncio.wait_for(first, 0.2)
+        value = await second
+        transport.close()
+        return value
+
+    assert run(scenario()) == 24.0
+
+
+def test_close_fails_pending_queries():
+    async def scenario():
+        transport, _ = await open_pair()
+        query = asyncio.ensure_future(transport.query('*GETIOUT;'))
+        await asyncio.sleep(0.01)
+        transport.close()
+        with pytest.raises(ConnectionError):
+            await query
+
+    run(scenario())
@@ -0,0 +1,91 @@
+import os
+
+import numpy as np
+import pytest
+
+import batch
+from analysis import DEFAULT_BAND, DEFAULT_TAIL, DEFAULT_TOLERANCE
+from recording import FLAG_TEST_START, FLAG_TEST_STOP, RECORD_DTYPE, to_records, write_measurement
+
+PARAMS = {'setpoint': None, 'band': DEFAULT_BAND, 'tolerance': DEFAULT_TOLERANCE, 'tail': DEFAULT_TAIL}
+
+
+@pytest.fixture
+def tree(tmp_path, data_json):
+    data_json(tmp_path / 'pomiar-2025-01-01 (10)' / 'data.json')
+    data_json(tmp_path / 'pomiar-2025-01-01 (2)' / 'data.json', temperature=[20.0, 21.0, 22.0, 23.0])
+    data_json(tmp_path / 'inne' / 'data.json')
+    return tmp_path
+
+
+def analyze(root, params=PARAMS):
+    rows, processed = batch.analyze_tree(str(root), params, jobs=1)
+    return {row['path']: row for row in rows}, processed
+
+
+def test_find_runs_sorts_naturally_and_prefers_recordings(tree):
+    times = np.arange(10) * 0.05
+    write_measurement(str(tree / 'pomiar-2025-01-01 (10)' / 'data.kbin'),
+                      to_records(times, np.full(10, 25.0), np.zeros(10)))
+    paths = [os.path.relpath(path, tree) for path in batch.find_runs(str(tree))]
+    assert paths == [os.path.join('pomiar-2025-01-01 (2)', 'data.json'),
+                     os.path.join('pomiar-2025-01-01 (10)', 'data.kbin')]
+
+
+def test_unchanged_files_come_from_cache(tree):
+    rows, processed = analyze(tree)
+    assert processed == 2
+    assert rows[os.path.join('pomiar-2025-01-01 (2)', 'data.json')]['temperature_max'] == 23.0
+
+    again, processed = analyze(tree)
+    assert processed == 0
+    assert again.keys() == rows.keys()
+    assert all(again[key]['temperature_mean'] == rows[key]['temperature_mean'] for key in rows)
+
+
+def test_touched_file_is_hashed_and_edited_file_is_recomputed(tree, data_json):
+    analyze(tree)
+    touched = tree / 'pomiar-2025-01-01 (10)' / 'data.json'
+    os.utime(touched, ns=(0, 12345))
+    rows, processed = analyze(tree)
+    assert processed == 1  # Tylko porównanie skrótu, wynik z pamięci podręcznej
+    assert rows[os.path.relpath(touched, tree)]['samples'] == 4
+
+    data_json(tree / 'pomiar-2025-01-01 (2)' / 'data.json', temperature=[30.0, 31.0, 32.0, 33.0])
+    rows, processed = analyze(tree)
+    assert processed == 1
+    assert rows[os.path.join('pomiar-2025-01-01 (2)', 'data.json')]['temperature_max'] == 33.0
+
+
+def test_changed_params_invalidate_cache(tree):
+    analyze(tree)
+    _, processed = analyze(tree, dict(PARAMS, band=0.05))
+    assert processed == 2
+
+
+def test_errors_are_reported_and_cached(tree):
+    broken = tree / 'pomiar-2025-01-01 (2)' / 'data.json'
+    broken.write_text('{')
+    rows, _ = analyze(tree)
+    assert rows[os.path.relpath(broken, tree)]['error'].startswith('JSONDecodeError')
+
+    rows, processed = analyze(tree)
+    assert processed == 0
+    assert rows[os.path.relpath(broken, tree)]['error'].startswith('JSONDecodeError')
+
+
+@pytest.mark.parametrize('count', [1, 2])
+def test_fixed_setpoint_on_short_file(count):
+    records = to_records(np.arange(count) * 0.05, np.full(count, 25.0), np.zeros(count))
+    summary = batch.summarize(records, dict(PARAMS, setpoint=30.0))
+    assert summary['samples'] == count
+    assert summary['steps'] == count - 1
+
+
+def test_window_between_last_start_and_next_stop():
+    records = np.zeros(10, dtype=RECORD_DTYPE)
+    records['time'] = np.arange(10)
+    records['flags'][[1, 4, 6, 8]] = [FLAG_TEST_START, FLAG_TEST_START, FLAG_TEST_STOP, FLAG_TEST_STOP]
+    assert batch.test_window(records)['time'].tolist() == [4, 5, 6]
+    records['flags'][[6, 8]] = 0
+    assert batch.test_window(records)['time'].tolist() == [4, 5, 6, 7, 8, 9]
@@ -0,0 +1,65 @@
+from commandscheduler import CommandScheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def commands(entries):
+    return [entry.command for entry in entries]
+
+
+def test_same_kind_commands_coalesce_in_place():
+    scheduler = CommandScheduler()
+    assert scheduler.add('*SETTPRS20.0;') is False
+    assert scheduler.add('*SETCK1.0 2.0 3.0;') is False
+    assert scheduler.add('*SETTPRS25.0;') is True
+    assert scheduler.add('*SETTPRS30.0;') is True
+
+    entries = scheduler.pop_all()
+    assert commands(entries) == ['*SETTPRS30.0;', '*SETCK1.0 2.0 3.0;']
+    assert entries[0].merged == 2
+    assert (scheduler.queued, scheduler.coalesced) == (4, 2)
+    assert scheduler.depth() == 0
+
+
+def test_coalesced_command_keeps_oldest_queue_time():
+    clock = FakeClock()
+    scheduler = CommandScheduler(clock)
+    scheduler.add('*SETTPRS20.0;')
+    clock.now = 101.5
+    scheduler.add('*SETTPRS25.0;')
+
+    entry, = scheduler.pop_all()
+    assert entry.queued_at == 100.0
+    assert entry.updated_at == 101.5
+
+
+def test_safety_commands_go_first():
+    scheduler = CommandScheduler()
+    scheduler.add('*SETTPRS20.0;')
+    scheduler.add('A')
+    scheduler.add('*GETTACT;')
+    scheduler.add('a')  # Wyłączenie prądu zastępuje włączenie i przechodzi do pilniejszej kolejki
+
+    assert commands(scheduler.pop_all()) == ['a', '*SETTPRS20.0;', '*GETTACT;']
+
+
+def test_commands_without_kind_are_never_merged():
+    scheduler = CommandScheduler()
+    scheduler.add('*GETTACT;')
+    assert scheduler.add('*GETTACT;') is False
+    assert commands(scheduler.pop_all()) == ['*GETTACT;', '*GETTACT;']
+
+
+def test_pending_kinds_are_forgotten_after_pop():
+    scheduler = CommandScheduler()
+    scheduler.add('*SETTPRS20.0;')
+    scheduler.pop_all()
+    assert scheduler.add('*SETTPRS25.0;') is False
+    scheduler.clear()
+    assert scheduler.depth() == 0
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from decimation import MinMaxDecimator, envelope_points, minmax_buckets
+from samplestore import TEMPERATURE
+
+DT = 0.05
+
+
+def test_minmax_buckets_keep_first_minimum_and_last_maximum():
+    keys = np.array([0, 0, 0, 0, 1, 1, 2])
+    x = np.arange(7.0)
+    y = np.array([3.0, 1.0, 1.0, 3.0, np.nan, 5.0, np.nan])
+
+    assert [values.tolist() for values in minmax_buckets(keys, x, y)[:2]] == [[0, 1, 2], [1.0, 5.0, 6.0]]
+    _, _, ymin, xmax, ymax = minmax_buckets(keys, x, y)
+    assert ymin[:2].tolist() == [1.0, 5.0] and np.isnan(ymin[2])
+    assert xmax.tolist() == [3.0, 5.0, 6.0]
+    assert ymax[:2].tolist() == [3.0, 5.0]
+
+
+def test_envelope_points_follow_time_order():
+    xs, ys = envelope_points(np.array([1.0, 4.0]), np.array([0.0, 0.0]), np.array([2.0, 3.0]), np.array([9.0, 9.0]))
+    assert xs.tolist() == [1.0, 2.0, 3.0, 4.0]
+    assert ys.tolist() == [0.0, 9.0, 9.0, 0.0]
+
+
+@pytest.fixture
+def sine_store(make_store):
+    def make(samples):
+        numbers = np.arange(samples)
+        return make_store(numbers * DT, np.sin(numbers / 40.0))
+    return make
+
+
+def test_raw_samples_are_clipped_to_visible_range(sine_store):
+    x, y = MinMaxDecimator(TEMPERATURE).update(sine_store(2000), 10.0, 20.0, 1000)
+    assert x[0] == pytest.approx(10.0) and x[-1] == pytest.approx(20.0)
+    assert len(x) == len(y) == 201
+
+
+def test_envelope_stops_at_right_edge_and_matches_full_rebuild(sine_store):
+    store = sine_store(20000)
+    decimator = MinMaxDecimator(TEMPERATURE)
+    decimator.update(store, 0.0, 500.0, 100)
+    for i in range(20000, 20400):
+        store.append(i * DT, np.sin(i / 40.0), 0.0, 20.0)
+    x, y = decimator.update(store, 100.0, 600.0, 100)
+
+    assert x.max() < 600.0 + decimator.bucket_width
+    expected = MinMaxDecimator(TEMPERATURE).update(store, 100.0, 600.0, 100)
+    assert np.array_equal(x, expected[0]) and np.array_equal(y, expected[1])
+    assert y.min() == pytest.approx(-1.0, abs=1e-3) and y.max() == pytest.approx(1.0, abs=1e-3)
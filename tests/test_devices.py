@@ -0,0 +1,92 @@
+import selectors
+import socket
+import time
+
+import pytest
+
+from devices import DeviceManager
+
+
+class FakePolling:
+    def time_to_next(self, now):
+        return 0.05
+
+    def stats(self):
+        return {'TACT': {'achieved_hz': 0.0}}
+
+
+class FakeCommunicator:
+    """Urządzenie na gnieździe: service() odczytuje, co przyszło, i liczy kroki"""
+
+    def __init__(self, port):
+        self.port = port
+        self.connection, self.device = socket.socketpair()
+        self.connection.setblocking(False)
+        self.connected = True
+        self.polling = FakePolling()
+        self.wake_func = None
+        self.received = b''
+        self.sessions = 0
+
+    def begin_session(self):
+        self.sessions += 1
+
+    def end_session(self):
+        self.sessions -= 1
+
+    def service(self, now, receive=True):
+        if receive:
+            try:
+                self.received += self.connection.recv(4096)
+            except (BlockingIOError, OSError):
+                pass
+        return True
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+@pytest.fixture
+def select_selector(monkeypatch):
+    # Selektor epoll pomija zamknięte deskryptory; select() zgłasza błąd jak poll/select na innych systemach
+    monkeypatch.setattr(selectors, 'DefaultSelector', selectors.SelectSelector)
+
+
+def test_bad_descriptor_drops_only_that_device(select_selector):
+    messages = []
+    first, second = FakeCommunicator('/dev/ttyUSB0'), FakeCommunicator('/dev/ttyUSB1')
+    manager = DeviceManager([first, second], console_func=messages.append)
+    assert manager.start()
+    try:
+        first.connection.close()  # Port zamknięty poza pętlą (rozłączenie)
+        second.device.sendall(b'*TACT  21.00\r\n')
+        assert wait_until(lambda: second.received == b'*TACT  21.00\r\n')
+        assert wait_until(lambda: not first.connected)
+        assert manager.thread.is_alive()
+
+        second.device.sendall(b'*TACT  22.00\r\n')
+        assert wait_until(lambda: second.received.endswith(b'*TACT  22.00\r\n'))
+    finally:
+        manager.stop()
+
+    assert second.connected
+    assert any('/dev/ttyUSB0' in message and 'odłączone' in message for message in messages)
+    assert (first.sessions, second.sessions) == (0, 0)
+
+
+def test_all_devices_are_served_by_one_thread():
+    devices = [FakeCommunicator(f'/dev/ttyUSB{n}') for n in range(3)]
+    manager = DeviceManager(devices, console_func=lambda message: None)
+    assert manager.start()
+    try:
+        for number, communicator in enumerate(devices):
+            communicator.device.sendall(b'*IOUT %d\r\n' % number)
+        assert wait_until(lambda: all(c.received for c in devices))
+    finally:
+        manager.stop()
+    assert [c.received for c in devices] == [b'*IOUT 0\r\n', b'*IOUT 1\r\n', b'*IOUT 2\r\n']
+    assert not manager.thread
@@ -0,0 +1,83 @@
+import csv
+import io
+import json
+import os
+import threading
+
+import numpy as np
+import pytest
+
+import export
+from export import ExportCancelled, ExportJob, csv_task, json_task, write_csv, write_json
+
+
+@pytest.fixture
+def columns():
+    rng = np.random.default_rng(0)
+    n = 1000
+    times = np.arange(n) * 0.05
+    # Wartości na granicy zaokrąglenia i ujemne
+    temperature = np.round(rng.normal(25.0, 5.0, n), 3)
+    temperature[:4] = [0.125, -0.005, 23.455, 1e-9]
+    current = rng.normal(0.0, 1.0, n)
+    return times, temperature, current
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(export, 'CHUNK_ROWS', 64)
+
+
+def reference_csv(times, temperature, current, preamble):
+    """Zapis CSV jak przed zapisem blokowym (csv.writer wiersz po wierszu)"""
+    file = io.StringIO(newline='')
+    writer = csv.writer(file, delimiter=';')
+    for row in preamble:
+        writer.writerow(row)
+    writer.writerow(['Czas [s]', 'Temperatura [°C]', 'Prąd [A]'])
+    for i in range(min(len(times), len(temperature), len(current))):
+        writer.writerow([f"{times[i]:.3f}", f"{temperature[i]:.2f}", f"{current[i]:.4f}"])
+    return file.getvalue()
+
+
+def test_csv_is_byte_identical_to_csv_writer(columns, small_chunks):
+    times, temperature, current = columns
+    preamble = [['# Pomiar temperatury'], ['# Czas pomiaru: 49.95s'], ['']]
+    file = io.StringIO(newline='')
+    write_csv(file, times, temperature, current[:-3], preamble)
+    assert file.getvalue() == reference_csv(times, temperature, current[:-3], preamble)
+
+
+def test_json_is_byte_identical_to_json_dump(columns, small_chunks):
+    times, temperature, current = columns
+    current[[5, 70]] = [np.nan, np.inf]
+    metadata = {'start_time': '2025-01-01T12:00:00', 'total_samples': len(times), 'config': {'port': 'COM3'}}
+    data = {'metadata': metadata, 'temperature': temperature.tolist(), 'current': current.tolist(),
+            'time': times.tolist(), 'setpoint': []}
+
+    file = io.StringIO()
+    write_json(file, metadata, [(name, np.asarray(data[name])) for name in ('temperature', 'current', 'time', 'setpoint')])
+    assert file.getvalue() == json.dumps(data, indent=4)
+
+
+def test_export_job_writes_files_and_reports_progress(tmp_path, columns):
+    times, temperature, current = columns
+    job = ExportJob([csv_task(str(tmp_path / 'data.csv'), times, temperature, current),
+                     json_task(str(tmp_path / 'data.json'), {}, [('time', times)])]).start()
+    job.thread.join(timeout=5)
+
+    assert job.done and job.error is None and job.progress == 1.0
+    assert json.loads((tmp_path / 'data.json').read_text())['time'] == times.tolist()
+    assert (tmp_path / 'data.csv').read_text(encoding='utf-8').startswith('Czas [s];')
+
+
+def test_export_cancelled_mid_write_keeps_previous_file(tmp_path, columns, small_chunks):
+    path = tmp_path / 'data.csv'
+    path.write_text('poprzedni')
+    cancel = threading.Event()
+
+    with pytest.raises(ExportCancelled):
+        csv_task(str(path), *columns)(lambda fraction: cancel.set(), cancel)
+
+    assert path.read_text() == 'poprzedni'
+    assert not os.path.exists(str(path) + '.part')
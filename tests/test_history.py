@@ -0,0 +1,70 @@
+import time
+
+import numpy as np
+import pytest
+
+from history import ChunkCache, Prefetcher, StoreHistory
+from samplestore import TEMPERATURE, TIME
+
+DT = 0.05
+
+
+@pytest.fixture
+def overwritten_store(make_store):
+    """Bufor 1000 próbek po 150 s pomiaru: surowe próbki od 100 s, starsze tylko w poziomach"""
+    numbers = np.arange(3000)
+    return make_store(numbers * DT, 20.0 + numbers % 7, capacity=1000, tiers=(1.0, 10.0))
+
+
+def test_store_history_falls_back_to_tiers_before_oldest_raw_sample(overwritten_store):
+    history = StoreHistory(overwritten_store)
+    lows, highs = history.load(10.0, 20.0, 400)
+
+    assert history.level == 1.0
+    assert lows[TIME, 0] <= 10.5
+    assert highs[TIME, -1] < 22.0
+    assert lows[TEMPERATURE].min() == 20.0 and highs[TEMPERATURE].max() == 26.0
+
+
+def test_store_history_uses_raw_samples_inside_buffer(overwritten_store):
+    history = StoreHistory(overwritten_store)
+    lows, highs = history.load(120.0, 130.0, 400)
+
+    assert history.level is None
+    assert lows is highs
+    assert np.allclose(np.diff(lows[TIME]), DT)
+    assert lows[TIME, 0] <= 120.0 and lows[TIME, -1] >= 130.0
+
+
+class FailingSource:
+    name = "zepsute"
+
+    def prefetch(self, t0, t1, pixels):
+        raise OSError("brak pliku")
+
+
+def test_prefetcher_reports_errors():
+    messages = []
+    prefetcher = Prefetcher(console_func=messages.append)
+    try:
+        prefetcher.request(FailingSource(), 0.0, 1.0, 100)
+        deadline = time.monotonic() + 2.0
+        while prefetcher.loaded < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        prefetcher.stop()
+
+    assert prefetcher.errors == 3
+    assert messages and all("zepsute" in message and "brak pliku" in message for message in messages)
+
+
+def test_chunk_cache_evicts_least_recently_used():
+    chunk = (np.zeros((4, 16)), np.zeros((4, 16)))
+    cache = ChunkCache(max_bytes=2 * 2 * chunk[0].nbytes)
+    cache.put('a', chunk)
+    cache.put('b', chunk)
+    cache.get('a')
+    cache.put('c', chunk)
+
+    assert len(cache) == 2
+    assert 'a' in cache and 'c' in cache and 'b' not in cache
@@ -0,0 +1,61 @@
+import random
+
+from metrics import Histogram, MetricsRegistry, UNIT
+
+
+def parse_samples(text):
+    """{nazwa z etykietami: wartość} z tekstu Prometheus"""
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            samples[name] = value
+    return samples
+
+
+def test_counters_are_exported_exactly():
+    registry = MetricsRegistry()
+    registry.counter('kontroler_samples_total', "Próbki", port='/dev/ttyUSB0').inc(123456789)
+    registry.gauge('kontroler_rate', "Częstotliwość").set(19.987654321)
+
+    samples = parse_samples(registry.prometheus_text())
+    assert samples['kontroler_samples_total{port="/dev/ttyUSB0"}'] == '123456789'
+    assert samples['kontroler_rate'] == '19.987654321'
+
+
+def test_label_values_and_help_are_escaped():
+    registry = MetricsRegistry()
+    registry.counter('x_total', "Opis \\ z\nnową linią", port='odtwarzanie:C:\\x\\"a".json').inc()
+
+    lines = registry.prometheus_text().splitlines()
+    assert lines[0] == '# HELP x_total Opis \\\\ z\\nnową linią'
+    assert lines[2] == 'x_total{port="odtwarzanie:C:\\\\x\\\\\\"a\\".json"} 1'
+
+
+def test_histogram_bucket_counts_are_exact():
+    rng = random.Random(1)
+    values = [rng.lognormvariate(-6, 2) for _ in range(5000)]
+    histogram = Histogram()
+    for value in values:
+        histogram.observe(value)
+
+    bounds = histogram.export_bounds()
+    units = [int(value / UNIT) for value in values]
+    assert histogram.cumulative(bounds) == [sum(1 for u in units if u < bound) for bound in bounds]
+
+
+def test_export_bounds_are_hdr_edges_close_to_nominal():
+    for nominal, bound in zip((0.0005, 0.001, 0.01, 1.0), Histogram.export_bounds((0.0005, 0.001, 0.01, 1.0))):
+        seconds = bound * UNIT
+        assert nominal <= seconds < nominal * (1 + 1 / 16) + UNIT
+        assert Histogram._upper(Histogram._index(bound - 1)) == bound
+
+
+def test_percentile_relative_error_is_bounded():
+    histogram = Histogram()
+    values = [0.0001 * 1.01 ** k for k in range(1000)]
+    for value in values:
+        histogram.observe(value)
+    for q in (50, 90, 99):
+        exact = sorted(values)[int(q / 100 * len(values)) - 1]
+        assert abs(histogram.percentile(q) - exact) <= exact / 16 + UNIT
@@ -0,0 +1,64 @@
+import pytest
+
+from benchmark import check_parser
+from protocol import FrameParser, command_class, parse_response, response_type, CONTROL, SAFETY
+
+
+def test_frame_parser_matches_device_layout_and_reference():
+    count, differences = check_parser(random_frames=6000)
+    assert count > 6000
+    assert differences == []
+
+
+@pytest.mark.parametrize('frame, expected', [(b'*IOUT   -0.500A', -0.5), (b'*IOUT  -12.500A', -12.5),
+                                             (b'*IOUT    0.500A;', 0.5), (b'*TACT 23.456 C', 23.456),
+                                             (b'*TPRS   -7.5;', -7.5), (b'*TACT  2x.y0', None),
+                                             (b'*IOUT 1  0.500A', None), (b'*TACT ', None)])
+def test_value_is_the_whole_signed_number_after_tag(frame, expected):
+    (kind, value, _), = FrameParser().feed(frame + b'\r\n')
+    assert kind == frame[1:5].decode()
+    assert value == expected
+
+
+def test_frames_split_across_reads_are_joined():
+    parser = FrameParser()
+    stream = b'*TACT 23.456 C\r\n*IOUT    0.500A\r\n*TPRS  25.00\r\n'
+    results = []
+    for byte in range(len(stream)):
+        results.extend(parser.feed(stream[byte:byte + 1]))
+
+    assert [(kind, value) for kind, value, _ in results] == [('TACT', 23.456), ('IOUT', 0.5), ('TPRS', 25.0)]
+    assert parser.buffer == bytearray()
+
+
+def test_garbage_before_frame_is_skipped():
+    parser = FrameParser()
+    results = parser.feed(b'T 23.4\r\n\x00\x17*TACT  21.50\r\nxyz\r\n*TACT abc\r\n')
+
+    assert results[0][:2] == (None, None)  # Urwana ramka bez '*'
+    assert results[1][:2] == ('TACT', 21.5)
+    assert results[2][:2] == (None, None)
+    assert results[3][:2] == ('TACT', None)  # Zniekształcona wartość
+    assert parser.discarded == 2
+
+
+def test_buffer_without_terminator_is_limited():
+    parser = FrameParser(limit=16)
+    assert parser.feed(b'*TACT 1' * 3) == []
+    assert parser.discarded == 21 and parser.buffer == bytearray()
+    assert parser.feed(b'*TACT  20.00\r\n')[0][:2] == ('TACT', 20.0)
+
+
+@pytest.mark.parametrize('command, expected', [('*GETTACT;', 'TACT'), (' *GETIOUT; ', 'IOUT'),
+                                               ('*SETTPRS25;', None), ('A', None)])
+def test_response_type(command, expected):
+    assert response_type(command) == expected
+
+
+def test_command_class_puts_current_off_first():
+    assert command_class('a') == (SAFETY, 'current')
+    assert command_class('A') == (CONTROL, 'current')
+    assert command_class('*SETTPRS25.0;') == (CONTROL, 'setpoint')
+    assert command_class('*SETCK1.0 2.0 3.0;') == (CONTROL, 'pid')
+    assert command_class('*GETTACT;') == (CONTROL, None)
+    assert parse_response('*XYZ 1.0') is None
@@ -0,0 +1,111 @@
+import numpy as np
+
+from recording import (MeasurementFile, RECORD_DTYPES, Recorder, convert, load_measurement, to_records,
+                       write_header, write_footer, write_measurement, HEADER_STRUCT, INDEX_DTYPE,
+                       FLAG_SETPOINT_CHANGE, FLAG_TEST_START, FLAG_TEST_STOP)
+from samplestore import SampleStore
+
+
+def test_json_round_trip_through_kbin_is_lossless(tmp_path, data_json):
+    source = tmp_path / 'data.json'
+    data = data_json(source)
+    convert(str(source), str(tmp_path / 'data.kbin'))
+    convert(str(tmp_path / 'data.kbin'), str(tmp_path / 'back.json'))
+
+    assert (tmp_path / 'back.json').read_text() == source.read_text()
+    records, _ = load_measurement(str(tmp_path / 'data.kbin'))
+    assert records['temperature'].tolist() == data['temperature']
+    assert records['current'].tolist() == data['current']
+
+
+def test_csv_round_trip_through_kbin_keeps_values(tmp_path, data_json):
+    source = tmp_path / 'data.json'
+    data_json(source)
+    convert(str(source), str(tmp_path / 'data.csv'))
+    convert(str(tmp_path / 'data.csv'), str(tmp_path / 'data.kbin'))
+    convert(str(tmp_path / 'data.kbin'), str(tmp_path / 'back.csv'))
+
+    assert (tmp_path / 'back.csv').read_bytes() == (tmp_path / 'data.csv').read_bytes()
+
+
+def test_version_2_float32_files_are_still_read(tmp_path):
+    path = tmp_path / 'v2.kbin'
+    records = np.zeros(3, dtype=RECORD_DTYPES[2])
+    records['time'] = [0.0, 1.0, 2.0]
+    records['temperature'] = [20.0, 20.5, 21.0]
+    with open(path, 'wb') as file:
+        write_header(file, {})
+        file.seek(0)
+        file.write(HEADER_STRUCT.pack(b'KTREC\x00', 2, 4096))
+        file.seek(4096)
+        file.write(records.tobytes())
+        write_footer(file, len(records), np.empty(0, dtype=INDEX_DTYPE), {})
+
+    measurement = MeasurementFile(str(path))
+    assert measurement.version == 2
+    assert measurement.records['temperature'].tolist() == [20.0, 20.5, 21.0]
+
+
+def test_time_slice_uses_sparse_index(tmp_path):
+    times = np.arange(10000) * 0.05
+    records = to_records(times, np.full(len(times), 25.0), np.zeros(len(times)), np.full(len(times), 30.0))
+    write_measurement(str(tmp_path / 'data.kbin'), records, chunk_size=256)
+
+    measurement = MeasurementFile(str(tmp_path / 'data.kbin'))
+    assert measurement.complete
+    assert len(measurement.index) == -(-len(times) // 256)
+    part = measurement.time_slice(100.0, 101.0)
+    assert part['time'][0] == 100.0
+    assert part['time'][-1] == 101.0
+    assert len(part) == 21
+
+
+def append_samples(store, count, setpoint=30.0):
+    for _ in range(count):
+        store.append(store.count * 0.05, 25.0, 0.5, setpoint)
+
+
+def test_mark_flags_pending_and_written_samples(tmp_path):
+    store = SampleStore(capacity=1000)
+    append_samples(store, 10)  # Przed nagraniem
+    messages = []
+    recorder = Recorder(store, str(tmp_path / 'data.kbin'), write_interval=60.0, console_func=messages.append)
+    recorder.start()
+    try:
+        append_samples(store, 20)
+        recorder.write_pending()
+        recorder.mark(12, FLAG_TEST_START)  # Próbka już zapisana - poprawka w pliku
+        append_samples(store, 5, setpoint=35.0)
+        recorder.mark(33, FLAG_TEST_STOP)   # Próbka jeszcze niezapisana
+        recorder.mark(5, FLAG_TEST_STOP)    # Sprzed nagrania
+    finally:
+        recorder.stop()
+
+    records = MeasurementFile(str(tmp_path / 'data.kbin')).records
+    assert len(records) == 25
+    assert np.flatnonzero(records['flags'] & FLAG_TEST_START).tolist() == [2]
+    assert np.flatnonzero(records['flags'] & FLAG_TEST_STOP).tolist() == [23]
+    assert np.flatnonzero(records['flags'] & FLAG_SETPOINT_CHANGE).tolist() == [20]
+    assert any("próbki 5" in message for message in messages)
+
+
+def test_mark_follows_records_after_lost_samples(tmp_path):
+    store = SampleStore(capacity=100)
+    recorder = Recorder(store, str(tmp_path / 'data.kbin'), write_interval=60.0)
+    recorder.start()
+    try:
+        append_samples(store, 50)
+        recorder.write_pending()
+        append_samples(store, 150)  # 50 próbek nadpisanych przed zapisem
+        recorder.write_pending()
+        recorder.mark(160, FLAG_TEST_START)
+    finally:
+        recorder.stop()
+
+    measurement = MeasurementFile(str(tmp_path / 'data.kbin'))
+    assert measurement.metadata['lost_samples'] == 50
+    records = measurement.records
+    assert len(records) == 150
+    marked = np.flatnonzero(records['flags'] & FLAG_TEST_START)
+    assert marked.tolist() == [110]
+    assert records['time'][110] == 160 * 0.05
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from samplestore import SampleCursor, SampleStore, TEMPERATURE, TIME
+
+DT = 0.05
+
+
+def append_samples(store, count):
+    for _ in range(count):
+        store.append(store.count * DT, float(store.count), 0.0, 20.0)
+
+
+def test_mirrored_ring_gives_contiguous_views_after_wraparound():
+    store = SampleStore(capacity=8, tiers=())
+    append_samples(store, 13)
+
+    assert len(store) == 8 and store.first_index == 5
+    block = store.last()
+    assert block.base is not None  # Widok, nie kopia
+    assert block[TEMPERATURE].tolist() == list(range(5, 13))
+    assert store.window(7, 10)[TEMPERATURE].tolist() == [7, 8, 9]
+    assert store.window(0, 6)[TEMPERATURE].tolist() == [5]  # Próbki nadpisane są pomijane
+    assert store.latest()[TEMPERATURE] == 12.0
+
+
+def test_cursor_counts_overwritten_samples():
+    store = SampleStore(capacity=10, tiers=())
+    cursor = SampleCursor(store)
+    append_samples(store, 4)
+    assert cursor.fetch()[TEMPERATURE].tolist() == [0, 1, 2, 3]
+
+    append_samples(store, 15)
+    assert cursor.pending == 15
+    block = cursor.fetch()
+    assert block[TEMPERATURE].tolist() == list(range(9, 19))
+    assert cursor.dropped == 5
+    assert cursor.fetch().shape[1] == 0
+
+
+class WriterDuringCopy(np.ndarray):
+    """Bufor, w którym kopiowanie wycinka jest przerywane zapisem (jak wątek akwizycji)"""
+    pending = []
+
+    def copy(self, order='C'):
+        while WriterDuringCopy.pending:
+            WriterDuringCopy.pending.pop()()
+        return np.ndarray.copy(self, order)
+
+
+def test_copy_read_drops_samples_overwritten_during_copy():
+    store = SampleStore(capacity=10, tiers=())
+    append_samples(store, 10)
+    store._data = store._data.view(WriterDuringCopy)
+    WriterDuringCopy.pending = [lambda: append_samples(store, 3)]
+
+    block, position, dropped = store.read(0, copy=True)
+
+    # Pozycje próbek 0-2 nadpisane, próbka 3 mogła być w trakcie nadpisywania
+    assert block[TEMPERATURE].tolist() == [4, 5, 6, 7, 8, 9]
+    assert dropped == 4
+    assert position == 10
+    block, position, dropped = store.read(position, copy=True)
+    assert block[TEMPERATURE].tolist() == [10, 11, 12] and dropped == 0
+
+
+@pytest.fixture
+def tiered_store(make_store):
+    """35.3 s próbek o temperaturze równej czasowi; poziomy 1 s i 10 s"""
+    times = np.arange(707) * DT
+    return make_store(times, times, tiers=(1.0, 10.0))
+
+
+def test_summary_stitches_tiers_and_raw_samples_without_gaps(tiered_store):
+    times, low, high = tiered_store.summary(1, TEMPERATURE)
+
+    # Trzy zamknięte kubełki 10 s, kubełki 1 s do 35 s, potem surowe próbki
+    assert np.all(np.diff(times) > 0)
+    assert low[:3].tolist() == pytest.approx([0.0, 10.0, 20.0])
+    assert high[:3].tolist() == pytest.approx([9.95, 19.95, 29.95])
+    assert low[3:8].tolist() == pytest.approx([30.0, 31.0, 32.0, 33.0, 34.0])
+    assert low[8:].tolist() == pytest.approx(np.arange(700, 707) * DT)
+    assert low[1:] == pytest.approx(high[:-1] + DT)  # Części stykają się bez luk i nakładania
+
+
+def test_summary_since_starts_at_bucket_containing_time(tiered_store):
+    times, low, high = tiered_store.summary(1, TEMPERATURE, since=15.0)
+    assert low[0] == pytest.approx(10.0)
+    assert high[-1] == pytest.approx(706 * DT)
+    assert tiered_store.summary(0, TIME, since=33.5)[1][0] == pytest.approx(33.0)